@@ -19,134 +19,111 @@ import time
 
 # GAME START
 # Here we define the bot's name as Settler and initialize the game, including communication with the Halite engine.
-game = hlt.Game("Jbot_new")
+game = hlt.Game("Jbot_new", track_events=True, turn_budget=1.9)
 # Then we print our start message to the logs
 LOG = logging.getLogger('jbot')
 LOG.setLevel(logging.INFO)
 LOG.info("Starting my jbot !")
 
 
-def get_my_planets():
-    """Returns only my planets"""
-    x = []
-    for planet in all_planets:
-        if planet.is_owned() and game_map.my_id == planet.owner.id:
-            x.append(planet)
-    return x
+def get_average_size_of_my_planets(ctx):
+    stats = ctx.me.stats
+    if stats.planet_count:
+        return stats.planet_radius_sum / stats.planet_count
+    return 0
 
 
-def get_average_size_of_my_planets():
-    all_sizes_added = 0
-    average_size = 0
-
-    for planet in my_planets:
-        all_sizes_added += planet.radius
-
-    if len(my_planets):
-        average_size = all_sizes_added / len(my_planets)
-    return average_size
-
-
-def get_nearest_unowned_planet_for_ship(myship):
+def get_nearest_unowned_planet_for_ship(ctx, myship):
     """Get the nearest unowned planet for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
-    for distance in sorted(entities_by_distance):
-        entities = entities_by_distance[distance]
-        for entity in entities:
-            if isinstance(entity, hlt.entity.Planet):
-                if not entity.is_owned():
-                    return entity
+    return nearest_cache.nearest(myship, ctx.game_map.planets_owned_by(None), 'unowned_planet', moving=False)
 
 
-def get_nearest_unowned_outer_planet_for_ship(myship):
+def get_nearest_unowned_outer_planet_for_ship(ctx, myship):
     """Get the nearest unowned outer planet for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
         for entity in entities:
-            if entity in all_outer_planets:
+            if entity in ctx.outer_planets:
                 if not entity.is_owned():
                     return entity
 
 
-def get_nearest_enemy_planet(myship):
+def get_nearest_enemy_planet(ctx, myship):
     """Get nearest enemy planet
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
         for entity in entities:
             if isinstance(entity, hlt.entity.Planet):
-                if entity.is_owned() and entity.owner.id != game_map.my_id:
+                if entity.is_owned() and entity.owner.id != ctx.my_id:
                     return entity
     return []
 
 
-def get_nearest_notfull_planet_i_own_for_ship(myship):
+def get_nearest_notfull_planet_i_own_for_ship(ctx, myship):
     """Get the nearest planet owned by me for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet that isn't full
 
     """
-    # Get Tuple of Tuples representing Not Full Planets I own in (distance, radius)
-    average_size_of_my_planets = get_average_size_of_my_planets()
-    for planet in my_planets:
-        if not planet.is_full() and planet.radius >= average_size_of_my_planets:
+    open_planets = production.open_planets(ctx.my_id)
+    if not open_planets:
+        return None
+    # Prefer my not full planets that are at least as big as my average planet
+    average_size_of_my_planets = get_average_size_of_my_planets(ctx)
+    for planet in open_planets.values():
+        if planet.radius >= average_size_of_my_planets:
             return planet
 
     # Otherwise, lets just get the closest planet...
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
-    for distance in sorted(entities_by_distance):
-        entities = entities_by_distance[distance]
-        for entity in entities:
-            if isinstance(entity, hlt.entity.Planet):
-                if entity.owner == myship.owner and not entity.is_full():
-                    return entity
-    return None
+    return min(open_planets.values(), key=myship.calculate_distance_between)
 
 
-def get_biggest_early_planet_for_ship(myship):
+def get_biggest_early_planet_for_ship(ctx, myship):
     """Get the nearest 3 unowned planet for the passed in ship.  Only used for turn 1 logic.
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         hlt.entity.Planet: Initial planet to inhabit.
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     three_planets = []
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -163,51 +140,70 @@ def get_biggest_early_planet_for_ship(myship):
     return False
 
 
-def get_nearest_enemy_ship(myship, leader_only=False):
+def get_nearest_enemy_ship(ctx, myship, leader_only=False):
     """Get the nearest enemy ship
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship: One of my ships
         leader_only (bool): If True, only return the nearest LEADER ship
 
     Returns:
         htl.entity.Ship: Nearest enemy ship
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
-    for distance, entity_list in sorted(entities_by_distance.items()):
-        for entity in entity_list:
-            if isinstance(entity, hlt.entity.Ship):
-                if entity.owner != myship.owner:
-                    if leader_only and entity.owner.id == leader:
-                        return entity
-                    if not leader_only:
-                        return entity
-
+    if leader_only:
+        return nearest_cache.nearest(myship, ctx.game_map.player_ships(ctx.leader), 'leader_ship')
+    return nearest_cache.nearest(myship, ctx.enemy_ships, 'enemy_ship')
 
-def get_nearby_enemy_docker(myship):
-    """Check for nearby enemy docking ships
 
-    Args:
-        myship (Ship):
+def assign_targets(ctx):
+    """Assign my undocked ships to defense threats, nearby enemy dockers and free docking spots in one pass.
 
     Returns:
+        dict: hlt.assignment.Target of each assigned ship, keyed by ship id
+    """
+    targets = [hlt.assignment.Target(enemy_ship, 2, reach=60, bonus=100, kind='defend')
+               for enemy_ship in defend_against_ships.values()]
+    for player in ctx.all_players:
+        if player.id == ctx.my_id:
+            continue
+        for status in (hlt.entity.Ship.DockingStatus.DOCKING,
+                       hlt.entity.Ship.DockingStatus.DOCKED,
+                       hlt.entity.Ship.DockingStatus.UNDOCKING):
+            targets.extend(hlt.assignment.Target(enemy_ship, 2, reach=12, bonus=50, kind='raid')
+                           for enemy_ship in ctx.game_map.ships_with_status(player.id, status).values())
+    # Unowned planets an enemy reaches first are left to the fallbacks
+    targets.extend(hlt.assignment.Target(ctx.game_map.get_planet(planet_id), spots, bonus=bonus, kind='expand')
+                   for planet_id, spots, bonus in planner.get('expansion targets')
+                   if ctx.territory.planet_owner(planet_id) in (ctx.my_id, hlt.territory.CONTESTED)
+                   or ctx.game_map.get_planet(planet_id).is_owned())
+    return hlt.assignment.assign(list(ctx.my_undocked_ships.values()), targets)
+
+
+def get_expansion_targets(ctx):
+    """Planets with free docking spots, mine preferred over unowned ones.
 
+    Returns:
+        list: (planet id, open docking spots, bonus) of every expansion target
     """
-    for player in all_players:
-        playerid = player.id
-        player_ships = player.all_ships()
-        player_ships.sort(key=lambda x: myship.calculate_distance_between(x))
-        if playerid != game_map.my_id:
-            for enemy_ship in player_ships:
-                if enemy_ship.docking_status != enemy_ship.DockingStatus.UNDOCKED and myship.calculate_distance_between(enemy_ship) <= 12:
-                    return enemy_ship
-    return False
+    return [(planet_id, production.open_spots(planet_id), bonus)
+            for owner_id, bonus in ((ctx.my_id, 20), (None, 0))
+            for planet_id in production.open_planets(owner_id)]
 
 
-def go_to_nearest_unowned_planet(myship):
+def assigned_target(ctx, myship, kind):
+    """Returns the entity myship was assigned to this turn if the assignment is of the given kind, else None."""
+    target = ctx.ship_targets.get(myship.id)
+    if target is not None and target.kind == kind:
+        return target.entity
+    return None
+
+
+def go_to_nearest_unowned_planet(ctx, myship):
     """Move the ship to the nearest unowned planet and dock it.
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship:
 
     Returns:
@@ -215,30 +211,31 @@ def go_to_nearest_unowned_planet(myship):
 
     """
     # GO TO NEAREST UNOWNED PLANET
-    nearest_unowned_planet = get_nearest_unowned_planet_for_ship(myship)
+    nearest_unowned_planet = get_nearest_unowned_planet_for_ship(ctx, myship)
     if nearest_unowned_planet:
-        LOG.info('SHIP %s going to nearest unowned planet %s', ship.id, nearest_unowned_planet.id)
-        if ship.can_dock(nearest_unowned_planet):
-            command_queue.append(ship.dock(nearest_unowned_planet))
+        LOG.info('SHIP %s going to nearest unowned planet %s', myship.id, nearest_unowned_planet.id)
+        if myship.can_dock(nearest_unowned_planet):
+            ctx.command_queue.append(myship.dock(nearest_unowned_planet))
             return True
         else:
-            navigate_command = ship.navigate(
-                ship.closest_point_to(nearest_unowned_planet),
-                game_map,
+            navigate_command = myship.navigate(
+                myship.closest_point_to(nearest_unowned_planet),
+                ctx.game_map,
                 speed=int(hlt.constants.MAX_SPEED),
                 ignore_ships=False,
-                max_corrections=18,
-                angular_step=5)
+                max_corrections=scheduler.corrections,
+                angular_step=scheduler.angular_step)
             if navigate_command:
-                command_queue.append(navigate_command)
+                ctx.command_queue.append(navigate_command)
                 return True
     return False
 
 
-def go_to_nearest_enemy_ship(myship, leader_only=False):
+def go_to_nearest_enemy_ship(ctx, myship, leader_only=False):
     """Go to the nearest enemy ship (attack)
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship:
         leader_only (bool): If True, only go to the nearest enemy ship of the leader
 
@@ -246,24 +243,24 @@ def go_to_nearest_enemy_ship(myship, leader_only=False):
         bool: if action was successful
 
     """
-    nearest_enemy_ship = get_nearest_enemy_ship(myship, leader_only)
+    nearest_enemy_ship = get_nearest_enemy_ship(ctx, myship, leader_only)
     if nearest_enemy_ship:
         LOG.info('SHIP %s ATTACKING NEAREST ENEMY SHIP %s', myship.id, nearest_enemy_ship.id)
-        navigate_command = ship.navigate(
+        navigate_command = myship.navigate(
             myship.closest_point_to(nearest_enemy_ship),
-            game_map,
+            ctx.game_map,
             speed=int(hlt.constants.MAX_SPEED),
-            max_corrections=18,
-            angular_step=5,
+            max_corrections=scheduler.corrections,
+            angular_step=scheduler.angular_step,
             ignore_ships=False,
             ignore_planets=False)
         if navigate_command:
-            command_queue.append(navigate_command)
+            ctx.command_queue.append(navigate_command)
             return True
     return False
 
 
-def get_all_outer_planets():
+def get_all_outer_planets(ctx):
     """ Returns a list of all outer planets
 
     Returns:
@@ -271,22 +268,23 @@ def get_all_outer_planets():
     """
     high_end_percent = .34
     low_end_percent = .66
-    x_must_be_gt = game_map.width * high_end_percent
-    x_must_be_lt = game_map.width * low_end_percent
-    y_must_be_gt = game_map.height * high_end_percent
-    y_must_be_lt = game_map.height * low_end_percent
+    x_must_be_gt = ctx.game_map.width * high_end_percent
+    x_must_be_lt = ctx.game_map.width * low_end_percent
+    y_must_be_gt = ctx.game_map.height * high_end_percent
+    y_must_be_lt = ctx.game_map.height * low_end_percent
     the_outer_planets = []
-    for planet in all_planets:
+    for planet in ctx.all_planets:
         if not planet.is_owned():
             if planet.x >= x_must_be_gt or planet.x <= x_must_be_lt or planet.y >= y_must_be_gt or planet.y <= y_must_be_lt:
                 the_outer_planets.append(planet)
     return the_outer_planets
 
 
-def general_attack(myship, attack_planet=False, closest_point=True):
+def general_attack(ctx, myship, attack_planet=False, closest_point=True):
     """This is my default attack mode.  Tweak as necessary.
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship:
         attack_planet (bool): Should I attack a planet instead?
         closest_point (bool): Closest point, or straight in?
@@ -295,7 +293,7 @@ def general_attack(myship, attack_planet=False, closest_point=True):
         bool: True if action was successful
     """
     if attack_planet:
-        nearest_enemy_planet = get_nearest_enemy_planet(myship)
+        nearest_enemy_planet = get_nearest_enemy_planet(ctx, myship)
         if nearest_enemy_planet:
             if closest_point:
                 target = myship.closest_point_to(nearest_enemy_planet)
@@ -303,20 +301,20 @@ def general_attack(myship, attack_planet=False, closest_point=True):
                 target = nearest_enemy_planet
             navigate_command = myship.navigate(
                 target,
-                game_map,
+                ctx.game_map,
                 speed=int(hlt.constants.MAX_SPEED),
-                max_corrections=18,
-                angular_step=5,
+                max_corrections=scheduler.corrections,
+                angular_step=scheduler.angular_step,
                 ignore_ships=False,
                 ignore_planets=False)
             if navigate_command:
-                command_queue.append(navigate_command)
+                ctx.command_queue.append(navigate_command)
                 LOG.info('SHIP %s is ATTACKING PLANET %s', myship.id, nearest_enemy_planet.id)
                 return True
     else:
         dist_ratio = 1  # How much further will you go to attack the leader?  Example:  3x
-        nearest_leader_ship = get_nearest_enemy_ship(myship, leader_only=True)
-        nearest_enemy_ship = get_nearest_enemy_ship(myship, leader_only=False)
+        nearest_leader_ship = get_nearest_enemy_ship(ctx, myship, leader_only=True)
+        nearest_enemy_ship = get_nearest_enemy_ship(ctx, myship, leader_only=False)
         dist_to_leader_ship = nearest_leader_ship.calculate_distance_between(myship)
         dist_to_enemy_ship = nearest_enemy_ship.calculate_distance_between(myship)
 
@@ -328,36 +326,33 @@ def general_attack(myship, attack_planet=False, closest_point=True):
             LOG.info('General Attack: Hitting Leader Due to Distance Override!')
         else:
             ship_to_attack = nearest_enemy_ship
-        navigate_command = myship.navigate(
-            myship.closest_point_to(ship_to_attack),
-            game_map,
-            speed=int(hlt.constants.MAX_SPEED),
-            max_corrections=18,
-            angular_step=5,
-            ignore_ships=False,
-            ignore_planets=False)
+        navigate_command = fight_command(ctx, myship, ship_to_attack)
         if navigate_command:
-            command_queue.append(navigate_command)
+            ctx.command_queue.append(navigate_command)
             LOG.info('SHIP %s is ATTACKING enemy ship %s', myship.id, ship_to_attack.id)
             return True
     return False
 
 
-def general_expansion(myship):
+def general_expansion(ctx, myship):
     """This is what a ship should do if it should be expanding.
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship: a Ship instance.
 
     Returns:
         bool: True if action is successful
     """
-    # GO TO MY NEAREST NOT FULL BIG PLANET AND DOCK
-    planet_i_own = get_nearest_notfull_planet_i_own_for_ship(myship)
-    unowned_planet = get_nearest_unowned_planet_for_ship(myship)
-    outer_planet = get_nearest_unowned_outer_planet_for_ship(myship)
-
-    if planet_i_own:
+    # GO TO THE DOCKING SPOT I WAS ASSIGNED, OR MY NEAREST NOT FULL BIG PLANET, AND DOCK
+    assigned_planet = assigned_target(ctx, myship, 'expand')
+    planet_i_own = get_nearest_notfull_planet_i_own_for_ship(ctx, myship)
+    unowned_planet = get_nearest_unowned_planet_for_ship(ctx, myship)
+    outer_planet = get_nearest_unowned_outer_planet_for_ship(ctx, myship)
+
+    if assigned_planet:
+        best_planet = assigned_planet
+    elif planet_i_own:
         best_planet = planet_i_own
     elif outer_planet:
         best_planet = outer_planet
@@ -368,19 +363,22 @@ def general_expansion(myship):
         # NOWHERE TO EXPAND TO, SOMETHING ELSE NEEDS TO HAPPEN
         return False
 
-    if go_to_and_dock_at_planet(myship, best_planet, check_for_enemies=True):
-        ships_expanding.append(myship)
-        if best_planet.id in expansion_tracker.keys():
-            expansion_tracker[best_planet.id].append(myship.id)
-        else:
-            expansion_tracker[best_planet.id] = [myship.id]
-        LOG.info('EXPANSION TRACKER: %s', expansion_tracker)
+    if go_to_and_dock_at_planet(ctx, myship, best_planet, check_for_enemies=True):
+        ctx.ships_expanding.append(myship)
+        track_expansion(ctx, myship, best_planet)
+        LOG.info('EXPANSION TRACKER: %s', ctx.expansion_tracker)
         return True
     return False
 
 
+def track_expansion(ctx, myship, some_planet):
+    """Record that myship was sent to expand to some_planet this turn."""
+    ctx.expansion_tracker.setdefault(some_planet.id, []).append(myship.id)
+    production.add_en_route(myship, some_planet)
+
+
 def is_planet_expansion_full(some_planet):
-    """For some_planet, check to see if we're already sending enough ships there.
+    """For some_planet, check to see if docked ships plus the ships we're already sending fill it up.
 
     Args:
         some_planet (hlt.entity.Planet):
@@ -388,59 +386,76 @@ def is_planet_expansion_full(some_planet):
     Returns:
         bool: True if expansion slots full, False otherwise
     """
-    if some_planet.id not in expansion_tracker.keys():
-        return False
-    if len(expansion_tracker[some_planet.id]) >= some_planet.num_docking_spots:
-        return True
-    return False
+    return production.is_expansion_full(some_planet.id)
 
 
-def go_to_and_dock_at_planet(myship, some_planet, travel_speed=hlt.constants.MAX_SPEED, check_for_enemies=True):
+def go_to_and_dock_at_planet(ctx, myship, some_planet, travel_speed=hlt.constants.MAX_SPEED, check_for_enemies=True):
     if myship.can_dock(some_planet) and not some_planet.is_full():
         if check_for_enemies:
-            nearest_enemy = get_nearest_enemy_ship(myship, leader_only=False)
-            if myship.calculate_distance_between(nearest_enemy) >= 15:
+            if ctx.threat_map.is_safe(myship):
                 LOG.info('SHIP %s is docking at planet %s', myship.id, some_planet.id)
-                command_queue.append(myship.dock(some_planet))
+                ctx.command_queue.append(myship.dock(some_planet))
                 return True
             else:
-                LOG.info('SHIP %s NOT docking at planet %s due to nearby enemy ship %s', myship.id, some_planet.id, nearest_enemy.id)
+                LOG.info('SHIP %s NOT docking at planet %s due to enemy threat %.2f', myship.id, some_planet.id,
+                         ctx.threat_map.threat_at(myship))
         else:
             LOG.info('SHIP %s is docking at planet %s', myship.id, some_planet.id)
-            command_queue.append(myship.dock(some_planet))
+            ctx.command_queue.append(myship.dock(some_planet))
             return True
 
     elif not some_planet.is_full() and not is_planet_expansion_full(some_planet):
         navigate_command = myship.navigate(
             myship.closest_point_to(some_planet),
-            game_map,
+            ctx.game_map,
             speed=travel_speed,
             ignore_ships=False,
-            max_corrections=18,
-            angular_step=5)
+            max_corrections=scheduler.corrections,
+            angular_step=scheduler.angular_step)
         if navigate_command:
             LOG.info('SHIP %s going to planet %s', myship.id, some_planet.id)
-            command_queue.append(navigate_command)
+            ctx.command_queue.append(navigate_command)
             return True
     return False
 
 
-def go_to_specific_ship(myship, some_ship):
-    navigate_command = myship.navigate(
-        myship.closest_point_to(some_ship),
-        game_map,
-        speed=hlt.constants.MAX_SPEED,
+def fight_command(ctx, myship, enemy_ship):
+    """Get the command that takes myship into a fight with enemy_ship.
+
+    Ships already engaged with the enemy pick the best scored position around it; others approach the point
+    just short of where the enemy is heading.
+
+    Args:
+        ctx (hlt.context.TurnContext): The current turn
+        myship: One of my undocked ships
+        enemy_ship: The enemy ship to fight
+
+    Returns:
+        str: The command, or None if no path was found
+    """
+    if ctx.engagements.cluster_of(myship.id) is not None \
+            and myship.calculate_distance_between(enemy_ship) <= hlt.engagement.LINK_DISTANCE:
+        return ctx.position_scorer.command(myship, enemy_ship)
+    return myship.navigate(
+        myship.closest_point_to(motion.lead_point(myship, enemy_ship)),
+        ctx.game_map,
+        speed=int(hlt.constants.MAX_SPEED),
+        max_corrections=scheduler.corrections,
+        angular_step=scheduler.angular_step,
         ignore_ships=False,
-        max_corrections=18,
-        angular_step=5)
+        ignore_planets=False)
+
+
+def go_to_specific_ship(ctx, myship, some_ship):
+    navigate_command = fight_command(ctx, myship, some_ship)
     if navigate_command:
         LOG.info('SHIP %s going to attack specific ship %s', myship.id, some_ship.id)
-        command_queue.append(navigate_command)
+        ctx.command_queue.append(navigate_command)
         return True
     return False
 
 
-def find_leader():
+def find_leader(ctx):
     """Determine leader based on shipcount
 
     Returns:
@@ -448,205 +463,389 @@ def find_leader():
     """
     x = {}
 
-    for player in all_players:
-        playerid = player.id
-        player_ships = player.all_ships()
-        player_planets = 0
-        for planet in all_planets:
-            if planet.is_owned() and player.id == planet.owner:
-                player_planets += planet.radius
-        healthy_player_ships = [s for s in player_ships if s.health > 0]
-        ship_count = len(healthy_player_ships)
-        if playerid != game_map.my_id:
-            x[playerid] = ship_count + player_planets
+    for player in ctx.all_players:
+        if player.id != ctx.my_id:
+            x[player.id] = player.stats.healthy_ship_count + player.stats.planet_radius_sum
     LOG.info('LEADER LIST: %s', x)
     leader = max(x, key=x.get)
     LOG.info('LEADER = %s', leader)
     return leader
 
 
-def get_enemy_ships_near_entity(myentity, filter_distance):
+def update_defend_list(ctx):
+    """Updates defend_against_ships global."""
+    # This removes any ship that died since last turn from defend_against_ships, and refreshes the survivors
+    for event in hlt.events.of_type(game.events, hlt.events.EventType.SHIP_DESTROYED):
+        defend_against_ships.pop(event.entity_id, None)
+    for ship_id in defend_against_ships:
+        defend_against_ships[ship_id] = ctx.all_ships[ship_id]
+    scan_for_attackers(ctx)
+
+
+def scan_for_attackers(ctx):
+    """Adds enemy ships close to my docked ships to defend_against_ships."""
+    # Undocked enemy ships within 30 of any of my DOCKED/DOCKING ships may be coming to attack them
+    for enemy_ship in ctx.threat_map.intruders(30):
+        if enemy_ship.id not in defend_against_ships:
+            defend_against_ships[enemy_ship.id] = enemy_ship
+
+
+def plan_ship(ctx, ship):
+    """Run the full decision cascade for one undocked ship.
+
+    Args:
+        ctx (hlt.context.TurnContext): The current turn
+        ship: One of my undocked ships
+
+    Returns:
+        bool: True if a command was given
     """
+    # ATTACK ENEMY DOCKERS
+    enemy_docking_ship = assigned_target(ctx, ship, 'raid')
+    if enemy_docking_ship:
+        logging.info("SHIP %s FOUND NEARBY ENEMY DOCKING SHIP, ATTACKING SHIP %s", ship.id, enemy_docking_ship.id)
+        navigate_command = ship.navigate(
+            ship.closest_point_to(enemy_docking_ship),
+            ctx.game_map,
+            speed=int(hlt.constants.MAX_SPEED),
+            max_corrections=scheduler.corrections,
+            angular_step=scheduler.angular_step,
+            ignore_ships=False,
+            ignore_planets=False)
+        if navigate_command:
+            ctx.command_queue.append(navigate_command)
+            return True
+
+    if ctx.turn <= 10 and initial_planet:
+        speed = hlt.constants.MAX_SPEED
+        if go_to_and_dock_at_planet(ctx, ship, initial_planet, travel_speed=speed):
+            return True
+
+    if len(ctx.my_undocked_ships):
+        ratio_expanding = len(ctx.ships_expanding) / len(ctx.my_undocked_ships)
+    else:
+        ratio_expanding = 0
+    # Generally expand with some percentage of ships.
+    if general_expansion(ctx, ship):
+        return True
+
+    # Weak ships, and ships predicted to lose the fight they are in, fall back to expanding
+    if is_losing_fight(ctx, ship):
+        if general_expansion(ctx, ship):
+            return True
+    if ctx.turn <= 180:
+        # have some ships group up on an enemy planet
+        if ship.id % 5 <= 2:
+            if general_attack(ctx, ship, attack_planet=True, closest_point=True):
+                return True
+
+    if general_attack(ctx, ship, attack_planet=False):
+        return True
+    return False
+
+
+def is_losing_fight(ctx, ship):
+    """Returns True if the ship is weak or predicted to be destroyed in the next few turns."""
+    if ship.health <= 64:
+        return True
+    cluster = ctx.engagements.cluster_of(ship.id)
+    return cluster is not None and not ctx.combat_forecasts[cluster.id].survives(ship.id)
+
+
+def assignment_key(ctx, ship):
+    """Returns a hashable summary of the ship's assignment this turn, for transposition keys."""
+    target = ctx.ship_targets.get(ship.id)
+    return (target.kind, target.entity.id) if target is not None else None
+
+
+def ship_priority(ctx, ship):
+    """Scheduling order: defenders, ships about to dock, ships in contact with the enemy, then the rest."""
+    if assigned_target(ctx, ship, 'defend') or assigned_target(ctx, ship, 'raid'):
+        return 0
+    planet = assigned_target(ctx, ship, 'expand')
+    if planet and ship.can_dock(planet):
+        return 1
+    if ctx.engagements.cluster_of(ship.id) is not None:
+        return 2
+    return 3
+
+
+def straight_line(ctx, ship):
+    """Cheapest reasonable order: head straight for the ship's target, holding if something is in the way."""
+    target = ctx.ship_targets[ship.id].entity if ship.id in ctx.ship_targets else None
+    if target is None:
+        target = get_nearest_unowned_planet_for_ship(ctx, ship) or get_nearest_enemy_ship(ctx, ship)
+    if target is None:
+        return
+    max_corrections, angular_step = hlt.scheduler.NAVIGATION[hlt.scheduler.STRAIGHT]
+    command = ship.navigate(ship.closest_point_to(target), ctx.game_map, speed=int(hlt.constants.MAX_SPEED),
+                            max_corrections=max_corrections, angular_step=angular_step)
+    if command:
+        ctx.command_queue.append(command)
+
+
+def reuse_decision(ctx, ship, decision):
+    """Re-issue a decision taken earlier in the same situation, if it still applies.
 
     Args:
-        myentity (Entity): any entity (ship or planet)
-        filter_distance: Radius to check within for enemy ships
+        ctx (hlt.context.TurnContext): The current turn
+        ship: One of my undocked ships
+        decision (hlt.transposition.Decision): The stored decision, or None
 
     Returns:
-        list: of enemy Ships
+        bool: True if a command was given
     """
-    ship_list = []
-    entities_by_distance = game_map.nearby_entities_by_distance(myentity)
-    for distance, entity_list in sorted(entities_by_distance.items()):
-        for entity in entity_list:
-            if isinstance(entity, hlt.entity.Ship):
-                if entity.owner != myentity.owner:
-                    if distance <= filter_distance:
-                        ship_list.append(entity)
-    return ship_list
-
-
-def update_defend_list():
-    """Updates defend_against_ships global."""
-    # This for loop removes any ship that died from defend_against_ships
-    for some_ship in defend_against_ships:
-        if some_ship not in all_ships:
-            defend_against_ships.remove(some_ship)
-
-    # This for loop updates defend_against_ships for any new ships
-    # First loop over my ships, and find DOCKED/DOCKING Ships.
-    # Then find nearby enemy ships that may be coming to attack my docked ships.
-    # Update the defend_against_ships list
-    for myship in my_ships:
-        if myship.docking_status != myship.DockingStatus.UNDOCKED:
-            for enemy_ship in get_enemy_ships_near_entity(myship, 30):
-                if enemy_ship.docking_status == enemy_ship.DockingStatus.UNDOCKED and enemy_ship not in defend_against_ships:
-                    defend_against_ships.append(enemy_ship)
-
-
-def get_my_closest_ships_to_ship(some_ship, num_ships, filter_distance):
+    if decision is None:
+        return False
+    planet = ctx.game_map.get_planet(decision.planet_id) if decision.planet_id is not None else None
+    if planet is not None and is_planet_expansion_full(planet):
+        return False
+    command = decision.command(ship, ctx.hasher)
+    if not command:
+        return False
+    ctx.command_queue.append(command)
+    if planet is not None:
+        track_expansion(ctx, ship, planet)
+    return True
+
+
+def squad_target(ctx, ship):
+    """Returns the ship's target when it is known before planning, so the ship can move in a squad, else None."""
+    # The opening goes to the initial planet one ship at a time
+    if ctx.turn <= 10:
+        return None
+    planet = assigned_target(ctx, ship, 'expand')
+    if planet is not None:
+        return planet
+    if ship.id in ctx.ship_targets or ctx.engagements.cluster_of(ship.id) is not None or is_losing_fight(ctx, ship):
+        return None
+    # Late game attackers: nothing left to expand to, so the cascade ends in general_attack
+    if production.open_planets(ctx.my_id) or ctx.game_map.planets_owned_by(None):
+        return None
+    if ctx.turn <= 180 and ship.id % 5 <= 2:
+        return None
+    return get_nearest_enemy_ship(ctx, ship)
+
+
+def move_squads(ctx, ships):
+    """Move groups of nearby ships with the same target in formation, with one path query per group.
+
+    Args:
+        ctx (hlt.context.TurnContext): The current turn
+        ships: My undocked ships still without a command
+
+    Returns:
+        list: The ships that were moved
     """
+    moved = []
+    for squad in hlt.squad.form_squads(ships, lambda ship: squad_target(ctx, ship)):
+        if isinstance(squad.target, hlt.entity.Planet):
+            if any(is_planet_expansion_full(squad.target) or ship.can_dock(squad.target) for ship in squad.ships):
+                continue
+            commands = squad.approach(ctx.game_map, max_corrections=scheduler.corrections,
+                                      angular_step=scheduler.angular_step)
+        else:
+            commands = squad.approach(ctx.game_map, target=motion.lead_point(squad.centre, squad.target),
+                                      max_corrections=scheduler.corrections, angular_step=scheduler.angular_step)
+        if commands is None:
+            continue
+        LOG.info('%s MOVING IN FORMATION', squad)
+        ctx.command_queue.extend(commands)
+        moved.extend(squad.ships)
+        if isinstance(squad.target, hlt.entity.Planet):
+            for ship in squad.ships:
+                ctx.ships_expanding.append(ship)
+                track_expansion(ctx, ship, squad.target)
+    return moved
+
+
+def order_context(ctx, ship):
+    """Returns what a standing order depends on besides its target, for revalidation."""
+    return assignment_key(ctx, ship), ctx.turn <= 10
+
+
+def follow_order(ctx, ship):
+    """Continue the ship's standing expansion order if its planet is still open and the way is clear.
 
     Args:
-        some_ship: enemy ship
-        num_ships: number of my ships to find nearby
-        filter_distance: max distance to look within
+        ctx (hlt.context.TurnContext): The current turn
+        ship: One of my undocked ships
 
     Returns:
-        list: of my Ships
+        bool: True if a command was given
     """
-    my_closest_ships = []
-    entities_by_distance = game_map.nearby_entities_by_distance(some_ship)
-    for distance, entity_list in sorted(entities_by_distance.items()):
-        for entity in entity_list:
-            if isinstance(entity, hlt.entity.Ship):
-                if entity.owner.id == game_map.my_id:
-                    if distance <= filter_distance:
-                        if entity not in ships_with_actions:
-                            my_closest_ships.append(entity)
-                            if len(my_closest_ships) == num_ships:
-                                return my_closest_ships
-                    else:
-                        # This is to save processing time, we're already passed the distance limit.
-                        return my_closest_ships
-    return my_closest_ships
+    command = orders.revalidate(ship, ctx.hasher, context=order_context(ctx, ship),
+                                check=lambda order, planet: not is_planet_expansion_full(planet))
+    if not command:
+        return False
+    ctx.command_queue.append(command)
+    ctx.ships_expanding.append(ship)
+    track_expansion(ctx, ship, orders.target(orders.get(ship.id)))
+    return True
+
+
+def place_order(ctx, ship):
+    """Keep the ship's expansion leg as a standing order, if it was given a thrust towards a planet."""
+    planet_id = expansion_target_of(ctx, ship)
+    if planet_id is not None and ctx.command_queue[-1].startswith('t '):
+        with game.uninterruptible():
+            orders.place(ship, ctx.game_map.get_planet(planet_id), 'expand', order_context(ctx, ship))
+
+
+def expansion_target_of(ctx, ship):
+    """Returns the id of the planet the ship was sent to expand to this turn, if any."""
+    for planet_id, ship_ids in ctx.expansion_tracker.items():
+        if ship.id in ship_ids:
+            return planet_id
+    return None
+
+
+def start_turn(ctx):
+    """Bring the cross-turn caches up to date with the new map."""
+    motion.update(ctx.game_map)
+    nearest_cache.begin_turn()
+    production.update(ctx.game_map, ctx.events)
+    production.clear_en_route()
+    planner.update(ctx.events)
+    orders.begin_turn(ctx.game_map, ctx.events)
+    if production.recomputed:
+        planner.invalidate('expansion targets')
+    activity.update(ctx.game_map)
+    update_defend_list(ctx)
+
+
+def get_decision_context(ctx):
+    """Returns everything outside a ship's neighbourhood that the decision cascade depends on."""
+    return (ctx.leader, ctx.turn <= 10, ctx.turn <= 180, initial_planet.id if initial_planet else None,
+            tuple(production.open_planets(ctx.my_id)))
 
 
 try:
-    TURN = 0
     initial_planet = None
-    defend_against_ships = []
+    defend_against_ships = {}  # Enemy ships to defend against, keyed by ship id
+    motion = hlt.motion.MotionHistory()  # Recent ship movement, used to lead moving targets
+    nearest_cache = hlt.kinetic.NearestCache()  # Nearest planet/enemy answers carried across turns
+    transpositions = hlt.transposition.TranspositionTable()  # Decisions by local situation, reused across turns
+    production = hlt.production.ProductionForecast()  # Planet spawn, depletion and fill forecasts
+    scheduler = hlt.scheduler.TurnScheduler()  # Ship order and decision fidelity under the turn deadline
+    activity = hlt.influence.ActivityHeatmap(game.initial_map, game.initial_map.my_id)  # Where enemies roam and fight
+    orders = hlt.orders.OrderBook()  # Standing expansion orders, replanned only once they fail
+    planner = hlt.planner.Planner()  # Slowly changing strategy, recomputed every few turns or on map events
+    ctx = hlt.context.TurnContext(game)  # This turn's map, commands and derived state, computed on first use
+    ctx.on_turn(start_turn)
+
+    planet_events = (hlt.events.EventType.PLANET_OWNER_CHANGED, hlt.events.EventType.PLANET_DESTROYED)
+    planner.register('leader', lambda: find_leader(ctx), every=5, triggers=planet_events)
+    planner.register('outer planets', lambda: [planet.id for planet in get_all_outer_planets(ctx)], every=25,
+                     triggers=planet_events)
+    planner.register('expansion targets', lambda: get_expansion_targets(ctx), every=5,
+                     triggers=planet_events + (hlt.events.EventType.PLANET_DEPLETED,
+                                               hlt.events.EventType.DOCKING_STATUS_CHANGED))
+    # Who reaches each cell first; fleets move little in a few turns
+    planner.register('territory', lambda: hlt.territory.Territory(ctx.game_map), every=3, triggers=planet_events)
+
+    ctx.register('leader', lambda ctx: planner.get('leader'))
+    ctx.register('outer_planets', lambda ctx: [ctx.game_map.get_planet(planet_id)
+                                               for planet_id in planner.get('outer planets')])
+    ctx.register('territory', lambda ctx: planner.get('territory'))
+    ctx.register('threat_map', lambda ctx: hlt.influence.ThreatMap(ctx.game_map, ctx.my_id))  # Enemy firepower
+    # Independent fights; ships outside them aren't in combat
+    ctx.register('engagements', lambda ctx: hlt.engagement.Engagements(ctx.game_map))
+    ctx.register('combat_forecasts', lambda ctx: ctx.engagements.forecast())  # Predicted outcome of each fight
+    ctx.register('position_scorer', lambda ctx: hlt.positioning.PositionScorer(ctx.game_map))  # Thrusts in a fight
+    ctx.register('ship_targets', assign_targets)  # Defenders, raiders and expanders, assigned together
+    ctx.register('hasher', lambda ctx: hlt.transposition.NeighbourhoodHasher(ctx.game_map))
+    ctx.register('decision_context', get_decision_context)
+    ctx.register('ships_expanding', lambda ctx: [])  # List of ships current expanding (used for ratio logic)
+    ctx.register('expansion_tracker', lambda ctx: {})  # My+Neutral planets and the ships going to them
     while True:
         # TURN START
 
-        # Update the map for the new turn and get the latest version
-        game_map = game.update_map()
-        start_time = time.time()
-        end_time = start_time + 1.6
-        TURN += 1
-        LOG.info('TURN %s START', TURN)
-
-        # Here we define the set of commands to be sent to the Halite engine at the end of the turn
-        command_queue = []
-
-        my_ships = game_map.get_me().all_ships()
-        all_planets = game_map.all_planets()
-        all_players = game_map.all_players()
-        all_outer_planets = get_all_outer_planets()
-        all_ships = []
-        for player in all_players:
-            all_ships.extend([x for x in player.all_ships()])
-        my_planets = get_my_planets()
-        leader = find_leader()
-        my_undocked_ships = []  # Obvious
-        for ship in my_ships:
-            if ship.docking_status == ship.DockingStatus.UNDOCKED:
-                my_undocked_ships.append(ship)
-        ships_with_actions = []  # Tracks ships that already have priority actions (defending usually)
-        update_defend_list()
-        ships_expanding = []  # List of ships current expanding (used for ratio logic)
-        expansion_tracker = {}  # Tracks My+Neutral planets and how many ships are going to them.
-        LOG.info('DEFEND AGAINST: %s', [x.id for x in defend_against_ships])
-
-        # PRIORITY DEFENSE ACTIONS
-        for enemy_ship in defend_against_ships:
-            # find my closest x ships to this ship
-            my_closest_ships = get_my_closest_ships_to_ship(enemy_ship, 2, 60)
-            for close_ship in my_closest_ships:
-                if close_ship not in ships_with_actions:
-                    if close_ship.docking_status == close_ship.DockingStatus.UNDOCKED:
-                        if go_to_specific_ship(close_ship, enemy_ship):
-                            LOG.info('SHIP %s GOT PRIORITY DEFENSE AGAINST SHIP %s', close_ship, enemy_ship)
-                            ships_with_actions.append(close_ship)
-
-        LOG.info('PRIORITY ACTIONS: %s', ships_with_actions)
-
-        # For every ship that I control
-        for ship in my_ships:
-
-            # TIMEOUT PROTECTION
-            if time.time() > end_time:
-                LOG.warning('BAILING TURN FOR TIMEOUT')
-                continue  # break out of the per ship loop, which should send our commands
-
-            # SKIP IF SHIP ALREADY HAS PRIORITY ACTION (LIKE DEFENSE)
-            if ship in ships_with_actions:
-                continue
-
-            # SHIP IS DOCKED, DO NOTHING
-            if ship.docking_status != ship.DockingStatus.UNDOCKED:
-                LOG.debug('SHIP %s is docked, skipping.', ship.id)
-                # Skip this ship
-                continue
-
-            if not initial_planet and TURN is 1:
-                initial_planet = get_biggest_early_planet_for_ship(ship)
-                LOG.critical('GETTING INITIAL PLANET: id %s', initial_planet.id)
-
-            # ATTACK ENEMY DOCKERS
-            enemy_docking_ship = get_nearby_enemy_docker(ship)
-            if enemy_docking_ship:
-                logging.info("SHIP %s FOUND NEARBY ENEMY DOCKING SHIP, ATTACKING SHIP %s", ship.id, enemy_docking_ship.id)
-                navigate_command = ship.navigate(
-                    ship.closest_point_to(enemy_docking_ship),
-                    game_map,
-                    speed=int(hlt.constants.MAX_SPEED),
-                    max_corrections=18,
-                    angular_step=5,
-                    ignore_ships=False,
-                    ignore_planets=False)
-                if navigate_command:
-                    command_queue.append(navigate_command)
+        try:
+            # Update the map for the new turn, forgetting everything derived from the previous one
+            ctx.begin_turn()  # The command queue is sent as is if the turn overruns its budget
+            start_time = time.time()
+            end_time = start_time + 1.6
+            LOG.info('TURN %s START', ctx.turn)
+
+            ships_with_actions = []  # Tracks ships that already have priority actions (defending usually)
+            LOG.info('DEFEND AGAINST: %s', list(defend_against_ships))
+            LOG.info('%s', ctx.engagements)
+            LOG.info('%s', ctx.threat_map)
+            LOG.info('%s', ctx.territory)
+            LOG.info('%s, hottest attacks: %s', activity, activity.hotspots(activity.attacks(), 1))
+            LOG.info('%s', production)
+
+            # Every undocked ship, defenders first; cheaper decisions as time runs out
+            scheduler.begin_turn(end_time)
+            ships_to_plan = list(ctx.my_undocked_ships.values())
+            # Squads save time, but only once there is time to form them
+            if scheduler.affordable(len(ships_to_plan)):
+                in_squads = move_squads(ctx, ships_to_plan)
+                ships_to_plan = [ship for ship in ships_to_plan if ship not in in_squads]
+            for ship in scheduler.ships(ships_to_plan, lambda ship: ship_priority(ctx, ship)):
+
+                # Normally turn 1, but a turn 1 that overran its budget never got here
+                if not initial_planet and ctx.turn <= 10:
+                    initial_planet = get_biggest_early_planet_for_ship(ctx, ship)
+                    LOG.critical('GETTING INITIAL PLANET: %s', initial_planet)
+
+                # PRIORITY DEFENSE ACTIONS
+                defend_target = assigned_target(ctx, ship, 'defend')
+                if defend_target and go_to_specific_ship(ctx, ship, defend_target):
+                    LOG.info('SHIP %s GOT PRIORITY DEFENSE AGAINST SHIP %s', ship, defend_target)
+                    ships_with_actions.append(ship)
                     continue
 
-            if TURN <= 10:
-                speed = hlt.constants.MAX_SPEED
-                if go_to_and_dock_at_planet(ship, initial_planet, travel_speed=speed):
+                # STANDING ORDER STILL HOLDS, NO NEED TO PLAN
+                if follow_order(ctx, ship):
                     continue
 
-            if len(my_undocked_ships):
-                ratio_expanding = len(ships_expanding) / len(my_undocked_ships)
-            else:
-                ratio_expanding = 0
-            # Generally expand with some percentage of ships.
-            if general_expansion(ship):
-                continue
-
-            if ship.health <= 64:
-                if general_expansion(ship):
+                # OUT OF TIME: REPEAT LAST TURN'S ORDER OR HEAD STRAIGHT FOR THE TARGET
+                if scheduler.mode == hlt.scheduler.STRAIGHT:
+                    straight_line(ctx, ship)
+                    continue
+                if scheduler.mode == hlt.scheduler.CACHED:
+                    if not reuse_decision(ctx, ship, scheduler.last_order(ship.id)):
+                        straight_line(ctx, ship)
                     continue
-            if TURN <= 180:
-                # have some ships group up on an enemy planet
-                if ship.id % 5 <= 2:
-                    if general_attack(ship, attack_planet=True, closest_point=True):
-                        continue
 
-            if general_attack(ship, attack_planet=False):
-                continue
-            LOG.warning('SHIP %s NO COMMAND GIVEN', ship.id)
+                keyed_planet = get_nearest_unowned_planet_for_ship(ctx, ship)
+                key = ctx.hasher.key(ship, target=keyed_planet,
+                                     context=(ctx.decision_context, ship.id % 5 <= 2, is_losing_fight(ctx, ship),
+                                              assignment_key(ctx, ship)))
+                if reuse_decision(ctx, ship, transpositions.get(key)):
+                    place_order(ctx, ship)
+                    continue
 
-        # Send our set of commands to the Halite engine for this turn
-        game.send_command_queue(command_queue)
+                if plan_ship(ctx, ship):
+                    # Only moves towards the keyed planet are stored: the key says nothing about attack targets
+                    planet_id = expansion_target_of(ctx, ship)
+                    if keyed_planet and planet_id == keyed_planet.id:
+                        decision = hlt.transposition.Decision.from_command(ctx.command_queue[-1], planet_id)
+                        with game.uninterruptible():
+                            transpositions.put(key, decision)
+                    place_order(ctx, ship)
+                    continue
+                LOG.warning('SHIP %s NO COMMAND GIVEN, GOING STRAIGHT', ship.id)
+                straight_line(ctx, ship)
+            LOG.info('PRIORITY ACTIONS: %s', ships_with_actions)
+            LOG.info('NEAREST CACHE: %s hits, %s misses', nearest_cache.hits, nearest_cache.misses)
+            LOG.info('TRANSPOSITIONS: %s hits, %s misses', transpositions.hits, transpositions.misses)
+            LOG.info('%s', scheduler)
+            LOG.info('%s', planner)
+            LOG.info('%s', orders)
+            LOG.info('%s', ctx)
+
+            # Send our set of commands to the Halite engine for this turn
+            ctx.send()
+        except hlt.networking.TurnTimeout:
+            LOG.warning('TURN %s OVERRAN ITS BUDGET, QUEUED COMMANDS SENT', ctx.turn)
+        finally:
+            # Keep what was actually sent, on time or not, so CACHED mode never replays an older turn's orders
+            with game.uninterruptible():
+                scheduler.remember(ctx.command_queue, {ship_id: planet_id for planet_id, ship_ids in
+                                                       ctx.expansion_tracker.items() for ship_id in ship_ids})
         # TURN END
     # GAME END
 except Exception as e:
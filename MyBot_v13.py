@@ -26,18 +26,18 @@ LOG.setLevel(logging.INFO)
 LOG.info("Starting my jbot !")
 
 
-def get_nearest_planet_for_ship(myship):
+def get_nearest_planet_for_ship(ctx, myship):
     """Get the nearest planet of any type for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -48,18 +48,18 @@ def get_nearest_planet_for_ship(myship):
                 return entity
 
 
-def get_nearest_unowned_planet_for_ship(myship):
+def get_nearest_unowned_planet_for_ship(ctx, myship):
     """Get the nearest unowned planet for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -71,18 +71,18 @@ def get_nearest_unowned_planet_for_ship(myship):
                     return entity
 
 
-def get_nearest_big_planet_i_own_for_ship(myship):
+def get_nearest_big_planet_i_own_for_ship(ctx, myship):
     """Get the nearest planet owned by me for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -95,18 +95,18 @@ def get_nearest_big_planet_i_own_for_ship(myship):
     return None
 
 
-def get_biggest_early_planet_for_ship(myship):
+def get_biggest_early_planet_for_ship(ctx, myship):
     """Get the nearest 3 unowned planet for the passed in ship.  Only used for turn 1 logic.
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         hlt.entity.Planet: Initial planet to inhabit.
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     three_planets = []
     for distance in sorted(entities_by_distance):
@@ -123,17 +123,18 @@ def get_biggest_early_planet_for_ship(myship):
                         return three_planets[0]
 
 
-def get_nearest_enemy_ship(myship):
+def get_nearest_enemy_ship(ctx, myship):
     """Get the nearest enemy ship
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship: One of my ships
 
     Returns:
         htl.entity.Ship: Nearest enemy ship
     """
     LOG.info('Finding nearest enemy ship')
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.info('entities: %s', entities_by_distance)
     for distance, entity_list in sorted(entities_by_distance.items()):
         LOG.info('checking entity_list: %s', entity_list)
@@ -149,15 +150,15 @@ def get_nearest_enemy_ship(myship):
                     return entity
 
 
-def nearby_enemy_docker(myship, all_players):
+def nearby_enemy_docker(ctx, myship):
     """
     Locate a nearby enemy ship docking
     """
-    for player in all_players:
+    for player in ctx.all_players:
         playerid = player.id
         player_ships = player.all_ships()
         player_ships.sort(key=lambda x: myship.calculate_distance_between(x))
-        if playerid != game_map.my_id:
+        if playerid != ctx.game_map.my_id:
             for enemy_ship in player_ships:
                 if enemy_ship.docking_status != enemy_ship.DockingStatus.UNDOCKED and myship.calculate_distance_between(enemy_ship) <= 10:
                     return enemy_ship
@@ -167,28 +168,24 @@ timedelta_2s = timedelta(seconds=2)
 timedelta_buffer = timedelta(milliseconds=300)
 try:
     TURN = 0
+    ctx = hlt.context.TurnContext(game)  # This turn's map, commands and derived state
     initial_planet = None
     while True:
         # TURN START
 
-        # Update the map for the new turn and get the latest version
-        game_map = game.update_map()
+        # Update the map for the new turn and start a new set of commands for the Halite engine
+        ctx.begin_turn()
         time_turnstart = datetime.utcnow()
         time_timeout = time_turnstart + timedelta_2s
-        TURN += 1
+        TURN = ctx.turn
         LOG.info('TURN %s START', TURN)
 
-        # Here we define the set of commands to be sent to the Halite engine at the end of the turn
-        command_queue = []
-
-        my_ships = game_map.get_me().all_ships()
-        all_players = game_map.all_players()
-        LOG.info('MY SHIPS: %s', len(my_ships))
+        LOG.info('MY SHIPS: %s', len(ctx.my_ships))
 
 
         # For every ship that I control
         shipcount = 0
-        for ship in my_ships:
+        for ship in ctx.my_ships:
             shipcount += 1
             time_now = datetime.utcnow()
 
@@ -203,42 +200,42 @@ try:
                 # Skip this ship
                 continue
             if not initial_planet and TURN is 1:
-                initial_planet = get_biggest_early_planet_for_ship(ship)
+                initial_planet = get_biggest_early_planet_for_ship(ctx, ship)
                 LOG.critical('GETTING INITIAL PLANET: id %s', initial_planet.id)
 
             # EARLY TURNS?  HUMP BIGGEST INITIAL PLANET
-            if len(my_ships) <= 10 and TURN <= 15:
+            if len(ctx.my_ships) <= 10 and TURN <= 15:
                 LOG.info('In early turns.  HUMP PLANET')
                 if ship.can_dock(initial_planet) and not initial_planet.is_full():
-                    command_queue.append(ship.dock(initial_planet))
+                    ctx.command_queue.append(ship.dock(initial_planet))
                     LOG.info('SHIP %s docking at initial planet %s', ship.id, initial_planet.id)
                     continue
                 elif not initial_planet.is_full():
                     navigate_command = ship.navigate(
                         ship.closest_point_to(initial_planet),
-                        game_map,
+                        ctx.game_map,
                         speed=hlt.constants.MAX_SPEED,
                         ignore_ships=False,
                         ignore_planets=False,
                         max_corrections=18,
                         angular_step=5)
                     if navigate_command:
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         LOG.info('SHIP %s going to initial planet %s', ship.id, initial_planet.id)
                         continue
 
             # EARLY-MID TURNS?  DEFEND INITIAL PLANET
-            if len(my_ships) <= 20 and TURN <= 30:
+            if len(ctx.my_ships) <= 20 and TURN <= 30:
                 LOG.info('In early-mid turns or initial planet full.  Defend initial planet.')
-                nearest_enemy_ship = get_nearest_enemy_ship(ship)
+                nearest_enemy_ship = get_nearest_enemy_ship(ctx, ship)
                 if ship.can_dock(initial_planet) and (ship.id % 2 == 0) and not initial_planet.is_full():
                     LOG.info('SHIP %s is modulus 2 and docking at initial planet %s', ship.id, initial_planet.id)
-                    command_queue.append(ship.dock(initial_planet))
+                    ctx.command_queue.append(ship.dock(initial_planet))
                     continue
                 else:
                     navigate_command = ship.navigate(
                         ship.closest_point_to(nearest_enemy_ship),
-                        game_map,
+                        ctx.game_map,
                         speed=int(hlt.constants.MAX_SPEED),
                         ignore_ships=False,
                         ignore_planets=False,
@@ -246,27 +243,27 @@ try:
                         angular_step=1)
                     if navigate_command:
                         LOG.info('SHIP %s is DEFENDING against %s', ship.id, nearest_enemy_ship.id)
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         continue
 
             # ATTACK ENEMY DOCKERS
-            enemy_docking_ship = nearby_enemy_docker(ship, all_players)
+            enemy_docking_ship = nearby_enemy_docker(ctx, ship)
             if enemy_docking_ship and TURN >= 40:
                 logging.info("SHIP %s FOUND NEARBY ENEMY DOCKING SHIP, ATTACKING SHIP %s", ship.id, enemy_docking_ship.id)
                 navigate_command = ship.navigate(
                     ship.closest_point_to(enemy_docking_ship),
-                    game_map,
+                    ctx.game_map,
                     speed=int(hlt.constants.MAX_SPEED),
                     max_corrections=18,
                     angular_step=5,
                     ignore_ships=False,
                     ignore_planets=False)
                 if navigate_command:
-                    command_queue.append(navigate_command)
+                    ctx.command_queue.append(navigate_command)
                     continue
 
-            nearest_planet = get_nearest_planet_for_ship(ship)
-            nearest_unowned_planet = get_nearest_unowned_planet_for_ship(ship)
+            nearest_planet = get_nearest_planet_for_ship(ctx, ship)
+            nearest_unowned_planet = get_nearest_unowned_planet_for_ship(ctx, ship)
             LOG.debug('ship %s, nearest ANY_planet: %s', ship, nearest_planet)
             LOG.debug('ship %s, nearest UNO_planet: %s', ship, nearest_unowned_planet)
 
@@ -274,59 +271,59 @@ try:
             if nearest_unowned_planet and (ship.id % 3 == 0):
                 LOG.info('SHIP %s going to nearest unowned planet %s', ship.id, nearest_unowned_planet.id)
                 if ship.can_dock(nearest_unowned_planet):
-                    command_queue.append(ship.dock(nearest_unowned_planet))
+                    ctx.command_queue.append(ship.dock(nearest_unowned_planet))
                     continue
                 else:
                     navigate_command = ship.navigate(
                         ship.closest_point_to(nearest_unowned_planet),
-                        game_map,
+                        ctx.game_map,
                         speed=int(hlt.constants.MAX_SPEED),
                         ignore_ships=False,
                         max_corrections=18,
                         angular_step=5)
                     if navigate_command:
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         continue
 
             # GO TO MY NEAREST PLANET AND DOCK
-            my_nearest_planet = get_nearest_big_planet_i_own_for_ship(ship)
+            my_nearest_planet = get_nearest_big_planet_i_own_for_ship(ctx, ship)
             if my_nearest_planet and (ship.id % 4 == 0):
                 if ship.can_dock(my_nearest_planet) and not my_nearest_planet.is_full():
                     LOG.info('SHIP %s is docking at my planet %s', ship.id, my_nearest_planet.id)
-                    command_queue.append(ship.dock(my_nearest_planet))
+                    ctx.command_queue.append(ship.dock(my_nearest_planet))
                     continue
                 elif not my_nearest_planet.is_full():
                     navigate_command = ship.navigate(
                         ship.closest_point_to(my_nearest_planet),
-                        game_map,
+                        ctx.game_map,
                         speed=int(hlt.constants.MAX_SPEED),
                         ignore_ships=False,
                         max_corrections=18,
                         angular_step=5)
                     if navigate_command:
                         LOG.info('SHIP %s going to my planet %s', ship.id, my_nearest_planet.id)
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         continue
 
             # ATTACK NEAREST ENEMY SHIP
-            nearest_enemy_ship = get_nearest_enemy_ship(ship)
+            nearest_enemy_ship = get_nearest_enemy_ship(ctx, ship)
             if nearest_enemy_ship:
                 LOG.info('SHIP %s ATTACKING NEAREST ENEMY SHIP %s', ship.id, nearest_enemy_ship.id)
                 navigate_command = ship.navigate(
                     ship.closest_point_to(nearest_enemy_ship),
-                    game_map,
+                    ctx.game_map,
                     speed=int(hlt.constants.MAX_SPEED),
                     max_corrections=18,
                     angular_step=5,
                     ignore_ships=False,
                     ignore_planets=False)
                 if navigate_command:
-                    command_queue.append(navigate_command)
+                    ctx.command_queue.append(navigate_command)
                     continue
             LOG.warning('SHIP %s NO COMMAND GIVEN', ship.id)
 
         # Send our set of commands to the Halite engine for this turn
-        game.send_command_queue(command_queue)
+        ctx.send()
         # TURN END
     # GAME END
 except Exception as e:
@@ -26,18 +26,18 @@ LOG.setLevel(logging.INFO)
 LOG.info("Starting my jbot !")
 
 
-def get_nearest_planet_for_ship(myship):
+def get_nearest_planet_for_ship(ctx, myship):
     """Get the nearest planet of any type for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -48,18 +48,18 @@ def get_nearest_planet_for_ship(myship):
                 return entity
 
 
-def get_nearest_unowned_planet_for_ship(myship):
+def get_nearest_unowned_planet_for_ship(ctx, myship):
     """Get the nearest unowned planet for the passed in ship
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         Planet: instance of a planet
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     for distance in sorted(entities_by_distance):
         entities = entities_by_distance[distance]
@@ -71,18 +71,18 @@ def get_nearest_unowned_planet_for_ship(myship):
                     return entity
 
 
-def get_nearest_3_unowned_planets_for_ship(myship):
+def get_nearest_3_unowned_planets_for_ship(ctx, myship):
     """Get the nearest 3 unowned planet for the passed in ship.  Only used for turn 1 logic.
 
     Args:
-        game_map: halite game_map instance
+        ctx (hlt.context.TurnContext): The current turn
         myship: any ship
 
     Returns:
         list: of planets
 
     """
-    entities_by_distance = game_map.nearby_entities_by_distance(myship)
+    entities_by_distance = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities by distance: %s', entities_by_distance)
     three_planets = []
     for distance in sorted(entities_by_distance):
@@ -97,17 +97,18 @@ def get_nearest_3_unowned_planets_for_ship(myship):
                         return three_planets
 
 
-def get_nearest_enemy_ship(myship):
+def get_nearest_enemy_ship(ctx, myship):
     """Get the nearest enemy ship
 
     Args:
+        ctx (hlt.context.TurnContext): The current turn
         myship: One of my ships
 
     Returns:
         htl.entity.Ship: Nearest enemy ship
     """
     LOG.info('Finding nearest enemy ship')
-    entities = game_map.nearby_entities_by_distance(myship)
+    entities = ctx.game_map.nearby_entities_by_distance(myship)
     LOG.debug('entities: %s', entities)
     for distance, entity_list in entities.items():
         LOG.debug('checking entity_list: %s', entity_list)
@@ -123,15 +124,15 @@ def get_nearest_enemy_ship(myship):
                     return entity
 
 
-def nearby_enemy_docker(myship, all_players):
+def nearby_enemy_docker(ctx, myship):
     """
     Locate a nearby enemy ship docking
     """
-    for player in all_players:
+    for player in ctx.all_players:
         playerid = player.id
         player_ships = player.all_ships()
         player_ships.sort(key=lambda x: myship.calculate_distance_between(x))
-        if playerid != game_map.my_id:
+        if playerid != ctx.game_map.my_id:
             for enemy_ship in player_ships:
                 if enemy_ship.docking_status == enemy_ship.DockingStatus.DOCKING and myship.calculate_distance_between(enemy_ship) <= 20:
                     return enemy_ship
@@ -141,28 +142,24 @@ timedelta_2s = timedelta(seconds=2)
 timedelta_buffer = timedelta(milliseconds=200)
 try:
     TURN = 0
+    ctx = hlt.context.TurnContext(game)  # This turn's map, commands and derived state
     early_shipmap = {}
     while True:
         # TURN START
         time_turnstart = datetime.utcnow()
         time_timeout = time_turnstart + timedelta_2s
 
-        # Update the map for the new turn and get the latest version
-        game_map = game.update_map()
-        TURN += 1
+        # Update the map for the new turn and start a new set of commands for the Halite engine
+        ctx.begin_turn()
+        TURN = ctx.turn
         LOG.info('TURN %s START', TURN)
 
-        # Here we define the set of commands to be sent to the Halite engine at the end of the turn
-        command_queue = []
-
-        my_ships = game_map.get_me().all_ships()
-        all_players = game_map.all_players()
         initial_3_planets = []
-        LOG.info('MY SHIPS: %s     %s', len(my_ships), my_ships)
+        LOG.info('MY SHIPS: %s     %s', len(ctx.my_ships), ctx.my_ships)
 
         # For every ship that I control
         shipcount = 0
-        for ship in my_ships:
+        for ship in ctx.my_ships:
             shipcount += 1
             time_now = datetime.utcnow()
 
@@ -178,11 +175,11 @@ try:
                 continue
 
             # EARLY TURNS?  DIVIDE AND CONQUER
-            if len(my_ships) == 3 and TURN <= 20:
+            if len(ctx.my_ships) == 3 and TURN <= 20:
                 LOG.info('In early turns.  Divide and Conquer')
                 navspeed = hlt.constants.MAX_SPEED if TURN >= 3 else hlt.constants.MAX_SPEED / 2
                 if not initial_3_planets:
-                    initial_3_planets = get_nearest_3_unowned_planets_for_ship(ship)
+                    initial_3_planets = get_nearest_3_unowned_planets_for_ship(ctx, ship)
                     LOG.info('INITIAL 3 PLANETS: %s', initial_3_planets)
                 if TURN == 1:
                     early_shipmap[ship.id] = initial_3_planets[shipcount - 1]
@@ -190,38 +187,38 @@ try:
                 go_to_planet = early_shipmap[ship.id]
                 LOG.info('SHIP %s going to unowned planet %s', ship.id, go_to_planet)
                 if ship.can_dock(go_to_planet):
-                    command_queue.append(ship.dock(go_to_planet))
+                    ctx.command_queue.append(ship.dock(go_to_planet))
                     continue
                 else:
                     navigate_command = ship.navigate(
                         ship.closest_point_to(go_to_planet),
-                        game_map,
+                        ctx.game_map,
                         speed=int(hlt.constants.MAX_SPEED),
                         ignore_ships=False,
                         max_corrections=18,
                         angular_step=5)
                     if navigate_command:
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         continue
 
             # ATTACK ENEMY DOCKERS
-            enemy_docking_ship = nearby_enemy_docker(ship, all_players)
+            enemy_docking_ship = nearby_enemy_docker(ctx, ship)
             if enemy_docking_ship and TURN >= 40:
                 logging.info("SHIP %s FOUND NEARBY ENEMY DOCKING SHIP, ATTACKING SHIP %s", ship.id, enemy_docking_ship.id)
                 navigate_command = ship.navigate(
                     ship.closest_point_to(enemy_docking_ship),
-                    game_map,
+                    ctx.game_map,
                     speed=int(hlt.constants.MAX_SPEED),
                     max_corrections=18,
                     angular_step=5,
                     ignore_ships=False,
                     ignore_planets=False)
                 if navigate_command:
-                    command_queue.append(navigate_command)
+                    ctx.command_queue.append(navigate_command)
                     continue
 
-            nearest_planet = get_nearest_planet_for_ship(ship)
-            nearest_unowned_planet = get_nearest_unowned_planet_for_ship(ship)
+            nearest_planet = get_nearest_planet_for_ship(ctx, ship)
+            nearest_unowned_planet = get_nearest_unowned_planet_for_ship(ctx, ship)
             LOG.debug('ship %s, nearest ANY_planet: %s', ship, nearest_planet)
             LOG.debug('ship %s, nearest UNO_planet: %s', ship, nearest_unowned_planet)
 
@@ -229,39 +226,39 @@ try:
             if nearest_unowned_planet and (ship.id % 2 == 0):
                 LOG.info('SHIP %s going to nearest unowned planet %s', ship.id, nearest_unowned_planet)
                 if ship.can_dock(nearest_unowned_planet):
-                    command_queue.append(ship.dock(nearest_unowned_planet))
+                    ctx.command_queue.append(ship.dock(nearest_unowned_planet))
                     continue
                 else:
                     navigate_command = ship.navigate(
                         ship.closest_point_to(nearest_unowned_planet),
-                        game_map,
+                        ctx.game_map,
                         speed=int(hlt.constants.MAX_SPEED),
                         ignore_ships=False,
                         max_corrections=18,
                         angular_step=5)
                     if navigate_command:
-                        command_queue.append(navigate_command)
+                        ctx.command_queue.append(navigate_command)
                         continue
 
             # ATTACK NEAREST ENEMY SHIP
-            nearest_enemy_ship = get_nearest_enemy_ship(ship)
+            nearest_enemy_ship = get_nearest_enemy_ship(ctx, ship)
             if nearest_enemy_ship:
                 LOG.info('SHIP %s ATTACKING NEAREST ENEMY SHIP %s', ship.id, nearest_enemy_ship.id)
                 navigate_command = ship.navigate(
                     ship.closest_point_to(nearest_enemy_ship),
-                    game_map,
+                    ctx.game_map,
                     speed=int(hlt.constants.MAX_SPEED),
                     max_corrections=18,
                     angular_step=5,
                     ignore_ships=False,
                     ignore_planets=False)
                 if navigate_command:
-                    command_queue.append(navigate_command)
+                    ctx.command_queue.append(navigate_command)
                     continue
             LOG.warning('SHIP %s NO COMMAND GIVEN', ship.id)
 
         # Send our set of commands to the Halite engine for this turn
-        game.send_command_queue(command_queue)
+        ctx.send()
         # TURN END
     # GAME END
 except Exception as e:
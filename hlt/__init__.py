@@ -6,6 +6,8 @@ the start, then in a loop, call get_map() to get the current game state, then
 build up a list of commands and send them with send_command_queue().
 """
 
-from . import collision, constants, entity, game_map, networking
+from . import assignment, collision, combat, constants, context, engagement, entity, events, game_map, influence, \
+    kinetic, motion, networking, orders, planner, positioning, production, scheduler, simulator, squad, telemetry, \
+    territory, transposition
 
 from .networking import Game
@@ -0,0 +1,195 @@
+"""
+Global ship-to-target assignment.
+
+Every turn the candidate targets (docking spots, enemy docked ships, threats to defend against) are collected
+with a capacity each, a single ships x targets cost matrix is built and the assignment minimizing the total cost
+is found with the Hungarian method. Targets are expanded into one column per unit of capacity, and every ship
+may also stay unassigned. Ships and targets out of each other's reach split into independent problems, which
+are solved separately:
+
+    targets = [Target(planet, planet.num_docking_spots), Target(enemy, 2, reach=60, bonus=50)]
+    orders = assign(my_undocked_ships, targets)
+"""
+import numpy as np
+
+
+class Target:
+    """
+    Something ships can be assigned to.
+
+    :ivar entity: The planet, ship or position to go to
+    :ivar capacity: How many ships it takes
+    :ivar reach: Ships farther than this (from the entity's surface) are never assigned to it
+    :ivar bonus: Distance-equivalent preference for this target over others
+    :ivar kind: Free-form label, e.g. 'expand' or 'defend'
+    """
+
+    def __init__(self, target_entity, capacity=1, reach=np.inf, bonus=0.0, kind=None):
+        self.entity = target_entity
+        self.capacity = capacity
+        self.reach = reach
+        self.bonus = bonus
+        self.kind = kind
+
+    def __str__(self):
+        return "Target {} {} (capacity: {}, reach: {}, bonus: {})"\
+            .format(self.kind, self.entity.id, self.capacity, self.reach, self.bonus)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment of every row to a distinct column (Hungarian method with Dijkstra-style shortest
+    augmenting paths). Rows whose cheapest column is still free are matched to it up front; every other row then
+    grows one shortest path tree over the columns, one vectorized step per column it reaches, and only the
+    columns it reached have their prices updated.
+
+    :param numpy.ndarray cost: (rows, columns) finite costs, rows <= columns
+    :return: (rows,) column assigned to each row
+    :rtype: numpy.ndarray
+    """
+    rows, columns = cost.shape
+    # Free columns keep a zero price, so every matched pair of the greedy start is tight
+    price = np.zeros(columns)
+    row_of = [-1] * columns
+    column_of = np.full(rows, -1, dtype=np.int64)
+    unmatched = []
+    for row, column in enumerate(cost.argmin(axis=1).tolist()):
+        if row_of[column] < 0:
+            row_of[column] = row
+            column_of[row] = column
+        else:
+            unmatched.append(row)
+
+    for root in unmatched:
+        # Reduced path lengths from the root to every column; reached columns are masked with inf
+        offset = -price
+        distance = cost[root] + offset
+        via = np.full(columns, root, dtype=np.int64)
+        reached = []
+        lengths = []
+        while True:
+            column = int(distance.argmin())
+            shortest = float(distance[column])
+            reached.append(column)
+            lengths.append(shortest)
+            row = row_of[column]
+            if row < 0:
+                break
+            offset[column] = np.inf
+            distance[column] = np.inf
+            through = cost[row] + (shortest - cost[row, column] + price[column])
+            through += offset
+            via[through < distance] = row
+            np.minimum(distance, through, out=distance)
+        price[reached] += np.array(lengths) - shortest
+        # Flip the augmenting path
+        while True:
+            row = int(via[column])
+            row_of[column] = row
+            column, column_of[row] = column_of[row], column
+            if row == root:
+                break
+    return column_of
+
+
+def solve(cost, reserve):
+    """
+    Minimum-cost partial assignment: every row and column is used at most once and a row may stay unassigned
+    at the reserve cost. Pairs with infinite cost are never assigned.
+
+    :param numpy.ndarray cost: (rows, columns) costs, inf for forbidden pairs
+    :param float reserve: Cost of leaving a row (or column) unassigned; dearer pairs are never assigned
+    :return: (rows,) column assigned to each row, -1 if unassigned
+    :rtype: numpy.ndarray
+    """
+    rows, columns = cost.shape
+    choice = np.full(rows, -1, dtype=np.int64)
+    if not rows or not columns:
+        return choice
+    # The shorter side is matched against the longer side plus one "unassigned" column per member
+    transposed = rows > columns
+    matrix = cost.T if transposed else cost
+    short, long = matrix.shape
+    allowed = np.isfinite(matrix) & (matrix <= reserve)
+    matrix = np.concatenate((np.where(allowed, matrix, reserve + 1), np.full((short, short), reserve)), axis=1)
+    assigned = hungarian(matrix)
+    real = assigned < long
+    real[real] = allowed[np.flatnonzero(real), assigned[real]]
+    if transposed:
+        choice[assigned[real]] = np.flatnonzero(real)
+    else:
+        choice[real] = assigned[real]
+    return choice
+
+
+def cost_matrix(ships, targets):
+    """
+    :param list[entity.Ship] ships: The ships
+    :param list[Target] targets: The targets
+    :return: (ships, targets) distance to each target's surface less its bonus, inf beyond its reach
+    :rtype: numpy.ndarray
+    """
+    ship_pos = np.array([(ship.x, ship.y) for ship in ships]).reshape(-1, 2)
+    target_pos = np.array([(target.entity.x, target.entity.y) for target in targets]).reshape(-1, 2)
+    radius = np.array([target.entity.radius for target in targets])
+    reach = np.array([target.reach for target in targets], dtype=float)
+    bonus = np.array([target.bonus for target in targets], dtype=float)
+    offset = target_pos[np.newaxis] - ship_pos[:, np.newaxis]
+    distance = np.hypot(offset[..., 0], offset[..., 1]) - radius
+    return np.where(distance <= reach, distance - bonus, np.inf)
+
+
+def _groups(allowed):
+    """
+    Connected components of a bipartite graph, by label propagation.
+
+    :param numpy.ndarray allowed: (rows, columns) edges
+    :return: (rows,) and (columns,) component label of every row and column; columns without edges get -1
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    rows = np.arange(allowed.shape[0])
+    missing = allowed.shape[0]
+    while True:
+        columns = np.where(allowed, rows[:, np.newaxis], missing).min(axis=0)
+        relabelled = np.minimum(rows, np.where(allowed, columns[np.newaxis], missing).min(axis=1))
+        if np.array_equal(relabelled, rows):
+            return rows, np.where(columns < missing, columns, -1)
+        rows = relabelled
+
+
+def assign(ships, targets, max_cost=np.inf):
+    """
+    Assign ships to targets, respecting capacities and minimizing the total cost.
+
+    :param list[entity.Ship] ships: The ships to assign
+    :param list[Target] targets: The candidate targets
+    :param float max_cost: Ships only take targets cheaper than this; otherwise they stay unassigned
+    :return: The target of every assigned ship, keyed by ship id
+    :rtype: dict[int, Target]
+    """
+    targets = [target for target in targets if target.capacity > 0]
+    if not ships or not targets:
+        return {}
+    cost = cost_matrix(ships, targets)
+    if not np.isfinite(max_cost):
+        finite = cost[np.isfinite(cost)]
+        max_cost = finite.max() + 1 if len(finite) else 0.0
+
+    # Pairs beyond reach or max_cost are never assigned, so the ships and targets they leave unconnected are
+    # independent problems; each is solved on its own, ships in reach of nothing are skipped and no target gets
+    # more columns than it has ships in reach
+    allowed = cost <= max_cost
+    ship_group, target_group = _groups(allowed)
+    capacities = np.minimum([target.capacity for target in targets], allowed.sum(axis=0))
+    assigned = {}
+    for label in np.unique(target_group[target_group >= 0]).tolist():
+        rows = np.flatnonzero(ship_group == label)
+        group = np.flatnonzero(target_group == label)
+        columns = np.repeat(group, capacities[group])
+        choice = solve(cost[np.ix_(rows, columns)], max_cost)
+        assigned.update((ships[row].id, targets[columns[column]])
+                        for row, column in zip(rows.tolist(), choice.tolist()) if column >= 0)
+    return assigned
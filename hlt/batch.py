@@ -0,0 +1,197 @@
+"""
+Batched self-play: many independent games held in one simulator.State and advanced with one vectorized step
+per turn. Policies are written against the batch, filling the commands of one player for every game at once:
+
+    def policy(state, player, commands):
+        ...
+
+Run as a module to benchmark throughput against stepping the same games one at a time:
+
+    python3 -m hlt.batch --games 256 --turns 100
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from . import constants, engine, simulator
+
+
+class BatchSimulator:
+    """
+    N independent games stepped together.
+
+    :ivar state: The simulator state of all games
+    :ivar turns_played: Total number of game-turns simulated so far
+    """
+
+    def __init__(self, games, players=2, width=240, height=160, seed=None):
+        """
+        :param int games: Number of games
+        :param int players: Players per game, 2 or 4
+        :param int width: Map width
+        :param int height: Map height
+        :param int seed: Seed of the first map; game g uses seed + g
+        """
+        self.state = engine.generate(width, height, players, seed, games=games)
+        self.turns_played = 0
+
+    def finished(self):
+        """
+        :return: (games,) whether each game is over
+        :rtype: numpy.ndarray
+        """
+        return simulator.finished(self.state)
+
+    def step(self, policies):
+        """
+        Ask every policy for its commands and advance all unfinished games by one turn.
+
+        :param list policies: One policy per player, called as policy(state, player, commands)
+        :return: nothing
+        """
+        commands = simulator.Commands(self.state)
+        for player, policy in enumerate(policies):
+            policy(self.state, player, commands)
+        self.turns_played += int((~self.finished()).sum())
+        simulator.step(self.state, commands)
+
+    def run(self, policies, max_turns=None):
+        """
+        Play until every game is over or max_turns turns have been played.
+
+        :param list policies: One policy per player
+        :param int max_turns: Optional cap on the number of turns
+        :return: (games,) id of the winner of each game
+        :rtype: numpy.ndarray
+        """
+        turns = 0
+        while not self.finished().all() and (max_turns is None or turns < max_turns):
+            self.step(policies)
+            turns += 1
+        return self.winners()
+
+    def winners(self):
+        """
+        :return: (games,) id of the best ranked player of each game
+        :rtype: numpy.ndarray
+        """
+        return np.array([simulator.rankings(self.state, game)[0] for game in range(self.state.games)])
+
+
+def _nearest(sources, targets, valid):
+    """
+    :param numpy.ndarray sources: (games, ships, 2) positions
+    :param numpy.ndarray targets: (games, targets, 2) positions
+    :param numpy.ndarray valid: (games, ships, targets) allowed pairs
+    :return: (games, ships) index of the nearest valid target and (games, ships) its distance (inf if none)
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    distance = np.linalg.norm(targets[:, np.newaxis] - sources[:, :, np.newaxis], axis=-1)
+    distance = np.where(valid, distance, np.inf)
+    index = distance.argmin(axis=-1)
+    return index, np.take_along_axis(distance, index[..., np.newaxis], axis=-1)[..., 0]
+
+
+def _move_towards(state, commands, mask, targets, stop_short):
+    """
+    Thrust the masked ships straight towards their targets, stopping stop_short before them.
+
+    :return: nothing
+    """
+    offset = targets - state.ship_pos
+    distance = np.linalg.norm(offset, axis=-1)
+    angles = np.degrees(np.arctan2(offset[..., 1], offset[..., 0]))
+    commands.thrust_many(mask, np.minimum(distance - stop_short, constants.MAX_SPEED), angles)
+
+
+def idle_policy(state, player, commands):
+    """
+    Do nothing.
+    """
+
+
+def settler_policy(state, player, commands):
+    """
+    Send every undocked ship to the nearest planet it may dock to and dock there; ships with nowhere to settle
+    attack the nearest enemy ship.
+    """
+    mine = state.ship_alive & (state.ship_owner == player) & (state.ship_status == simulator.UNDOCKED)
+    open_planet = state.planet_alive & ((state.planet_owner < 0) | (state.planet_owner == player)) \
+        & (state.docked_counts() < state.planet_spots)
+    planet, distance = _nearest(state.ship_pos, state.planet_pos,
+                                np.broadcast_to(open_planet[:, np.newaxis], mine.shape + open_planet.shape[1:]))
+    radius = np.take_along_axis(state.planet_radius, planet, axis=1)
+    can_dock = mine & (distance <= radius + constants.DOCK_RADIUS + constants.SHIP_RADIUS)
+    commands.kind[can_dock] = simulator.DOCK
+    commands.planet[can_dock] = planet[can_dock]
+
+    travelling = mine & ~can_dock & np.isfinite(distance)
+    planet_pos = np.take_along_axis(state.planet_pos, planet[..., np.newaxis], axis=1)
+    _move_towards(state, commands, travelling, planet_pos, radius + constants.DOCK_RADIUS / 2)
+
+    attack_policy(state, player, commands, mine & ~np.isfinite(distance))
+
+
+def attack_policy(state, player, commands, mask=None):
+    """
+    Send every undocked ship (or only the masked ones) to the nearest enemy ship.
+    """
+    if mask is None:
+        mask = state.ship_alive & (state.ship_owner == player) & (state.ship_status == simulator.UNDOCKED)
+    enemies = state.ship_alive & (state.ship_owner != player)
+    target, distance = _nearest(state.ship_pos, state.ship_pos,
+                                np.broadcast_to(enemies[:, np.newaxis], mask.shape + enemies.shape[1:]))
+    chasing = mask & np.isfinite(distance)
+    target_pos = np.take_along_axis(state.ship_pos, target[..., np.newaxis], axis=1)
+    _move_towards(state, commands, chasing, target_pos, constants.WEAPON_RADIUS / 2)
+
+
+def benchmark(games, turns, policies=(settler_policy, settler_policy), seed=0):
+    """
+    Measure throughput of the batched simulator against stepping the same games one at a time.
+
+    :param int games: Number of games
+    :param int turns: Turns to play per game (fewer if a game ends earlier)
+    :param tuple policies: One policy per player
+    :param int seed: Seed of the first map
+    :return: Game-turns per second, batched and sequential
+    :rtype: (float, float)
+    """
+    batch = BatchSimulator(games, len(policies), seed=seed)
+    started = time.perf_counter()
+    batch.run(policies, turns)
+    batched = batch.turns_played / (time.perf_counter() - started)
+
+    played = 0
+    started = time.perf_counter()
+    for game in range(games):
+        single = BatchSimulator(1, len(policies), seed=seed + game)
+        single.run(policies, turns)
+        played += single.turns_played
+    sequential = played / (time.perf_counter() - started)
+    return batched, sequential
+
+
+def main(argv=None):
+    """
+    Command line entry point for the benchmark.
+
+    :param list[str] argv: The arguments (default: sys.argv[1:])
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the batched Halite II simulator.")
+    parser.add_argument('--games', type=int, default=256, help='Number of games')
+    parser.add_argument('--turns', type=int, default=100, help='Turns per game')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first map')
+    args = parser.parse_args(argv)
+
+    batched, sequential = benchmark(args.games, args.turns, seed=args.seed)
+    sys.stdout.write("batched:    {:10.0f} game-turns/s\n".format(batched))
+    sys.stdout.write("sequential: {:10.0f} game-turns/s\n".format(sequential))
+    sys.stdout.write("speedup:    {:10.1f}x\n".format(batched / sequential))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Vectorized prediction of ship-to-ship combat.
+
+Every ship on the map is advanced together for a few turns under the engine's weapon rules: an undocked ship
+whose weapon is ready fires at every enemy ship within WEAPON_RADIUS of its edge and splits WEAPON_DAMAGE evenly
+between them, then waits WEAPON_COOLDOWN turns. Undocked ships are assumed to close in on their nearest enemy
+at MAX_SPEED; docked ships neither move nor fire. Ships far apart never interact, so one call evaluates every
+engagement on the map at once:
+
+    prediction = forecast(game_map, turns=3)
+    if not prediction.survives(ship.id):
+        ...
+"""
+import numpy as np
+
+from . import constants, entity, simulator
+
+
+class Forecast:
+    """
+    Predicted health of every ship over the next turns.
+
+    :ivar ids: (ships,) ship ids
+    :ivar owners: (ships,) owning player ids
+    :ivar labels: (ships,) engagement each ship belongs to; ships only fight within their engagement
+    :ivar health: (turns + 1, ships) health at the start of each turn, 0 once destroyed
+    """
+
+    def __init__(self, ids, owners, labels, health):
+        self.ids = ids
+        self.owners = owners
+        self.labels = labels
+        self.health = health
+        self._index = {ship_id: index for index, ship_id in enumerate(ids.tolist())}
+
+    @property
+    def turns(self):
+        """
+        :return: Number of turns predicted
+        :rtype: int
+        """
+        return len(self.health) - 1
+
+    def health_of(self, ship_id, turn=None):
+        """
+        :param int ship_id: The ship
+        :param int turn: Turns from now (default: the end of the forecast)
+        :return: The ship's predicted health, 0 if destroyed or unknown
+        :rtype: int
+        """
+        index = self._index.get(ship_id)
+        if index is None:
+            return 0
+        return int(self.health[self.turns if turn is None else turn, index])
+
+    def survives(self, ship_id):
+        """
+        :param int ship_id: The ship
+        :return: True if the ship is predicted to be alive at the end of the forecast
+        :rtype: bool
+        """
+        return self.health_of(ship_id) > 0
+
+    def death_turn(self, ship_id):
+        """
+        :param int ship_id: The ship
+        :return: Turns from now until the ship is destroyed, None if it survives the forecast
+        :rtype: int
+        """
+        index = self._index.get(ship_id)
+        if index is None:
+            return None
+        dead = np.flatnonzero(self.health[:, index] <= 0)
+        return int(dead[0]) if len(dead) else None
+
+    def margins(self, player_id):
+        """
+        Net outcome of every engagement for one player: health it is predicted to lose subtracted from health its
+        opponents are predicted to lose.
+
+        :param int player_id: The player
+        :return: Mapping of engagement label to margin; positive when the player wins the exchange
+        :rtype: dict[int, int]
+        """
+        lost = self.health[0] - self.health[-1]
+        sign = np.where(self.owners == player_id, -1, 1)
+        labels = self.labels[self.labels >= 0]
+        totals = np.bincount(labels, weights=(sign * lost)[self.labels >= 0]) if len(labels) else np.zeros(0)
+        return {label: int(totals[label]) for label in np.unique(labels).tolist()}
+
+    def __str__(self):
+        survivors = int((self.health[-1] > 0).sum())
+        return "Forecast over {} turns ({} of {} ships survive)".format(self.turns, survivors, len(self.ids))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def predict(pos, owners, health, cooldown, undocked, labels, turns=3, approach=True):
+    """
+    Array core of the forecast.
+
+    :param numpy.ndarray pos: (ships, 2) positions
+    :param numpy.ndarray owners: (ships,) owning player ids
+    :param numpy.ndarray health: (ships,) health
+    :param numpy.ndarray cooldown: (ships,) remaining weapon cooldown
+    :param numpy.ndarray undocked: (ships,) whether each ship is free to move and fire
+    :param numpy.ndarray labels: (ships,) engagement labels; -1 keeps a ship out of combat
+    :param int turns: Number of turns to predict
+    :param bool approach: Whether undocked ships close in on their nearest enemy
+    :return: (turns + 1, ships) health at the start of each turn
+    :rtype: numpy.ndarray
+    """
+    pos = np.array(pos, dtype=float).reshape(-1, 2)
+    owners, labels = np.asarray(owners), np.asarray(labels)
+    undocked = np.asarray(undocked, dtype=bool)
+    health = np.array(health, dtype=np.int64)
+    cooldown = np.array(cooldown, dtype=np.int64)
+    history = np.zeros((turns + 1, len(health)), dtype=np.int64)
+    history[0] = health
+    if not len(health):
+        return history
+    hostile = (owners[:, np.newaxis] != owners[np.newaxis]) & (labels[:, np.newaxis] == labels[np.newaxis]) \
+        & (labels[:, np.newaxis] >= 0)
+
+    for turn in range(1, turns + 1):
+        alive = health > 0
+        enemies = hostile & alive[:, np.newaxis] & alive[np.newaxis]
+        offset = pos[np.newaxis] - pos[:, np.newaxis]
+        distance = np.linalg.norm(offset, axis=-1)
+
+        start = distance
+        if approach:
+            nearest = np.where(enemies, distance, np.inf).argmin(axis=1)
+            gap = distance[np.arange(len(pos)), nearest]
+            moving = undocked & alive & np.isfinite(np.where(enemies, distance, np.inf).min(axis=1, initial=np.inf))
+            step = np.where(moving, np.clip(gap - constants.WEAPON_RADIUS, 0, constants.MAX_SPEED), 0)
+            direction = offset[np.arange(len(pos)), nearest] / np.maximum(gap, 1e-9)[:, np.newaxis]
+            pos = pos + direction * step[:, np.newaxis]
+            distance = np.linalg.norm(pos[np.newaxis] - pos[:, np.newaxis], axis=-1)
+
+        cooldown = np.maximum(cooldown - 1, 0)
+        ready = alive & undocked & (cooldown == 0)
+        targets = ready[:, np.newaxis] & enemies & (np.minimum(start, distance) <= simulator.ATTACK_RANGE)
+        count = targets.sum(axis=1)
+        per_target = np.where(count > 0, constants.WEAPON_DAMAGE // np.maximum(count, 1), 0)
+        damage = (targets * per_target[:, np.newaxis]).sum(axis=0)
+        cooldown[count > 0] = constants.WEAPON_COOLDOWN
+
+        health = np.maximum(health - damage, 0)
+        history[turn] = health
+    return history
+
+
+def forecast(game_map, turns=3, labels=None, approach=True):
+    """
+    Predict every engagement on the map in one pass.
+
+    :param game_map.Map game_map: The current map
+    :param int turns: Number of turns to predict
+    :param dict[int, int] labels: Optional engagement label per ship id; ships without a label are left out of
+        combat. By default all ships form one engagement.
+    :param bool approach: Whether undocked ships close in on their nearest enemy
+    :return: The forecast
+    :rtype: Forecast
+    """
+    return forecast_ships(list(game_map.ships_by_id().values()), turns, labels, approach)
+
+
+def forecast_ships(ships, turns=3, labels=None, approach=True):
+    """
+    Predict the fights between the given ships only, e.g. the members of one engagement cluster.
+
+    :param list[entity.Ship] ships: The ships
+    :param int turns: Number of turns to predict
+    :param dict[int, int] labels: Optional engagement label per ship id, as for forecast
+    :param bool approach: Whether undocked ships close in on their nearest enemy
+    :return: The forecast
+    :rtype: Forecast
+    """
+    ids = np.array([ship.id for ship in ships], dtype=np.int64)
+    owners = np.array([ship.owner.id for ship in ships], dtype=np.int64)
+    if labels is None:
+        ship_labels = np.zeros(len(ships), dtype=np.int64)
+    else:
+        ship_labels = np.array([labels.get(ship.id, -1) for ship in ships], dtype=np.int64)
+    history = predict(
+        [(ship.x, ship.y) for ship in ships], owners,
+        [ship.health for ship in ships], [ship._weapon_cooldown for ship in ships],
+        np.array([ship.docking_status == entity.Ship.DockingStatus.UNDOCKED for ship in ships], dtype=bool),
+        ship_labels, turns, approach)
+    return Forecast(ids, owners, ship_labels, history)
@@ -22,3 +22,5 @@ DOCK_TURNS = 5
 BASE_PRODUCTIVITY = 6
 #: Distance from the planets edge at which new ships are created
 SPAWN_RADIUS = 2.0
+#: Production a planet has to accumulate to spawn a new ship
+PRODUCTION_PER_SHIP = 72
@@ -0,0 +1,201 @@
+"""
+Per-turn context for bots.
+
+A TurnContext holds the current map and command queue, and computes each derived per-turn quantity (my ships,
+enemy ships, planets by owner, ...) at most once per turn, on first use. Bots add their own quantities with
+register(). All of them are dropped in one place, begin_turn(), which also runs the hooks that bring cross-turn
+caches up to date, so nothing derived from an old map can leak into a new turn:
+
+    ctx = TurnContext(game)
+    ctx.register('leader', find_leader)
+    ctx.on_turn(lambda ctx: nearest_cache.begin_turn())
+    while True:
+        ctx.begin_turn()
+        for ship in ctx.my_ships:
+            ...
+            ctx.command_queue.append(command)
+        ctx.send()
+"""
+from . import telemetry
+
+
+class TurnContext:
+    """
+    The state of one turn, with lazily memoized derived quantities.
+
+    :ivar game: The game being played
+    :ivar turn: Number of turns so far
+    :ivar game_map: The current map
+    :ivar command_queue: The commands to send this turn
+    :ivar hits: Derived quantities served from the memo this turn
+    :ivar misses: Derived quantities computed this turn
+    """
+
+    def __init__(self, game, stats=telemetry.default):
+        """
+        :param networking.Game game: The game being played
+        :param telemetry.Telemetry stats: Where the computation of derived quantities is timed
+        """
+        self.game = game
+        self.turn = 0
+        self.game_map = game.map
+        self.command_queue = []
+        self.hits = 0
+        self.misses = 0
+        self._stats = stats
+        self._derived = {}
+        self._hooks = []
+        self._memo = {}
+
+    def register(self, name, function):
+        """
+        Add a derived quantity, available as an attribute of the context.
+
+        :param str name: The attribute name
+        :param function: Called as function(ctx) the first time the quantity is used in a turn
+        :return: nothing
+        """
+        self._derived[name] = function
+
+    def on_turn(self, hook):
+        """
+        Run a function at the start of every turn, once the new map is parsed and the memo cleared.
+
+        :param hook: Called as hook(ctx)
+        :return: nothing
+        """
+        self._hooks.append(hook)
+
+    def begin_turn(self):
+        """
+        Read the next map and invalidate everything derived from the previous one.
+
+        :raises networking.TurnTimeout: Once the hooks are done, if the turn budget ran out while they ran
+        :return: The new map
+        :rtype: game_map.Map
+        """
+        self.game_map = self.game.update_map()
+        self.turn += 1
+        self._memo.clear()
+        self.hits = 0
+        self.misses = 0
+        self.command_queue = []
+        self.game.watch(self.command_queue)
+        # Hooks update state that outlives the turn, so a timeout must not stop them halfway
+        with self.game.uninterruptible():
+            for hook in self._hooks:
+                hook(self)
+        return self.game_map
+
+    def send(self):
+        """
+        Send this turn's commands.
+
+        :return: nothing
+        """
+        self.game.send_command_queue(self.command_queue)
+
+    def memoized(self, name, function):
+        """
+        :param str name: The quantity
+        :param function: Called as function(ctx) if the quantity is not known yet this turn
+        :return: The quantity's value this turn
+        """
+        try:
+            value = self._memo[name]
+        except KeyError:
+            self.misses += 1
+            with self._stats.timer('context ' + name):
+                value = self._memo[name] = function(self)
+            return value
+        self.hits += 1
+        return value
+
+    def __getattr__(self, name):
+        derived = self.__dict__.get('_derived', {}).get(name)
+        if derived is None:
+            raise AttributeError("{} has no attribute {!r}".format(type(self).__name__, name))
+        return self.memoized(name, derived)
+
+    @property
+    def events(self):
+        """
+        :return: What changed since the previous map, if the game tracks events
+        :rtype: list[events.MapEvent]
+        """
+        return self.game.events
+
+    @property
+    def my_id(self):
+        """
+        :return: The bot's player id
+        :rtype: int
+        """
+        return self.game_map.my_id
+
+    @property
+    def me(self):
+        """
+        :rtype: game_map.Player
+        """
+        return self.memoized('me', lambda ctx: ctx.game_map.get_me())
+
+    @property
+    def all_players(self):
+        """
+        :rtype: list[game_map.Player]
+        """
+        return self.memoized('all_players', lambda ctx: ctx.game_map.all_players())
+
+    @property
+    def all_planets(self):
+        """
+        :rtype: list[entity.Planet]
+        """
+        return self.memoized('all_planets', lambda ctx: ctx.game_map.all_planets())
+
+    @property
+    def my_planets(self):
+        """
+        :return: The bot's planets, keyed by id
+        :rtype: dict[int, entity.Planet]
+        """
+        return self.memoized('my_planets', lambda ctx: ctx.game_map.planets_owned_by(ctx.my_id))
+
+    @property
+    def all_ships(self):
+        """
+        :return: Every ship, keyed by id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.memoized('all_ships', lambda ctx: ctx.game_map.ships_by_id())
+
+    @property
+    def my_ships(self):
+        """
+        :rtype: list[entity.Ship]
+        """
+        return self.memoized('my_ships', lambda ctx: ctx.me.all_ships())
+
+    @property
+    def my_undocked_ships(self):
+        """
+        :return: The bot's undocked ships, keyed by id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.memoized('my_undocked_ships', lambda ctx: ctx.game_map.undocked_ships(ctx.my_id))
+
+    @property
+    def enemy_ships(self):
+        """
+        :return: Every other player's ships, keyed by id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.memoized('enemy_ships', lambda ctx: {ship_id: ship for ship_id, ship in ctx.all_ships.items()
+                                                         if ship.owner.id != ctx.my_id})
+
+    def __str__(self):
+        return "TurnContext turn {} ({} computed, {} reused)".format(self.turn, self.misses, self.hits)
+
+    def __repr__(self):
+        return self.__str__()
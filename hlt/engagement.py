@@ -0,0 +1,210 @@
+"""
+Decomposition of the map into independent combat clusters.
+
+Two ships of different players are linked when they could come within weapon range of each other during the
+next turn, i.e. when they are at most 2 * MAX_SPEED + WEAPON_RADIUS apart and at least one of them is undocked.
+The connected components of that graph are the engagements; ships in different engagements cannot affect each
+other's fights this turn, so each engagement can be solved on its own (and in parallel) while every ship outside
+one takes the cheap macro path.
+"""
+import numpy as np
+
+from . import combat, constants
+
+#: Distance within which two ships can reach weapon range of each other in one turn
+LINK_DISTANCE = 2 * constants.MAX_SPEED + constants.WEAPON_RADIUS
+
+
+class Cluster:
+    """
+    One engagement: a connected group of ships of at least two players.
+
+    :ivar id: Index of the cluster within the turn
+    :ivar ships: The ships in the cluster
+    :ivar players: Ids of the players with ships in the cluster
+    """
+
+    def __init__(self, cluster_id, ships):
+        self.id = cluster_id
+        self.ships = ships
+        self.players = {ship.owner.id for ship in ships}
+
+    def ships_of(self, player_id):
+        """
+        :param int player_id: A player
+        :return: The player's ships in the cluster
+        :rtype: list[entity.Ship]
+        """
+        return [ship for ship in self.ships if ship.owner.id == player_id]
+
+    def __len__(self):
+        return len(self.ships)
+
+    def __str__(self):
+        return "Cluster {} ({} ships, players: {})".format(self.id, len(self.ships), sorted(self.players))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _components(size, first, second):
+    """
+    Union-find over an edge list.
+
+    :param int size: Number of nodes
+    :param numpy.ndarray first: Edge start nodes
+    :param numpy.ndarray second: Edge end nodes
+    :return: (size,) component root of every node
+    :rtype: numpy.ndarray
+    """
+    parent = list(range(size))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b in zip(first.tolist(), second.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([find(node) for node in range(size)], dtype=np.int64)
+
+
+def _close_pairs(pos, distance):
+    """
+    All pairs of points at most a distance apart, found by bucketing the points into a grid of cells that size and
+    only comparing points in the same or adjacent cells, so the cost grows with the number of close pairs rather
+    than with the square of the number of points.
+
+    :param numpy.ndarray pos: (points, 2) coordinates
+    :param float distance: Maximum distance of a pair
+    :return: (pairs,) first and (pairs,) second point of every pair, first < second
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    cells = np.floor(pos / distance).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # Column-major cell keys, the rows padded by one on either side so that neighbouring keys never wrap
+    stride = int(cells[:, 1].max()) + 3
+    keys = cells[:, 0] * stride + cells[:, 1] + 1
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    first, second = [], []
+    # The same cell and the four neighbours ahead of it in key order, so every pair of cells is visited once
+    for step in (0, 1, stride - 1, stride, stride + 1):
+        if step:
+            start = np.searchsorted(sorted_keys, sorted_keys + step, side='left')
+        else:
+            # Within a cell, only the points after this one
+            start = np.arange(len(order)) + 1
+        stop = np.searchsorted(sorted_keys, sorted_keys + step, side='right')
+        counts = np.maximum(stop - start, 0)
+        total = int(counts.sum())
+        if not total:
+            continue
+        near = np.repeat(np.arange(len(order)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        first.append(order[near])
+        second.append(order[np.repeat(start, counts) + offsets])
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    first, second = np.concatenate(first), np.concatenate(second)
+    close = np.hypot(*(pos[first] - pos[second]).T) <= distance
+    first, second = first[close], second[close]
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+class Engagements:
+    """
+    The engagements of one turn. Build a new instance every turn.
+
+    :ivar clusters: Clusters with ships of at least two players, largest first
+    """
+
+    def __init__(self, game_map, link_distance=LINK_DISTANCE):
+        """
+        :param game_map.Map game_map: The current map
+        :param float link_distance: Maximum centre-to-centre distance of linked ships
+        """
+        ships = list(game_map.ships_by_id().values())
+        self.clusters = []
+        self._cluster_of = {}
+        if not ships:
+            return
+
+        pos = np.array([(ship.x, ship.y) for ship in ships])
+        owners = np.array([ship.owner.id for ship in ships])
+        undocked = np.array([ship.docking_status == ship.DockingStatus.UNDOCKED for ship in ships])
+        first, second = _close_pairs(pos, link_distance)
+        linked = (owners[first] != owners[second]) & (undocked[first] | undocked[second])
+        first, second = first[linked], second[linked]
+        roots = _components(len(ships), first, second)
+
+        members = {}
+        for index in np.unique(np.concatenate((first, second))).tolist():
+            members.setdefault(roots[index], []).append(ships[index])
+        for group in sorted(members.values(), key=len, reverse=True):
+            cluster = Cluster(len(self.clusters), group)
+            self.clusters.append(cluster)
+            for ship in group:
+                self._cluster_of[ship.id] = cluster
+
+    def cluster_of(self, ship_id):
+        """
+        :param int ship_id: A ship
+        :return: The cluster the ship fights in, or None if it is not engaged
+        :rtype: Cluster
+        """
+        return self._cluster_of.get(ship_id)
+
+    def labels(self):
+        """
+        :return: Cluster id of every engaged ship, as taken by combat.forecast
+        :rtype: dict[int, int]
+        """
+        return {ship_id: cluster.id for ship_id, cluster in self._cluster_of.items()}
+
+    def solve(self, function, executor=None):
+        """
+        Apply a function to every cluster independently.
+
+        :param function: Called as function(cluster); must be picklable when an executor is given
+        :param concurrent.futures.Executor executor: Optional executor to solve the clusters in parallel
+        :return: Mapping of cluster id to result
+        :rtype: dict
+        """
+        mapper = executor.map if executor is not None else map
+        return dict(zip((cluster.id for cluster in self.clusters), mapper(function, self.clusters)))
+
+    def forecast(self, turns=3, executor=None):
+        """
+        Predict every engagement separately, so the cost grows with cluster size rather than fleet size.
+
+        :param int turns: Number of turns to predict
+        :param concurrent.futures.Executor executor: Optional executor to predict the clusters in parallel
+        :return: Mapping of cluster id to its forecast
+        :rtype: dict[int, combat.Forecast]
+        """
+        return self.solve(_ClusterForecast(turns), executor)
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def __str__(self):
+        return "Engagements ({} clusters, {} ships engaged)".format(len(self.clusters), len(self._cluster_of))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class _ClusterForecast:
+    """
+    Picklable callable forecasting one cluster.
+    """
+
+    def __init__(self, turns):
+        self.turns = turns
+
+    def __call__(self, cluster):
+        return combat.forecast_ships(cluster.ships, self.turns)
@@ -0,0 +1,254 @@
+"""
+Local Halite II game runner.
+
+Plays bots against each other in-process on top of hlt.simulator, speaking the same protocol as the official
+halite binary, so any bot built on hlt.networking runs against it unchanged:
+
+    python3 -m hlt.engine -d "240 160" "python3 MyBot.py" "python3 MyBot.py"
+
+The map generator mirrors the official one in spirit (symmetric planets, three starting ships per player) but
+does not reproduce its maps.
+"""
+import argparse
+import logging
+import math
+import queue
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+from . import constants, simulator
+
+#: Seconds a bot may take to initialize
+INIT_TIMEOUT = 60.0
+#: Seconds a bot may take per turn
+TURN_TIMEOUT = 2.0
+
+
+def generate(width, height, players, seed=None, planets_per_player=6, games=1):
+    """
+    Generate symmetric starting positions.
+
+    :param int width: Map width
+    :param int height: Map height
+    :param int players: Number of players, 2 or 4
+    :param int seed: Random seed; game g of the batch uses seed + g
+    :param int planets_per_player: Number of planets placed per symmetric copy
+    :param int games: Number of games to generate
+    :return: The starting state of every game
+    :rtype: simulator.State
+    """
+    if players not in (2, 4):
+        raise ValueError("Halite II maps are for 2 or 4 players, not {}".format(players))
+    state = simulator.State(games, players, 3 * players, planets_per_player * players, width, height)
+    for game in range(games):
+        rng = random.Random(None if seed is None else seed + game)
+        if players == 2:
+            spawns = [(width * 0.25, height * 0.5), (width * 0.75, height * 0.5)]
+
+            def mirrors(x, y):
+                return [(x, y), (width - x, height - y)]
+        else:
+            spawns = [(width * 0.25, height * 0.25), (width * 0.75, height * 0.25),
+                      (width * 0.25, height * 0.75), (width * 0.75, height * 0.75)]
+
+            def mirrors(x, y):
+                return [(x, y), (width - x, y), (x, height - y), (width - x, height - y)]
+
+        for player, (x, y) in enumerate(spawns):
+            for offset in (-2, 0, 2):
+                state.add_ship(game, player, x, y + offset)
+
+        placed = []
+        for _ in range(200 * planets_per_player):
+            if len(placed) == planets_per_player * players:
+                break
+            radius = rng.uniform(3, 8)
+            x = rng.uniform(radius + 1, width / 2 - 1)
+            y = rng.uniform(radius + 1, height - radius - 1) if players == 2 else rng.uniform(radius + 1, height / 2 - 1)
+            copies = mirrors(x, y)
+            clear = all(math.hypot(px - cx, py - cy) > radius + pr + 6
+                        for cx, cy in copies for px, py, pr in placed) \
+                and all(math.hypot(sx - cx, sy - cy) > radius + 12 for cx, cy in copies for sx, sy in spawns) \
+                and all(math.hypot(ax - bx, ay - by) > 2 * radius + 6
+                        for i, (ax, ay) in enumerate(copies) for bx, by in copies[i + 1:])
+            if clear:
+                placed.extend((cx, cy, radius) for cx, cy in copies)
+
+        for planet, (x, y, radius) in enumerate(placed):
+            state.planet_alive[game, planet] = True
+            state.planet_pos[game, planet] = (x, y)
+            state.planet_radius[game, planet] = radius
+            state.planet_health[game, planet] = int(radius * constants.MAX_SHIP_HEALTH)
+            state.planet_spots[game, planet] = max(2, int(radius / 2))
+            state.planet_remaining[game, planet] = int(radius * 144)
+    return state
+
+
+class BotProcess:
+    """
+    A bot running in a subprocess, talking over stdin/stdout.
+
+    :ivar command: The shell command the bot was started with
+    :ivar name: The name the bot announced, once known
+    """
+
+    def __init__(self, command):
+        """
+        :param str command: The shell command starting the bot, e.g. "python3 MyBot.py"
+        """
+        self.command = command
+        self.name = command
+        self._process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, universal_newlines=True, bufsize=1)
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        """
+        Forward the bot's output lines to the queue, followed by None once it exits.
+
+        :return: nothing
+        """
+        for line in self._process.stdout:
+            self._lines.put(line.rstrip('\n'))
+        self._lines.put(None)
+
+    def send(self, line):
+        """
+        :param str line: The line to send to the bot
+        :return: nothing
+        """
+        self._process.stdin.write(line + '\n')
+        self._process.stdin.flush()
+
+    def receive(self, timeout):
+        """
+        :param float timeout: Seconds to wait, or None to wait forever
+        :return: The next line the bot printed
+        :rtype: str
+        :raises TimeoutError: If the bot did not answer in time or exited
+        """
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("{} timed out".format(self.name))
+        if line is None:
+            raise TimeoutError("{} exited".format(self.name))
+        return line
+
+    def kill(self):
+        """
+        Stop the bot.
+
+        :return: nothing
+        """
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+
+
+def _deadline(timeout):
+    """
+    :param float timeout: Seconds from now, or None for no limit
+    :return: The time at which the timeout expires, or None
+    :rtype: float
+    """
+    return None if timeout is None else time.time() + timeout
+
+
+def _remaining(deadline):
+    """
+    :param float deadline: A time from _deadline, or None
+    :return: Seconds left until the deadline, at least 0, or None for no limit
+    :rtype: float
+    """
+    return None if deadline is None else max(deadline - time.time(), 0.0)
+
+
+def run_game(bot_commands, width=240, height=160, seed=None, timeouts=True):
+    """
+    Play one game between the given bots.
+
+    :param list[str] bot_commands: Shell commands starting the bots, one per player (2 or 4)
+    :param int width: Map width
+    :param int height: Map height
+    :param int seed: Map seed
+    :param bool timeouts: Whether to enforce the engine's initialization and per-turn time limits
+    :return: The bot names, the rankings (player ids from best to worst) and the number of turns played
+    :rtype: (list[str], list[int], int)
+    """
+    state = generate(width, height, len(bot_commands), seed)
+    bots = [BotProcess(command) for command in bot_commands]
+    init_timeout = INIT_TIMEOUT if timeouts else None
+    turn_timeout = TURN_TIMEOUT if timeouts else None
+    try:
+        frame = state.to_frame(0)
+        for player, bot in enumerate(bots):
+            bot.send(str(player))
+            bot.send("{} {}".format(width, height))
+            bot.send(frame)
+        deadline = _deadline(init_timeout)
+        for player, bot in enumerate(bots):
+            try:
+                bot.name = bot.receive(_remaining(deadline))
+            except TimeoutError as error:
+                logging.warning("Eliminating player %s: %s", player, error)
+                simulator.eliminate(state, 0, player)
+
+        while not simulator.finished(state)[0]:
+            frame = state.to_frame(0)
+            commands = simulator.Commands(state)
+            for player, bot in enumerate(bots):
+                if state.player_alive[0, player]:
+                    bot.send(frame)
+            # Every bot gets the same time from the broadcast, however late its answer is read
+            started = time.time()
+            deadline = _deadline(turn_timeout)
+            for player, bot in enumerate(bots):
+                if not state.player_alive[0, player]:
+                    continue
+                try:
+                    line = bot.receive(_remaining(deadline))
+                except TimeoutError as error:
+                    logging.warning("Eliminating player %s on turn %s: %s", player, state.turn[0], error)
+                    simulator.eliminate(state, 0, player)
+                    continue
+                ignored = simulator.parse_commands(state, commands, 0, player, line)
+                if ignored:
+                    logging.debug("Player %s: ignored %s commands on turn %s", player, ignored, state.turn[0])
+                logging.debug("Player %s answered in %.3fs", player, time.time() - started)
+            simulator.step(state, commands)
+    finally:
+        for bot in bots:
+            bot.kill()
+    return [bot.name for bot in bots], simulator.rankings(state, 0), int(state.turn[0])
+
+
+def main(argv=None):
+    """
+    Command line entry point, modelled on the halite binary.
+
+    :param list[str] argv: The arguments (default: sys.argv[1:])
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description="Run a local Halite II game.")
+    parser.add_argument('-d', '--dimensions', default="240 160", help='Map dimensions, as "WIDTH HEIGHT"')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='Map seed')
+    parser.add_argument('-t', '--no-timeout', action='store_true', help='Disable bot time limits')
+    parser.add_argument('bots', nargs='+', help='Shell commands starting each bot')
+    args = parser.parse_args(argv)
+
+    width, height = [int(value) for value in args.dimensions.split()]
+    names, ranking, turns = run_game(args.bots, width, height, args.seed, not args.no_timeout)
+    sys.stdout.write("Game finished after {} turns\n".format(turns))
+    for rank, player in enumerate(ranking, 1):
+        sys.stdout.write("#{}: player {} ({})\n".format(rank, player, names[player]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+from enum import Enum
+
+
+class EventType(Enum):
+    SHIP_SPAWNED = 0
+    SHIP_DESTROYED = 1
+    DOCKING_STATUS_CHANGED = 2
+    PLANET_OWNER_CHANGED = 3
+    PLANET_DESTROYED = 4
+    PLANET_DEPLETED = 5
+
+
+class MapEvent:
+    """
+    A single change between two consecutive turns.
+
+    :ivar EventType type: What happened
+    :ivar entity_id: The id of the ship or planet concerned
+    :ivar player_id: The id of the player owning the entity (the new owner for ownership changes), if any
+    :ivar old: The previous value of the changed attribute (docking status or owner id), if applicable
+    :ivar new: The new value of the changed attribute (docking status or owner id), if applicable
+    """
+
+    def __init__(self, event_type, entity_id, player_id=None, old=None, new=None):
+        self.type = event_type
+        self.entity_id = entity_id
+        self.player_id = player_id
+        self.old = old
+        self.new = new
+
+    def __str__(self):
+        return "MapEvent {} (id: {}, player: {}, {} -> {})"\
+            .format(self.type.name, self.entity_id, self.player_id, self.old, self.new)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _owner_id(owned_entity):
+    """
+    :param entity.Entity owned_entity: A linked ship or planet
+    :return: The id of its owner, or None if not owned
+    :rtype: int
+    """
+    return owned_entity.owner.id if owned_entity.owner is not None else None
+
+
+def diff(previous, current):
+    """
+    Compute the events that turn one parsed map into the next. Both maps are only read, so previous may be a
+    shallow copy of the map taken before it was re-parsed.
+
+    :param game_map.Map previous: The map of the previous turn
+    :param game_map.Map current: The map of the current turn
+    :return: The events, ship events before planet events
+    :rtype: list[MapEvent]
+    """
+    events = []
+    old_ships = previous.ships_by_id()
+    new_ships = current.ships_by_id()
+
+    for ship_id, ship in new_ships.items():
+        old_ship = old_ships.get(ship_id)
+        if old_ship is None:
+            events.append(MapEvent(EventType.SHIP_SPAWNED, ship_id, _owner_id(ship)))
+        elif old_ship.docking_status is not ship.docking_status:
+            events.append(MapEvent(EventType.DOCKING_STATUS_CHANGED, ship_id, _owner_id(ship),
+                                   old_ship.docking_status, ship.docking_status))
+    for ship_id, old_ship in old_ships.items():
+        if ship_id not in new_ships:
+            events.append(MapEvent(EventType.SHIP_DESTROYED, ship_id, _owner_id(old_ship)))
+
+    new_planets = {planet.id: planet for planet in current.all_planets()}
+    for old_planet in previous.all_planets():
+        planet = new_planets.get(old_planet.id)
+        if planet is None:
+            events.append(MapEvent(EventType.PLANET_DESTROYED, old_planet.id, _owner_id(old_planet)))
+            continue
+        old_owner, new_owner = _owner_id(old_planet), _owner_id(planet)
+        if old_owner != new_owner:
+            events.append(MapEvent(EventType.PLANET_OWNER_CHANGED, planet.id, new_owner, old_owner, new_owner))
+        if old_planet.remaining_resources > 0 >= planet.remaining_resources:
+            events.append(MapEvent(EventType.PLANET_DEPLETED, planet.id, new_owner))
+    return events
+
+
+def of_type(events, *event_types):
+    """
+    Filter events down to the given kinds.
+
+    :param list[MapEvent] events: The events to filter
+    :param EventType event_types: The kinds of event to keep
+    :return: The matching events
+    :rtype: list[MapEvent]
+    """
+    return [event for event in events if event.type in event_types]
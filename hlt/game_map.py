@@ -1,4 +1,10 @@
-from . import collision, entity
+import copy
+import itertools
+from types import MappingProxyType
+
+from . import collision, constants, entity, simulator
+
+_EMPTY = MappingProxyType({})
 
 
 class Map:
@@ -21,6 +27,11 @@ class Map:
         self.height = height
         self._players = {}
         self._planets = {}
+        self._ships = {}
+        self._ships_by_status = {}
+        self._planets_by_owner = {}
+        self._owned = None
+        self._journal = []
 
     def get_me(self):
         """
@@ -59,6 +70,73 @@ class Map:
         """
         return list(self._planets.values())
 
+    def get_ship(self, ship_id):
+        """
+        :param int ship_id: The id of the desired ship, regardless of its owner
+        :return: The ship associated with ship_id
+        :rtype: entity.Ship
+        """
+        return self._ships.get(ship_id)
+
+    def ships_by_id(self):
+        """
+        :return: Read-only view of every ship on the map, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        return MappingProxyType(self._ships)
+
+    def player_ships(self, player_id):
+        """
+        :param int player_id: The id of the owning player
+        :return: Read-only view of the player's ships, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        player = self._players.get(player_id)
+        return MappingProxyType(player._ships) if player is not None else _EMPTY
+
+    def ships_with_status(self, player_id, docking_status):
+        """
+        :param int player_id: The id of the owning player
+        :param entity.Ship.DockingStatus docking_status: The docking status to filter on
+        :return: Read-only view of the player's ships in that docking status, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        ships = self._ships_by_status.get(player_id, {}).get(docking_status)
+        return MappingProxyType(ships) if ships is not None else _EMPTY
+
+    def undocked_ships(self, player_id):
+        """
+        :param int player_id: The id of the owning player
+        :return: Read-only view of the player's undocked ships, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.ships_with_status(player_id, entity.Ship.DockingStatus.UNDOCKED)
+
+    def docking_ships(self, player_id):
+        """
+        :param int player_id: The id of the owning player
+        :return: Read-only view of the player's ships currently docking, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.ships_with_status(player_id, entity.Ship.DockingStatus.DOCKING)
+
+    def docked_ships(self, player_id):
+        """
+        :param int player_id: The id of the owning player
+        :return: Read-only view of the player's fully docked ships, keyed by ship id
+        :rtype: dict[int, entity.Ship]
+        """
+        return self.ships_with_status(player_id, entity.Ship.DockingStatus.DOCKED)
+
+    def planets_owned_by(self, player_id):
+        """
+        :param int player_id: The id of the owning player, or None for unowned planets
+        :return: Read-only view of the matching planets, keyed by planet id
+        :rtype: dict[int, entity.Planet]
+        """
+        planets = self._planets_by_owner.get(player_id)
+        return MappingProxyType(planets) if planets is not None else _EMPTY
+
     def nearby_entities_by_distance(self, entity):
         """
         :param entity: The source entity to find distances from
@@ -66,20 +144,283 @@ class Map:
         :rtype: dict
         """
         result = {}
-        for foreign_entity in self._all_ships() + self.all_planets():
+        for foreign_entity in itertools.chain(self._ships.values(), self._planets.values()):
             if entity == foreign_entity:
                 continue
             result.setdefault(entity.calculate_distance_between(foreign_entity), []).append(foreign_entity)
         return result
 
+    def predict(self, commands, velocities=None):
+        """
+        Predict the map of the next turn: my commands are applied, every other undocked ship keeps moving along
+        its velocity, and collisions, combat, docking and production are resolved by the simulator rules.
+
+        :param list[str] commands: My commands for this turn, as passed to send_command_queue
+        :param dict[int, (float, float)] velocities: Velocity estimates by ship id for the other players' ships
+            (e.g. from motion.MotionHistory.latest_velocities), overriding the engine-reported velocities
+        :return: The expected map of the next turn
+        :rtype: Map
+        """
+        state = simulator.State.from_map(self)
+        orders = simulator.Commands(state)
+        simulator.parse_commands(state, orders, 0, self.my_id, " ".join(commands))
+        simulator.coast(state, orders, self.my_id, velocities)
+        simulator.step(state, orders)
+
+        predicted = Map(self.my_id, self.width, self.height)
+        predicted._parse(state.to_frame(0))
+        return predicted
+
+    def fork(self):
+        """
+        Create a child map for search and lookahead. The child shares every ship and planet record and every
+        container with this map; whichever of the two is modified first copies only the records and containers
+        it touches. Entity links (ship.owner, planet.owner, ship.planet) keep pointing at the records they were
+        parsed with, and Player.stats keep describing the parsed frame.
+
+        :return: The child map
+        :rtype: Map
+        """
+        child = copy.copy(self)
+        child._owned = set()
+        child._journal = []
+        self._owned = set()
+        return child
+
+    def update_ship(self, ship_id, **attributes):
+        """
+        Change attributes of a ship (e.g. x, y, health, docking_status) without touching the record it shares
+        with its parent or children.
+
+        :param int ship_id: The ship to change
+        :param attributes: The attributes to set
+        :return: The updated ship record
+        :rtype: entity.Ship
+        """
+        ship = copy.copy(self._ships[ship_id])
+        for name, value in attributes.items():
+            setattr(ship, name, value)
+        self._replace_ship(ship_id, ship)
+        return ship
+
+    def remove_ship(self, ship_id):
+        """
+        Remove a ship from this map only.
+
+        :param int ship_id: The ship to remove
+        :return: nothing
+        """
+        self._replace_ship(ship_id, None)
+
+    def update_planet(self, planet_id, **attributes):
+        """
+        Change attributes of a planet (e.g. health, owner, current_production) without touching the record it
+        shares with its parent or children.
+
+        :param int planet_id: The planet to change
+        :param attributes: The attributes to set
+        :return: The updated planet record
+        :rtype: entity.Planet
+        """
+        planet = copy.copy(self._planets[planet_id])
+        for name, value in attributes.items():
+            setattr(planet, name, value)
+        self._replace_planet(planet_id, planet)
+        return planet
+
+    def checkpoint(self):
+        """
+        :return: A marker that restore can roll back to
+        :rtype: int
+        """
+        return len(self._journal)
+
+    def restore(self, checkpoint=0):
+        """
+        Undo every change made after the given checkpoint (by default, every change since parse or fork).
+
+        :param int checkpoint: A value returned by checkpoint
+        :return: nothing
+        """
+        while len(self._journal) > checkpoint:
+            kind, entity_id, record = self._journal.pop()
+            if kind == 'ship':
+                self._replace_ship(entity_id, record, record=False)
+            else:
+                self._replace_planet(entity_id, record, record=False)
+
+    def undo(self):
+        """
+        Undo the last change.
+
+        :return: nothing
+        """
+        self.restore(max(len(self._journal) - 1, 0))
+
+    def _writable(self, key, container):
+        """
+        Return a version of the container this map may modify, copying it on first write if it is shared.
+
+        :param key: Identifies the container within this map
+        :param dict container: The container as currently referenced
+        :return: The container to modify
+        :rtype: dict
+        """
+        if self._owned is None or key in self._owned:
+            return container
+        self._owned.add(key)
+        return dict(container)
+
+    def _writable_player(self, player_id):
+        """
+        :param int player_id: The owning player
+        :return: The player record of this map, with a ships dict it may modify
+        :rtype: Player
+        """
+        self._players = self._writable('players', self._players)
+        if self._owned is not None and ('player', player_id) not in self._owned:
+            player = copy.copy(self._players[player_id])
+            player._ships = self._writable(('player', player_id), player._ships)
+            self._players[player_id] = player
+        return self._players[player_id]
+
+    def _writable_status(self, player_id, docking_status):
+        """
+        :return: The writable dict of the player's ships in the given docking status
+        :rtype: dict
+        """
+        self._ships_by_status = self._writable('status', self._ships_by_status)
+        by_status = self._ships_by_status[player_id] = self._writable(('status', player_id),
+                                                                      self._ships_by_status[player_id])
+        by_status[docking_status] = self._writable(('status', player_id, docking_status), by_status[docking_status])
+        return by_status[docking_status]
+
+    def _writable_owned_planets(self, owner_id):
+        """
+        :return: The writable dict of the planets owned by owner_id (None for unowned)
+        :rtype: dict
+        """
+        self._planets_by_owner = self._writable('planets_by_owner', self._planets_by_owner)
+        planets = self._planets_by_owner[owner_id] = self._writable(('planets_by_owner', owner_id),
+                                                                    self._planets_by_owner.get(owner_id, {}))
+        return planets
+
+    def _replace_ship(self, ship_id, ship, record=True):
+        """
+        Swap the record of a ship in every container holding it; None removes the ship, and a record for an
+        unknown id adds it.
+
+        :return: nothing
+        """
+        old = self._ships.get(ship_id)
+        if record:
+            self._journal.append(('ship', ship_id, old))
+        self._ships = self._writable('ships', self._ships)
+        for current, docked in ((old, False), (ship, True)):
+            if current is None:
+                continue
+            owner_id = current.owner.id
+            player_ships = self._writable_player(owner_id)._ships
+            status_ships = self._writable_status(owner_id, current.docking_status)
+            if docked:
+                self._ships[ship_id] = player_ships[ship_id] = status_ships[ship_id] = ship
+            else:
+                self._ships.pop(ship_id, None)
+                player_ships.pop(ship_id, None)
+                status_ships.pop(ship_id, None)
+            planet = self._planets.get(current.planet.id) if current.planet is not None else None
+            if planet is not None and ship_id in planet._docked_ships:
+                planet = self._copy_planet(planet)
+                if docked:
+                    planet._docked_ships[ship_id] = ship
+                else:
+                    del planet._docked_ships[ship_id]
+                    planet._docked_ship_ids = [docked_id for docked_id in planet._docked_ship_ids
+                                               if docked_id != ship_id]
+            elif planet is not None and docked and ship.docking_status is not entity.Ship.DockingStatus.UNDOCKED:
+                planet = self._copy_planet(planet)
+                planet._docked_ships[ship_id] = ship
+                planet._docked_ship_ids = planet._docked_ship_ids + [ship_id]
+
+    def _copy_planet(self, planet):
+        """
+        Replace a planet by a private copy whose docked ships can be changed, without journaling it (ship
+        changes restore the planet themselves).
+
+        :return: The copy
+        :rtype: entity.Planet
+        """
+        planet = copy.copy(planet)
+        planet._docked_ships = dict(planet._docked_ships)
+        self._put_planet(planet.id, planet)
+        return planet
+
+    def _replace_planet(self, planet_id, planet, record=True):
+        """
+        Swap the record of a planet in every container holding it.
+
+        :return: nothing
+        """
+        old = self._planets.get(planet_id)
+        if record:
+            self._journal.append(('planet', planet_id, old))
+        self._put_planet(planet_id, planet)
+
+    def _put_planet(self, planet_id, planet):
+        """
+        Store a planet record in the planet containers, moving it between owners as needed.
+
+        :return: nothing
+        """
+        old = self._planets.get(planet_id)
+        self._planets = self._writable('planets', self._planets)
+        if old is not None:
+            del self._writable_owned_planets(old.owner.id if old.owner is not None else None)[planet_id]
+        if planet is None:
+            del self._planets[planet_id]
+        else:
+            self._planets[planet_id] = planet
+            self._writable_owned_planets(planet.owner.id if planet.owner is not None else None)[planet_id] = planet
+
     def _link(self):
         """
         Updates all the entities with the correct ship and planet objects
 
         :return:
         """
-        for celestial_object in self.all_planets() + self._all_ships():
+        for celestial_object in self._planets.values():
             celestial_object._link(self._players, self._planets)
+        for player in self._players.values():
+            for ship in player._ships.values():
+                ship._link(self._players, self._planets)
+
+    def _build_indexes(self):
+        """
+        Partition the freshly parsed ships and planets by id, owner and docking status, so queries never
+        have to rebuild them.
+
+        :return: nothing
+        """
+        self._ships = {}
+        self._ships_by_status = {}
+        for player_id, player in self._players.items():
+            self._ships.update(player._ships)
+            by_status = {status: {} for status in entity.Ship.DockingStatus}
+            stats = player.stats = PlayerStats()
+            for ship_id, ship in player._ships.items():
+                by_status[ship.docking_status][ship_id] = ship
+                stats._add_ship(ship)
+            stats._finish_ships()
+            self._ships_by_status[player_id] = by_status
+
+        self._planets_by_owner = {None: {}}
+        for player_id in self._players:
+            self._planets_by_owner[player_id] = {}
+        for planet_id, planet in self._planets.items():
+            owner_id = planet.owner.id if planet.owner is not None else None
+            self._planets_by_owner.setdefault(owner_id, {})[planet_id] = planet
+            if planet.owner is not None:
+                planet.owner.stats._add_planet(planet)
 
     def _parse(self, map_string):
         """
@@ -95,6 +436,9 @@ class Map:
 
         assert(len(tokens) == 0)  # There should be no remaining tokens at this point
         self._link()
+        self._build_indexes()
+        self._owned = None
+        self._journal = []
 
     def _all_ships(self):
         """
@@ -103,10 +447,7 @@ class Map:
         :return: List of ships
         :rtype: List[Ship]
         """
-        all_ships = []
-        for player in self.all_players():
-            all_ships.extend(player.all_ships())
-        return all_ships
+        return list(self._ships.values())
 
     def _intersects_entity(self, target):
         """
@@ -116,7 +457,7 @@ class Map:
         :return: The colliding entity if so, else None.
         :rtype: entity.Entity
         """
-        for celestial_object in self._all_ships() + self.all_planets():
+        for celestial_object in itertools.chain(self._ships.values(), self._planets.values()):
             if celestial_object is target:
                 continue
             d = celestial_object.calculate_distance_between(target)
@@ -135,8 +476,8 @@ class Map:
         :rtype: list[entity.Entity]
         """
         obstacles = []
-        entities = ([] if issubclass(entity.Planet, ignore) else self.all_planets()) \
-            + ([] if issubclass(entity.Ship, ignore) else self._all_ships())
+        entities = itertools.chain(() if issubclass(entity.Planet, ignore) else self._planets.values(),
+                                   () if issubclass(entity.Ship, ignore) else self._ships.values())
         for foreign_entity in entities:
             if foreign_entity == ship or foreign_entity == target:
                 continue
@@ -148,6 +489,7 @@ class Map:
 class Player:
     """
     :ivar id: The player's unique id
+    :ivar PlayerStats stats: Aggregate statistics about the player, filled in when the map is parsed
     """
     def __init__(self, player_id, ships={}):
         """
@@ -156,6 +498,7 @@ class Player:
         """
         self.id = player_id
         self._ships = ships
+        self.stats = PlayerStats()
 
     def all_ships(self):
         """
@@ -210,3 +553,82 @@ class Player:
 
     def __repr__(self):
         return self.__str__()
+
+
+class PlayerStats:
+    """
+    Aggregate statistics of one player, accumulated while the frame is parsed so strategy code can compare
+    players without walking their entities.
+
+    :ivar ship_count: Number of ships the player controls
+    :ivar healthy_ship_count: Number of ships with health left
+    :ivar total_health: Sum of the health of all ships
+    :ivar docked_count: Number of fully docked ships
+    :ivar planet_count: Number of planets the player owns
+    :ivar planet_radius_sum: Sum of the radii of the owned planets
+    :ivar production_rate: Production units the player's planets generate per turn
+    :ivar centroid: The (x, y) mean position of the ships, or None without ships
+    :ivar bounding_box: The (min_x, min_y, max_x, max_y) box around the ships, or None without ships
+    """
+    def __init__(self):
+        self.ship_count = 0
+        self.healthy_ship_count = 0
+        self.total_health = 0
+        self.docked_count = 0
+        self.planet_count = 0
+        self.planet_radius_sum = 0
+        self.production_rate = 0
+        self.centroid = None
+        self.bounding_box = None
+        self._sum_x = 0
+        self._sum_y = 0
+
+    def _add_ship(self, ship):
+        """
+        Account for one ship of the player.
+
+        :param entity.Ship ship: The ship to add
+        :return: nothing
+        """
+        self.ship_count += 1
+        self.total_health += ship.health
+        if ship.health > 0:
+            self.healthy_ship_count += 1
+        if ship.docking_status is entity.Ship.DockingStatus.DOCKED:
+            self.docked_count += 1
+        self._sum_x += ship.x
+        self._sum_y += ship.y
+        if self.bounding_box is None:
+            self.bounding_box = (ship.x, ship.y, ship.x, ship.y)
+        else:
+            min_x, min_y, max_x, max_y = self.bounding_box
+            self.bounding_box = (min(min_x, ship.x), min(min_y, ship.y), max(max_x, ship.x), max(max_y, ship.y))
+
+    def _finish_ships(self):
+        """
+        Derive the fleet centroid once all ships have been added.
+
+        :return: nothing
+        """
+        if self.ship_count:
+            self.centroid = (self._sum_x / self.ship_count, self._sum_y / self.ship_count)
+
+    def _add_planet(self, planet):
+        """
+        Account for one planet owned by the player.
+
+        :param entity.Planet planet: The owned planet
+        :return: nothing
+        """
+        self.planet_count += 1
+        self.planet_radius_sum += planet.radius
+        producers = sum(1 for ship in planet._docked_ships.values()
+                        if ship is not None and ship.docking_status is entity.Ship.DockingStatus.DOCKED)
+        self.production_rate += min(producers * constants.BASE_PRODUCTIVITY, planet.remaining_resources)
+
+    def __str__(self):
+        return "PlayerStats(ships={}, health={}, docked={}, planets={}, production={})"\
+            .format(self.ship_count, self.total_health, self.docked_count, self.planet_count, self.production_rate)
+
+    def __repr__(self):
+        return self.__str__()
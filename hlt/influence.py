@@ -0,0 +1,275 @@
+"""
+Influence rasters over the map.
+
+Ships are splatted onto a coarse grid and spread with a disk kernel, the convolution done with numpy's FFT, so
+questions like "how many enemy ships can hit this point next turn" or "which enemy ships are near my docked
+ships" become a lookup per point instead of a scan over ships:
+
+    threats = ThreatMap(game_map, game_map.my_id)
+    if threats.is_safe(ship):
+        ...
+    attackers = threats.intruders(30)
+
+ActivityHeatmap keeps a longer memory alongside: an exponentially decayed record of where each enemy player's ships
+have been and where they fired, updated once per turn.
+"""
+import numpy as np
+
+from . import constants, entity, positioning
+
+#: Layers of ActivityHeatmap.counts
+PRESENCE, ATTACKS = 0, 1
+
+
+def disk_kernel(radius, cell):
+    """
+    :param float radius: Radius of the disk
+    :param float cell: Size of a grid cell
+    :return: (2k+1, 2k+1) kernel, 1 on cells whose centre is within radius of the middle cell's centre
+    :rtype: numpy.ndarray
+    """
+    half = int(np.ceil(radius / cell))
+    offsets = np.arange(-half, half + 1) * cell
+    return (np.hypot(offsets[:, np.newaxis], offsets[np.newaxis]) <= radius).astype(float)
+
+
+def convolve(grid, kernel):
+    """
+    Same-size convolution through the FFT.
+
+    :param numpy.ndarray grid: (rows, columns) raster
+    :param numpy.ndarray kernel: (2k+1, 2k+1) kernel
+    :return: (rows, columns) raster, values below 1e-9 set to 0
+    :rtype: numpy.ndarray
+    """
+    rows, columns = grid.shape
+    half = kernel.shape[0] // 2
+    shape = (rows + kernel.shape[0] - 1, columns + kernel.shape[1] - 1)
+    full = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    result = full[half:half + rows, half:half + columns]
+    return np.where(result > 1e-9, result, 0.0)
+
+
+class Grid:
+    """
+    A coarse raster over the map.
+
+    :ivar cell: Size of a cell
+    :ivar shape: (rows, columns) of the raster, rows along y
+    """
+
+    def __init__(self, width, height, cell=2.0):
+        """
+        :param float width: Map width
+        :param float height: Map height
+        :param float cell: Size of a cell
+        """
+        self.cell = cell
+        self.shape = (int(np.ceil(height / cell)), int(np.ceil(width / cell)))
+
+    def index(self, points):
+        """
+        :param numpy.ndarray points: (n, 2) positions
+        :return: Row and column indices of the cells holding the points, clipped to the raster
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        rows = np.clip((points[:, 1] // self.cell).astype(np.int64), 0, self.shape[0] - 1)
+        columns = np.clip((points[:, 0] // self.cell).astype(np.int64), 0, self.shape[1] - 1)
+        return rows, columns
+
+    def splat(self, points, weights):
+        """
+        :param numpy.ndarray points: (n, 2) positions
+        :param numpy.ndarray weights: (n,) weight of each point
+        :return: Raster with each weight added to the cell of its point
+        :rtype: numpy.ndarray
+        """
+        raster = np.zeros(self.shape)
+        np.add.at(raster, self.index(points), weights)
+        return raster
+
+    def spread(self, points, weights, radius):
+        """
+        :param numpy.ndarray points: (n, 2) positions
+        :param numpy.ndarray weights: (n,) weight of each point
+        :param float radius: Distance over which each weight is spread
+        :return: Raster holding, in every cell, the total weight of the points within radius of it
+        :rtype: numpy.ndarray
+        """
+        raster = self.splat(points, weights)
+        if not raster.any():
+            return raster
+        return convolve(raster, disk_kernel(radius, self.cell))
+
+    def lookup(self, raster, points):
+        """
+        :param numpy.ndarray raster: A raster of this grid
+        :param numpy.ndarray points: (n, 2) positions
+        :return: (n,) raster values at the points
+        :rtype: numpy.ndarray
+        """
+        return raster[self.index(points)]
+
+
+def _positions(ships):
+    """
+    :return: (n, 2) positions of the ships
+    :rtype: numpy.ndarray
+    """
+    return np.array([(ship.x, ship.y) for ship in ships], dtype=float).reshape(-1, 2)
+
+
+class ThreatMap:
+    """
+    Where one player's ships are under threat this turn. Build a new map every turn.
+
+    Every undocked enemy ship counts as able to fire next turn: frame cooldowns are only ever 0 or
+    WEAPON_COOLDOWN, and the cooldown is decremented before combat.
+
+    :ivar grid: The raster geometry
+    :ivar threat: Raster of the enemy firepower able to reach each cell next turn, in ships at full health
+    """
+
+    def __init__(self, game_map, player_id, cell=2.0, reach=positioning.REACH):
+        """
+        :param game_map.Map game_map: The current map
+        :param int player_id: The player under threat
+        :param float cell: Size of a raster cell
+        :param float reach: Distance from which an enemy ship threatens a point
+        """
+        self.game_map = game_map
+        self.player_id = player_id
+        self.grid = Grid(game_map.width, game_map.height, cell)
+        ships = game_map.ships_by_id().values()
+        self._enemies = [ship for ship in ships if ship.owner.id != player_id
+                         and ship.docking_status == ship.DockingStatus.UNDOCKED]
+        self._docked = [ship for ship in ships if ship.owner.id == player_id
+                        and ship.docking_status != ship.DockingStatus.UNDOCKED]
+        weights = np.array([ship.health / constants.MAX_SHIP_HEALTH for ship in self._enemies])
+        self.threat = self.grid.spread(_positions(self._enemies), weights, reach)
+
+    def threat_at(self, position):
+        """
+        :param entity.Entity position: A position or entity
+        :return: Enemy firepower able to reach it next turn
+        :rtype: float
+        """
+        return float(self.grid.lookup(self.threat, ((position.x, position.y),))[0])
+
+    def is_safe(self, position, threshold=0.0):
+        """
+        :param entity.Entity position: A position or entity
+        :param float threshold: Firepower that is still acceptable
+        :return: True if no more than threshold enemy firepower can reach it next turn
+        :rtype: bool
+        """
+        return self.threat_at(position) <= threshold
+
+    def intruders(self, radius):
+        """
+        :param float radius: Distance from the player's docked ships
+        :return: Undocked enemy ships within radius of one of the player's docked ships
+        :rtype: list[entity.Ship]
+        """
+        if not self._docked or not self._enemies:
+            return []
+        guard = self.grid.spread(_positions(self._docked), np.ones(len(self._docked)), radius)
+        near = self.grid.lookup(guard, _positions(self._enemies)) > 0
+        return [ship for ship, inside in zip(self._enemies, near.tolist()) if inside]
+
+    def __str__(self):
+        return "ThreatMap player {} ({}x{} cells, {} enemy ships, peak {:.2f})".format(
+            self.player_id, self.grid.shape[1], self.grid.shape[0], len(self._enemies),
+            float(self.threat.max()) if self.threat.size else 0.0)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class ActivityHeatmap:
+    """
+    Exponentially decayed presence and attack rasters of every enemy player, kept across turns.
+
+    :ivar grid: The raster geometry
+    :ivar decay: Factor applied to the old counts every turn
+    :ivar counts: (2, players, rows, columns) decayed ship-turns, presence first and attacks second
+    """
+
+    def __init__(self, game_map, player_id, cell=4.0, decay=0.95):
+        """
+        :param game_map.Map game_map: Any map of the game, for its size and players
+        :param int player_id: The player whose enemies are tracked
+        :param float cell: Size of a raster cell
+        :param float decay: Factor applied to the old counts every turn
+        """
+        self.player_id = player_id
+        self.grid = Grid(game_map.width, game_map.height, cell)
+        self.decay = decay
+        players = max(player.id for player in game_map.all_players()) + 1
+        self.counts = np.zeros((2, players) + self.grid.shape)
+
+    def update(self, game_map):
+        """
+        Decay the old counts and add this turn's enemy ships, and the ones that fired, in one step.
+
+        :param game_map.Map game_map: The current map
+        :return: nothing
+        """
+        ships = [ship for ship in game_map.ships_by_id().values() if ship.owner.id != self.player_id]
+        owners = np.array([ship.owner.id for ship in ships], dtype=np.int64)
+        # A weapon that fired this turn is still cooling down in the frame
+        fired = np.array([ship._weapon_cooldown > 0 for ship in ships], dtype=bool)
+        rows, columns = self.grid.index(_positions(ships))
+        layer = np.concatenate((np.full(len(ships), PRESENCE), np.full(int(fired.sum()), ATTACKS)))
+        index = (layer, np.concatenate((owners, owners[fired])), np.concatenate((rows, rows[fired])),
+                 np.concatenate((columns, columns[fired])))
+        self.counts *= self.decay
+        np.add.at(self.counts, index, 1.0)
+
+    def presence(self, player_id=None):
+        """
+        :param int player_id: An enemy player, or None for all of them
+        :return: Raster of decayed ship-turns spent in each cell
+        :rtype: numpy.ndarray
+        """
+        counts = self.counts[PRESENCE]
+        return counts.sum(axis=0) if player_id is None else counts[player_id]
+
+    def attacks(self, player_id=None):
+        """
+        :param int player_id: An enemy player, or None for all of them
+        :return: Raster of decayed shots fired from each cell
+        :rtype: numpy.ndarray
+        """
+        counts = self.counts[ATTACKS]
+        return counts.sum(axis=0) if player_id is None else counts[player_id]
+
+    def at(self, raster, position):
+        """
+        :param numpy.ndarray raster: A raster of this heatmap
+        :param entity.Entity position: A position or entity
+        :return: The raster value at the position
+        :rtype: float
+        """
+        return float(self.grid.lookup(raster, ((position.x, position.y),))[0])
+
+    def hotspots(self, raster, count=3):
+        """
+        :param numpy.ndarray raster: A raster of this heatmap
+        :param int count: How many cells to return
+        :return: Centres of the hottest cells with their values, hottest first; empty cells are left out
+        :rtype: list[(entity.Position, float)]
+        """
+        flat = np.argsort(raster, axis=None)[::-1][:count]
+        rows, columns = np.unravel_index(flat, raster.shape)
+        cell = self.grid.cell
+        return [(entity.Position((column + 0.5) * cell, (row + 0.5) * cell), float(raster[row, column]))
+                for row, column in zip(rows.tolist(), columns.tolist()) if raster[row, column] > 0]
+
+    def __str__(self):
+        return "ActivityHeatmap player {} ({:.1f} presence, {:.1f} attacks)".format(
+            self.player_id, float(self.counts[PRESENCE].sum()), float(self.counts[ATTACKS].sum()))
+
+    def __repr__(self):
+        return self.__str__()
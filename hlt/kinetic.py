@@ -0,0 +1,163 @@
+import bisect
+import math
+
+from . import constants
+
+
+class _Entry:
+    """
+    A cached nearest-neighbour answer together with what is needed to re-validate it.
+
+    :ivar turn: The turn the answer was computed on
+    :ivar origin: The (x, y) position of the source at that time
+    :ivar best_id: The id of the nearest candidate
+    :ivar runner_up: The distance to the second nearest candidate (inf if there was none)
+    """
+
+    def __init__(self, turn, origin, best_id, runner_up):
+        self.turn = turn
+        self.origin = origin
+        self.best_id = best_id
+        self.runner_up = runner_up
+
+
+class NearestCache:
+    """
+    Cross-turn cache for nearest-candidate queries. Nothing moves more than MAX_SPEED per turn, so an answer
+    stays correct as long as the distance to the cached winner is still below the lowest distance any other
+    candidate can have reached, given how far the source and the candidates may have moved since. Only queries
+    where that bound fails are recomputed.
+
+    Candidates are passed as dicts keyed by id (such as the views returned by game_map.Map) and grouped by
+    name; candidates that joined a group since an answer was cached are checked explicitly.
+
+    :ivar turn: The current turn, advanced by begin_turn
+    :ivar hits: Number of queries answered from the cache
+    :ivar misses: Number of queries that had to be recomputed
+    """
+
+    def __init__(self, speed_bound=constants.MAX_SPEED, max_age=10):
+        """
+        :param float speed_bound: The furthest a moving candidate can travel per turn
+        :param int max_age: Number of turns after which an answer is always recomputed
+        """
+        self.speed_bound = speed_bound
+        self.max_age = max_age
+        self.turn = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._members = {}
+        self._joins = {}
+        self._synced = {}
+
+    def begin_turn(self):
+        """
+        Advance to the next turn. Call once per turn, before any query.
+
+        :return: nothing
+        """
+        self.turn += 1
+        oldest = self.turn - self.max_age
+        if self.turn % self.max_age == 0:
+            self._entries = {key: entry for key, entry in self._entries.items() if entry.turn >= oldest}
+            for group, joins in self._joins.items():
+                self._joins[group] = [(turn, member_id) for turn, member_id in joins if turn >= oldest]
+
+    def invalidate(self, group=None):
+        """
+        Drop cached answers, for one group or for all of them.
+
+        :param str group: The group to drop, or None for everything
+        :return: nothing
+        """
+        if group is None:
+            self._entries.clear()
+        else:
+            self._entries = {key: entry for key, entry in self._entries.items() if key[0] != group}
+
+    def _sync(self, group, candidates):
+        """
+        Record which candidates joined the group since the last turn it was queried on.
+
+        :param str group: The candidate group
+        :param dict candidates: The current candidates, keyed by id
+        :return: nothing
+        """
+        if self._synced.get(group) == self.turn:
+            return
+        self._synced[group] = self.turn
+        members = self._members.setdefault(group, {})
+        joins = self._joins.setdefault(group, [])
+        for member_id in [member_id for member_id in members if member_id not in candidates]:
+            del members[member_id]
+        for member_id in candidates:
+            if member_id not in members:
+                members[member_id] = self.turn
+                joins.append((self.turn, member_id))
+
+    def nearest(self, source, candidates, group, moving=True):
+        """
+        Find the candidate nearest to source.
+
+        :param entity.Entity source: The entity to measure from (a ship or planet with a stable id)
+        :param dict candidates: The candidates, keyed by id
+        :param str group: Name of the candidate set; answers are cached per (group, source id)
+        :param bool moving: Whether the candidates can move (False for planets)
+        :return: The nearest candidate, or None if there is none
+        :rtype: entity.Entity
+        """
+        self._sync(group, candidates)
+        key = (group, source.id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            best = self._revalidate(entry, source, candidates, group, moving)
+            if best is not None:
+                self.hits += 1
+                return best
+        self.misses += 1
+        return self._compute(key, source, candidates)
+
+    def _revalidate(self, entry, source, candidates, group, moving):
+        """
+        :return: The cached winner if the movement bound still guarantees it, else None
+        :rtype: entity.Entity
+        """
+        best = candidates.get(entry.best_id)
+        elapsed = self.turn - entry.turn
+        if best is None or elapsed > self.max_age:
+            return None
+        drift = self.speed_bound * elapsed if moving else 0
+        moved = math.sqrt((source.x - entry.origin[0]) ** 2 + (source.y - entry.origin[1]) ** 2)
+        best_distance = source.calculate_distance_between(best)
+        if best_distance > entry.runner_up - moved - drift:
+            return None
+        joins = self._joins[group]
+        for _, member_id in joins[bisect.bisect_right(joins, (entry.turn, math.inf)):]:
+            if member_id == entry.best_id:
+                continue
+            candidate = candidates.get(member_id)
+            if candidate is not None and candidate is not source \
+                    and source.calculate_distance_between(candidate) < best_distance:
+                return None
+        return best
+
+    def _compute(self, key, source, candidates):
+        """
+        :return: The nearest candidate by full scan, caching the answer
+        :rtype: entity.Entity
+        """
+        best, best_distance, runner_up = None, math.inf, math.inf
+        for candidate in candidates.values():
+            if candidate is source:
+                continue
+            distance = source.calculate_distance_between(candidate)
+            if distance < best_distance:
+                best, best_distance, runner_up = candidate, distance, best_distance
+            elif distance < runner_up:
+                runner_up = distance
+        if best is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = _Entry(self.turn, (source.x, source.y), best.id, runner_up)
+        return best
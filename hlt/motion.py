@@ -0,0 +1,188 @@
+import numpy as np
+
+from . import constants, entity
+
+
+class MotionHistory:
+    """
+    Recent positions and velocities of every ship on the map, kept in fixed-size NumPy ring buffers. Each ship
+    owns a stable slot for as long as it lives, so per-turn updates and per-ship queries are plain array indexing.
+
+    Halite resets velocities at the end of every turn, so velocities are derived from the displacement between
+    consecutive samples; the engine-reported velocity is only used for a ship's first sample.
+
+    :ivar capacity: Number of turns kept per ship
+    :ivar turn: Number of updates applied so far
+    """
+
+    def __init__(self, capacity=8, initial_slots=64):
+        """
+        :param int capacity: Number of turns of history kept per ship
+        :param int initial_slots: Number of ship slots to allocate up front (grows on demand)
+        """
+        self.capacity = capacity
+        self.turn = 0
+        self._head = 0
+        self._slots = {}
+        self._free = list(range(initial_slots - 1, -1, -1))
+        self._positions = np.zeros((initial_slots, capacity, 2))
+        self._velocities = np.zeros((initial_slots, capacity, 2))
+        self._count = np.zeros(initial_slots, dtype=np.int64)
+
+    def _grow(self):
+        """
+        Double the number of ship slots.
+
+        :return: nothing
+        """
+        old = len(self._count)
+        self._free.extend(range(2 * old - 1, old - 1, -1))
+        self._positions = np.concatenate((self._positions, np.zeros_like(self._positions)))
+        self._velocities = np.concatenate((self._velocities, np.zeros_like(self._velocities)))
+        self._count = np.concatenate((self._count, np.zeros_like(self._count)))
+
+    def _slot_for(self, ship_id):
+        """
+        :param int ship_id: The id of a live ship
+        :return: The slot of the ship, allocating a fresh one for new ships
+        :rtype: int
+        """
+        slot = self._slots.get(ship_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._slots[ship_id] = self._free.pop()
+            self._count[slot] = 0
+        return slot
+
+    def update(self, game_map):
+        """
+        Record the positions of every ship on the freshly parsed map. Call exactly once per turn.
+
+        :param game_map.Map game_map: The current map
+        :return: nothing
+        """
+        ships = game_map.ships_by_id()
+        for ship_id in [ship_id for ship_id in self._slots if ship_id not in ships]:
+            self._free.append(self._slots.pop(ship_id))
+
+        slots = np.fromiter((self._slot_for(ship_id) for ship_id in ships), dtype=np.int64, count=len(ships))
+        current = np.array([(ship.x, ship.y) for ship in ships.values()]).reshape(-1, 2)
+        reported = np.array([(ship.vel_x, ship.vel_y) for ship in ships.values()]).reshape(-1, 2)
+
+        previous = self._positions[slots, (self._head - 1) % self.capacity]
+        seen = (self._count[slots] > 0)[:, np.newaxis]
+        self._velocities[slots, self._head] = np.where(seen, current - previous, reported)
+        self._positions[slots, self._head] = current
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.capacity)
+        self._head = (self._head + 1) % self.capacity
+        self.turn += 1
+
+    def _latest(self, buffer, slot, window):
+        """
+        :return: The last min(window, samples) entries of one slot of the buffer, oldest first
+        :rtype: numpy.ndarray
+        """
+        count = min(window, int(self._count[slot]))
+        indices = (self._head - count + np.arange(count)) % self.capacity
+        return buffer[slot, indices]
+
+    def positions(self, ship_id, window=None):
+        """
+        :param int ship_id: The ship to look up
+        :param int window: How many turns to return (default: all that are kept)
+        :return: The recorded (x, y) positions of the ship, oldest first
+        :rtype: numpy.ndarray
+        """
+        slot = self._slots.get(ship_id)
+        if slot is None:
+            return np.zeros((0, 2))
+        return self._latest(self._positions, slot, window or self.capacity)
+
+    def velocity(self, ship_id, window=1):
+        """
+        :param int ship_id: The ship to look up
+        :param int window: Number of recent turns to average over
+        :return: The (vx, vy) velocity of the ship in units per turn, (0, 0) if unknown
+        :rtype: numpy.ndarray
+        """
+        slot = self._slots.get(ship_id)
+        if slot is None or not self._count[slot]:
+            return np.zeros(2)
+        return self._latest(self._velocities, slot, window).mean(axis=0)
+
+    def velocities(self, ship_ids):
+        """
+        :param list[int] ship_ids: The ships to look up
+        :return: The latest (vx, vy) velocity of each ship, (0, 0) for unknown ships
+        :rtype: numpy.ndarray
+        """
+        result = np.zeros((len(ship_ids), 2))
+        known = [(i, self._slots[ship_id]) for i, ship_id in enumerate(ship_ids) if ship_id in self._slots]
+        if known:
+            rows, slots = np.array(known).T
+            latest = self._velocities[slots, (self._head - 1) % self.capacity]
+            result[rows] = np.where((self._count[slots] > 0)[:, np.newaxis], latest, 0)
+        return result
+
+    def latest_velocities(self):
+        """
+        :return: The latest velocity of every tracked ship, as accepted by game_map.Map.predict
+        :rtype: dict[int, (float, float)]
+        """
+        if not self._slots:
+            return {}
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+        latest = self._velocities[slots, (self._head - 1) % self.capacity]
+        return dict(zip(self._slots, map(tuple, latest.tolist())))
+
+    def lead_point(self, ship, target, speed=constants.MAX_SPEED, window=1):
+        """
+        Where ship should head to meet target, assuming target keeps its recent velocity.
+
+        :param entity.Ship ship: The chasing ship
+        :param entity.Ship target: The ship being chased
+        :param float speed: The chaser's speed per turn
+        :param int window: Number of recent turns to average the target's velocity over
+        :return: The interception point
+        :rtype: entity.Position
+        """
+        points, _ = intercept(np.array([[ship.x, ship.y]]), np.array([[target.x, target.y]]),
+                              self.velocity(target.id, window)[np.newaxis], speed)
+        return entity.Position(float(points[0, 0]), float(points[0, 1]))
+
+
+def intercept(chasers, targets, target_velocities, speed=constants.MAX_SPEED, max_turns=10):
+    """
+    Solve for the earliest point at which chasers moving at speed meet targets moving in a straight line.
+    All inputs are arrays of one row per chaser/target pair. Targets that cannot be caught within max_turns
+    are aimed at where they will be after max_turns.
+
+    :param numpy.ndarray chasers: (n, 2) chaser positions
+    :param numpy.ndarray targets: (n, 2) target positions
+    :param numpy.ndarray target_velocities: (n, 2) target velocities in units per turn
+    :param float speed: The chasers' speed per turn
+    :param float max_turns: The furthest ahead to lead a target
+    :return: The (n, 2) lead points and the (n,) interception times in turns
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    offset = np.asarray(targets, dtype=float) - np.asarray(chasers, dtype=float)
+    velocity = np.asarray(target_velocities, dtype=float)
+
+    # |offset + velocity * t| = speed * t, as a quadratic in t
+    a = np.einsum('ij,ij->i', velocity, velocity) - speed ** 2
+    b = 2 * np.einsum('ij,ij->i', offset, velocity)
+    c = np.einsum('ij,ij->i', offset, offset)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linear = np.where(b < 0, -c / b, np.inf)
+        root = np.sqrt(b ** 2 - 4 * a * c)
+        first, second = (-b - root) / (2 * a), (-b + root) / (2 * a)
+    first = np.where(first >= 0, first, np.inf)
+    second = np.where(second >= 0, second, np.inf)
+    quadratic = np.fmin(first, second)
+    times = np.where(np.abs(a) < 1e-9, linear, quadratic)
+    times = np.where(np.isfinite(times), np.minimum(times, max_turns), max_turns)
+    times = np.where(c == 0, 0, times)
+
+    return targets + velocity * times[:, np.newaxis], times
@@ -1,15 +1,35 @@
 import sys
 import logging
+import contextlib
 import copy
+import signal
+import threading
+import time
 
-from . import game_map
+from . import events, game_map, telemetry
+
+
+class TurnTimeout(BaseException):
+    """
+    Raised in the main thread when the turn budget runs out; the watched commands have already been sent.
+
+    It can interrupt any code running between update_map and send_command_queue, except inside
+    Game.uninterruptible blocks, where it is raised once the block ends. It derives from BaseException so that
+    ``except Exception`` clauses in bot code do not swallow it.
+    """
+    pass
 
 
 class Game:
     """
     :ivar map: Current map representation
     :ivar initial_map: The initial version of the map before game starts
+    :ivar events: What changed between the previous and the current map, if events are tracked
+    :ivar turn_budget: Seconds after a map is parsed at which the watchdog sends the watched commands, or None
     """
+    #: The game being played, whose watchdog send_command_queue reports to
+    _current = None
+
     @staticmethod
     def _send_string(s):
         """
@@ -44,15 +64,116 @@ class Game:
     @staticmethod
     def send_command_queue(command_queue):
         """
-        Issue the given list of commands.
+        Issue the given list of commands. Does nothing if the watchdog already sent this turn's commands.
 
         :param list[str] command_queue: List of commands to send the Halite engine
         :return: nothing
         """
-        for command in command_queue:
-            Game._send_string(command)
+        if Game._current is None:
+            for command in command_queue:
+                Game._send_string(command)
+            Game._done_sending()
+        else:
+            Game._current._send(command_queue)
+
+    def _send(self, command_queue):
+        """
+        Send the turn's commands unless the watchdog already did.
+
+        :param list[str] command_queue: List of commands to send the Halite engine
+        :return: nothing
+        """
+        with self._lock:
+            self._disarm()
+            if self._sent:
+                self._stats.record('turn overrun', time.time() - self._turn_start - self.turn_budget)
+                return
+            self._sent = True
+            for command in command_queue:
+                Game._send_string(command)
+
+            Game._done_sending()
+
+    def watch(self, command_queue):
+        """
+        Send this list as the turn's commands if the turn budget runs out before send_command_queue is called.
+        Commands appended to it later are included.
+
+        :param list[str] command_queue: The turn's command list
+        :return: nothing
+        """
+        self._watched = command_queue
 
-        Game._done_sending()
+    @contextlib.contextmanager
+    def uninterruptible(self):
+        """
+        Defer TurnTimeout to the end of the block, e.g. while updating state that outlives the turn. The watched
+        commands are still sent on time.
+        """
+        self._deferring += 1
+        try:
+            yield
+        finally:
+            self._deferring -= 1
+        if not self._deferring and self._interrupted:
+            self._interrupted = False
+            raise TurnTimeout()
+
+    def _arm(self):
+        """
+        Start the watchdog for the turn just parsed.
+
+        :return: nothing
+        """
+        self._turn_start = time.time()
+        self._sent = False
+        self._interrupted = False
+        self._watched = []
+        if self.turn_budget is None:
+            return
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGALRM, self._expire)
+            signal.setitimer(signal.ITIMER_REAL, self.turn_budget)
+        else:
+            # The thread cannot interrupt planning: the late send_command_queue call is dropped instead
+            self._timer = threading.Timer(self.turn_budget, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _disarm(self):
+        """
+        Stop the watchdog.
+
+        :return: nothing
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        elif self.turn_budget is not None and hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def _expire(self, *_):
+        """
+        Send the watched commands and, when running as a signal handler, interrupt planning.
+
+        :raises TurnTimeout: When called from the interval timer outside an uninterruptible block
+        :return: nothing
+        """
+        with self._lock:
+            if self._sent:
+                return
+            self._sent = True
+            for command in list(self._watched):
+                Game._send_string(command)
+            Game._done_sending()
+            self._timer = None
+        self._stats.count('turn overruns')
+        logging.warning("Turn budget of %ss exceeded, sent %s queued commands", self.turn_budget, len(self._watched))
+        if threading.current_thread() is threading.main_thread():
+            if self._deferring:
+                self._interrupted = True
+            else:
+                raise TurnTimeout()
 
     @staticmethod
     def _set_up_logging(tag, name):
@@ -67,21 +188,38 @@ class Game:
         logging.basicConfig(filename=log_file, level=logging.DEBUG, filemode='w')
         logging.info("Initialized bot {}".format(name))
 
-    def __init__(self, name):
+    def __init__(self, name, track_events=False, turn_budget=None, stats=telemetry.default):
         """
         Initialize the bot with the given name.
 
         :param name: The name of the bot.
+        :param bool track_events: Whether to compute the events between consecutive maps on every update.
+        :param float turn_budget: Hard limit in seconds on the time from a map update to sending the commands; when
+            it runs out the watched commands are sent (see :function:`watch`). None disables the watchdog.
+        :param telemetry.Telemetry stats: Where overruns are recorded
         """
+        self.turn_budget = turn_budget
+        self._stats = stats
+        self._lock = threading.RLock()
+        self._timer = None
+        self._watched = []
+        self._sent = False
+        self._deferring = 0
+        self._interrupted = False
+        self._turn_start = time.time()
         self._name = name
         self._send_name = False
+        self._track_events = track_events
+        self.events = []
         tag = int(self._get_string())
         Game._set_up_logging(tag, name)
         width, height = [int(x) for x in self._get_string().strip().split()]
         self.map = game_map.Map(tag, width, height)
         self.update_map()
-        self.initial_map = copy.deepcopy(self.map)
+        self._disarm()  # Initialization has its own, longer limit
+        self.initial_map = self.map.fork()
         self._send_name = True
+        Game._current = self
 
     def update_map(self):
         """
@@ -95,5 +233,9 @@ class Game:
             self._done_sending()
             self._send_name = False
         logging.info("---NEW TURN---")
+        previous = copy.copy(self.map) if self._track_events else None
         self.map._parse(self._get_string())
+        if previous is not None:
+            self.events = events.diff(previous, self.map)
+        self._arm()
         return self.map
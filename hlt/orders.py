@@ -0,0 +1,184 @@
+"""
+Per-ship orders that persist across turns.
+
+A ship that was sent somewhere keeps its order (target, mode and the leg it is flying) until the order stops
+making sense. Checking that is much cheaper than planning: the target must still exist, a planet must not have
+been taken or filled, the situation the order was given in must not have changed, and the straight leg to the
+target must still be clear. Only ships whose order failed go back through the planner:
+
+    orders = OrderBook()
+    while True:
+        game_map = game.update_map()
+        orders.begin_turn(game_map, game.events)
+        for ship in my_ships:
+            command = orders.revalidate(ship, hasher, context)
+            if command is None:
+                command = plan(ship)
+                orders.place(ship, target, 'expand', context)
+"""
+from . import constants, entity, events, telemetry
+
+
+class Order:
+    """
+    A standing order of one ship.
+
+    :ivar ship_id: The ship
+    :ivar target_id: The planet or ship it heads for
+    :ivar is_planet: Whether the target is a planet
+    :ivar mode: Free-form label, e.g. 'expand'
+    :ivar destination: The end of the planned leg when the order was given
+    :ivar context: Hashable summary of the situation the order was given in
+    :ivar turn: The turn the order was given on
+    """
+
+    def __init__(self, ship_id, target, mode, destination, context, turn):
+        self.ship_id = ship_id
+        self.target_id = target.id
+        self.is_planet = isinstance(target, entity.Planet)
+        self.mode = mode
+        self.destination = destination
+        self.context = context
+        self.turn = turn
+
+    def __str__(self):
+        return "Order ship {} {} {} {} (turn: {})".format(
+            self.ship_id, self.mode, 'planet' if self.is_planet else 'ship', self.target_id, self.turn)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class OrderBook:
+    """
+    The standing orders of every ship.
+
+    :ivar turn: Number of turns so far
+    :ivar max_age: Orders older than this many turns are re-planned anyway
+    :ivar kept: Orders that passed revalidation this turn
+    :ivar dropped: Orders that failed revalidation this turn
+    """
+
+    def __init__(self, max_age=10, stats=telemetry.default):
+        """
+        :param int max_age: Turns after which an order is re-planned even if still valid
+        :param telemetry.Telemetry stats: Where kept and dropped orders are counted
+        """
+        self.turn = 0
+        self.max_age = max_age
+        self.kept = 0
+        self.dropped = 0
+        self._orders = {}
+        self._game_map = None
+        self._stats = stats
+
+    def begin_turn(self, game_map, map_events):
+        """
+        Forget the orders of ships destroyed since the previous turn.
+
+        :param game_map.Map game_map: The new map
+        :param list[events.MapEvent] map_events: The events since the previous map
+        :return: nothing
+        """
+        self.turn += 1
+        self.kept = 0
+        self.dropped = 0
+        self._game_map = game_map
+        for event in events.of_type(map_events, events.EventType.SHIP_DESTROYED):
+            self._orders.pop(event.entity_id, None)
+
+    def place(self, ship, target, mode, context=None):
+        """
+        Give a ship a standing order, replacing any previous one.
+
+        :param entity.Ship ship: The ship
+        :param entity.Entity target: The planet or ship it heads for
+        :param str mode: What the ship does there
+        :param context: Hashable summary of the situation; the order is dropped once it changes
+        :return: The order
+        :rtype: Order
+        """
+        order = Order(ship.id, target, mode, ship.closest_point_to(target), context, self.turn)
+        self._orders[ship.id] = order
+        return order
+
+    def get(self, ship_id):
+        """
+        :param int ship_id: A ship
+        :return: The ship's standing order, or None
+        :rtype: Order
+        """
+        return self._orders.get(ship_id)
+
+    def cancel(self, ship_id):
+        """
+        :param int ship_id: A ship
+        :return: nothing
+        """
+        self._orders.pop(ship_id, None)
+
+    def target(self, order):
+        """
+        :param Order order: An order
+        :return: The order's target on the current map, or None if it is gone
+        :rtype: entity.Entity
+        """
+        if order.is_planet:
+            return self._game_map.get_planet(order.target_id)
+        return self._game_map.get_ship(order.target_id)
+
+    def _still_valid(self, ship, order, target, context):
+        """
+        :return: Whether the order still applies, ignoring the path
+        :rtype: bool
+        """
+        if target is None or order.context != context or self.turn - order.turn > self.max_age:
+            return False
+        if order.is_planet:
+            # Arrived: docking is the planner's call
+            owner = target.owner
+            return not target.is_full() and (owner is None or owner.id == ship.owner.id) and not ship.can_dock(target)
+        return target.owner.id != ship.owner.id
+
+    def revalidate(self, ship, hasher, context=None, check=None):
+        """
+        Continue a ship's standing order if it is still valid, dropping it otherwise.
+
+        :param entity.Ship ship: The ship
+        :param transposition.NeighbourhoodHasher hasher: The current turn's hasher, for the clear-path check
+        :param context: The ship's current situation, compared with the one the order was given in
+        :param check: Optional extra test, called as check(order, target)
+        :return: The thrust continuing the order, or None if the ship has to be planned again
+        :rtype: str
+        """
+        order = self._orders.get(ship.id)
+        if order is None:
+            return None
+        target = self.target(order)
+        command = None
+        if self._still_valid(ship, order, target, context) and (check is None or check(order, target)):
+            destination = ship.closest_point_to(target)
+            distance = ship.calculate_distance_between(destination)
+            angle = ship.calculate_angle_between(destination)
+            magnitude = int(min(constants.MAX_SPEED, distance))
+            if hasher.is_clear(ship, magnitude, round(angle)):
+                order.destination = destination
+                command = ship.thrust(magnitude, angle)
+        if command is None:
+            del self._orders[ship.id]
+            self.dropped += 1
+            self._stats.count('orders dropped')
+        else:
+            self.kept += 1
+            self._stats.count('orders kept')
+        return command
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __str__(self):
+        return "OrderBook turn {} ({} orders, {} kept, {} dropped)".format(
+            self.turn, len(self._orders), self.kept, self.dropped)
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,135 @@
+"""
+Multi-rate planning: slowly changing strategic quantities are recomputed every few turns, or as soon as a map
+event they depend on happens, while per-ship tactics keep running every turn.
+
+A task is a function with a cadence and a set of triggers. Tasks are run lazily, on the first get() of a turn in
+which they are due, so they may read anything the bot sets up before asking for them:
+
+    planner = Planner()
+    planner.register('leader', find_leader, every=5, triggers=(EventType.PLANET_OWNER_CHANGED,))
+    while True:
+        game_map = game.update_map()
+        planner.update(game.events)
+        leader = planner.get('leader')
+"""
+from . import telemetry
+
+
+class Task:
+    """
+    A registered planning task.
+
+    :ivar name: The task's name
+    :ivar function: Called with no arguments to compute the value
+    :ivar every: Cadence in turns: the value is recomputed at least this often
+    :ivar triggers: Event types, or predicates on a MapEvent, that make the value stale
+    :ivar value: The last computed value
+    :ivar last_turn: The turn the value was computed on, None if never
+    :ivar stale: Whether the value must be recomputed before use
+    :ivar runs: How many times the task ran
+    """
+
+    def __init__(self, name, function, every=1, triggers=()):
+        self.name = name
+        self.function = function
+        self.every = every
+        self.triggers = tuple(triggers)
+        self.value = None
+        self.last_turn = None
+        self.stale = True
+        self.runs = 0
+
+    def triggered_by(self, event):
+        """
+        :param events.MapEvent event: A map event
+        :return: Whether the event makes the value stale
+        :rtype: bool
+        """
+        return any(event.type is trigger if not callable(trigger) else trigger(event) for trigger in self.triggers)
+
+    def __str__(self):
+        return "Task {} (every {} turns, {} runs, last on turn {})"\
+            .format(self.name, self.every, self.runs, self.last_turn)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Planner:
+    """
+    The registered tasks and their cached values.
+
+    :ivar turn: Number of updates so far
+    :ivar ran: Names of the tasks run this turn
+    """
+
+    def __init__(self, stats=telemetry.default):
+        """
+        :param telemetry.Telemetry stats: Where task runs are timed
+        """
+        self.turn = 0
+        self.ran = []
+        self._tasks = {}
+        self._stats = stats
+
+    def register(self, name, function, every=1, triggers=()):
+        """
+        Add a task. It runs the first time it is asked for.
+
+        :param str name: The task's name
+        :param function: Called with no arguments to compute the value
+        :param int every: Recompute at least every this many turns
+        :param triggers: Event types, or predicates on a MapEvent, that force a recompute
+        :return: The task
+        :rtype: Task
+        """
+        task = Task(name, function, every, triggers)
+        self._tasks[name] = task
+        return task
+
+    def update(self, map_events):
+        """
+        Start a new turn: mark the tasks whose cadence elapsed or whose triggers fired as stale.
+
+        :param list[events.MapEvent] map_events: The events since the previous map
+        :return: nothing
+        """
+        self.turn += 1
+        self.ran = []
+        for task in self._tasks.values():
+            if task.stale:
+                continue
+            if self.turn - task.last_turn >= task.every or any(task.triggered_by(event) for event in map_events):
+                task.stale = True
+
+    def invalidate(self, name):
+        """
+        Force a task to be recomputed the next time it is asked for.
+
+        :param str name: The task
+        :return: nothing
+        """
+        self._tasks[name].stale = True
+
+    def get(self, name):
+        """
+        :param str name: The task
+        :return: The task's value, recomputed first if it is stale
+        """
+        task = self._tasks[name]
+        if task.stale:
+            with self._stats.timer('plan ' + name):
+                task.value = task.function()
+            task.last_turn = self.turn
+            task.stale = False
+            task.runs += 1
+            self.ran.append(name)
+        return task.value
+
+    def __str__(self):
+        return "Planner turn {} (ran: {}; cached: {})".format(
+            self.turn, ", ".join(self.ran) or "none",
+            ", ".join(name for name in self._tasks if name not in self.ran) or "none")
+
+    def __repr__(self):
+        return self.__str__()
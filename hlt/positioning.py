@@ -0,0 +1,135 @@
+"""
+Vectorized scoring of every position a ship can reach next turn.
+
+The engine accepts 2,880 distinct thrusts (magnitudes 0 to MAX_SPEED, whole-degree angles). For a ship in
+combat all of them are scored at once from a few terms: how many enemy ships could hit the end point next turn,
+how many of our ships could cover it, and whether it puts the intended target within weapon range. Thrusts that
+leave the map or run into a planet or ship are never chosen.
+
+    scorer = PositionScorer(game_map)
+    command = scorer.command(ship, target)
+"""
+import numpy as np
+
+from . import constants, simulator
+
+#: Distance from which a ship can move into weapon range of a point and fire at it next turn
+REACH = constants.MAX_SPEED + simulator.ATTACK_RANGE
+
+_MAGNITUDES = np.arange(constants.MAX_SPEED + 1)
+_ANGLES = np.arange(360)
+#: (magnitudes, angles, 2) displacement of every thrust
+_OFFSETS = _MAGNITUDES[:, np.newaxis, np.newaxis] * np.stack(
+    (np.cos(np.radians(_ANGLES)), np.sin(np.radians(_ANGLES))), axis=-1)[np.newaxis]
+
+
+class Weights:
+    """
+    Weights of the positioning terms.
+
+    :ivar target: Reward for ending in weapon range of the target
+    :ivar threat: Penalty per enemy ship able to hit the end point
+    :ivar cover: Reward per friendly ship able to cover the end point
+    :ivar distance: Penalty per unit of distance left to the target
+    """
+
+    def __init__(self, target=5.0, threat=1.0, cover=1.0, distance=0.1):
+        self.target = target
+        self.threat = threat
+        self.cover = cover
+        self.distance = distance
+
+
+class PositionScorer:
+    """
+    Scores thrusts against one turn's map. Build a new scorer every turn.
+    """
+
+    def __init__(self, game_map, weights=None):
+        """
+        :param game_map.Map game_map: The current map
+        :param Weights weights: The term weights (default: Weights())
+        """
+        self.game_map = game_map
+        self.weights = weights or Weights()
+        ships = list(game_map.ships_by_id().values())
+        self._ship_ids = np.array([ship.id for ship in ships], dtype=np.int64)
+        self._ship_pos = np.array([(ship.x, ship.y) for ship in ships]).reshape(-1, 2)
+        self._ship_owner = np.array([ship.owner.id for ship in ships], dtype=np.int64)
+        self._undocked = np.array([ship.docking_status == ship.DockingStatus.UNDOCKED for ship in ships],
+                                  dtype=bool)
+        planets = game_map.all_planets()
+        self._planet_pos = np.array([(planet.x, planet.y) for planet in planets]).reshape(-1, 2)
+        self._planet_radius = np.array([planet.radius for planet in planets])
+
+    def _blocked(self, ship):
+        """
+        :return: (magnitudes, angles) thrusts whose path leaves the map or runs into a planet or another ship
+        :rtype: numpy.ndarray
+        """
+        origin = np.array((ship.x, ship.y))
+        ends = origin + _OFFSETS
+        blocked = (ends[..., 0] < 0) | (ends[..., 1] < 0) \
+            | (ends[..., 0] > self.game_map.width) | (ends[..., 1] > self.game_map.height)
+
+        others = self._ship_ids != ship.id
+        centres = np.concatenate((self._planet_pos, self._ship_pos[others]))
+        radii = np.concatenate((self._planet_radius, np.full(others.sum(), constants.SHIP_RADIUS)))
+        near = np.linalg.norm(centres - origin, axis=1) <= radii + constants.MAX_SPEED + ship.radius + 0.1
+        if near.any():
+            # Closest approach of each straight path to each nearby obstacle
+            relative = centres[near] - origin
+            unit = _OFFSETS[-1] / constants.MAX_SPEED
+            along = np.clip(unit @ relative.T, 0, _MAGNITUDES[:, np.newaxis, np.newaxis])
+            closest = along[..., np.newaxis] * unit[np.newaxis, :, np.newaxis]
+            gap = np.linalg.norm(closest - relative, axis=-1)
+            blocked |= (gap <= radii[near] + ship.radius + 0.1).any(axis=-1)
+        # Staying put never collides
+        blocked[0] = False
+        return blocked
+
+    def score(self, ship, target):
+        """
+        Score every thrust of a ship.
+
+        :param entity.Ship ship: The ship to move
+        :param entity.Entity target: The ship or position to fight
+        :return: (magnitudes, angles) scores, -inf for blocked thrusts
+        :rtype: numpy.ndarray
+        """
+        ends = np.array((ship.x, ship.y)) + _OFFSETS
+        weights = self.weights
+
+        nearby = np.linalg.norm(self._ship_pos - (ship.x, ship.y), axis=1) <= REACH + constants.MAX_SPEED
+        enemy = nearby & self._undocked & (self._ship_owner != ship.owner.id)
+        friend = nearby & self._undocked & (self._ship_owner == ship.owner.id) & (self._ship_ids != ship.id)
+        threat = (np.linalg.norm(ends[..., np.newaxis, :] - self._ship_pos[enemy], axis=-1) <= REACH).sum(axis=-1)
+        cover = (np.linalg.norm(ends[..., np.newaxis, :] - self._ship_pos[friend], axis=-1) <= REACH).sum(axis=-1)
+
+        distance = np.linalg.norm(ends - (target.x, target.y), axis=-1) - getattr(target, 'radius', 0)
+        in_range = distance <= constants.WEAPON_RADIUS + constants.SHIP_RADIUS
+
+        scores = weights.target * in_range - weights.threat * threat + weights.cover * cover \
+            - weights.distance * distance
+        return np.where(self._blocked(ship), -np.inf, scores)
+
+    def best(self, ship, target):
+        """
+        :param entity.Ship ship: The ship to move
+        :param entity.Entity target: The ship or position to fight
+        :return: The best thrust as (magnitude, angle, score); magnitude 0 if every move is blocked
+        :rtype: (int, int, float)
+        """
+        scores = self.score(ship, target)
+        magnitude, angle = np.unravel_index(np.argmax(scores), scores.shape)
+        return int(magnitude), int(angle), float(scores[magnitude, angle])
+
+    def command(self, ship, target):
+        """
+        :param entity.Ship ship: The ship to move
+        :param entity.Entity target: The ship or position to fight
+        :return: The thrust command of the best thrust
+        :rtype: str
+        """
+        magnitude, angle, _ = self.best(ship, target)
+        return ship.thrust(magnitude, angle)
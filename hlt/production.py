@@ -0,0 +1,289 @@
+"""
+Forecasts of planet production: when each planet spawns its next ship, when it runs dry and how long it takes to
+fill up with the ships already heading for it.
+
+Forecasts are kept in absolute turns, so a planet whose docked ships did not change stays valid from one turn to
+the next and only the planets touched by the turn's map events (or whose production drifted from the forecast)
+are recomputed:
+
+    forecast = ProductionForecast()
+    while True:
+        game_map = game.update_map()
+        forecast.update(game_map, game.events)
+        forecast.clear_en_route()
+        ...
+        forecast.add_en_route(ship, planet)
+"""
+import bisect
+import math
+
+from . import constants, entity, events
+
+
+def _eta(ship, planet):
+    """
+    :return: Turns until a ship travelling at full speed is docked at the planet
+    :rtype: int
+    """
+    gap = ship.calculate_distance_between(planet) - planet.radius - constants.DOCK_RADIUS - ship.radius
+    return max(0, math.ceil(gap / constants.MAX_SPEED)) + 1 + constants.DOCK_TURNS
+
+
+class PlanetForecast:
+    """
+    The production schedule of one planet, computed on a given turn.
+
+    :ivar planet_id: The planet
+    :ivar owner_id: The owning player's id, None if unowned
+    :ivar turn: The turn the schedule was computed on
+    :ivar spots: Number of docking spots
+    :ivar committed: Ships docking, docked or undocking
+    :ivar ready_turns: Turns from computation until each docking ship produces, sorted
+    :ivar producers: Ships producing right now
+    :ivar production: Production accumulated towards the next ship when computed
+    :ivar remaining: Resources left when computed
+    :ivar dry_turn: Absolute turn the planet runs out of resources, None if it never produces
+    """
+
+    def __init__(self, planet, turn):
+        """
+        :param entity.Planet planet: The planet, as parsed this turn
+        :param int turn: The current turn
+        """
+        self.planet_id = planet.id
+        self.owner_id = planet.owner.id if planet.owner is not None else None
+        self.turn = turn
+        self.spots = planet.num_docking_spots
+        ships = planet.all_docked_ships()
+        self.committed = len(ships)
+        self.producers = sum(ship.docking_status == entity.Ship.DockingStatus.DOCKED for ship in ships)
+        self.ready_turns = sorted(ship._docking_progress for ship in ships
+                                  if ship.docking_status == entity.Ship.DockingStatus.DOCKING)
+        self.production = planet.current_production
+        self.remaining = planet.remaining_resources
+
+        rate = (self.producers + len(self.ready_turns)) * constants.BASE_PRODUCTIVITY
+        self.dry_turn = None
+        if rate and self.remaining > 0:
+            head = self.ready_turns[-1] if self.ready_turns else 0
+            left = self.remaining - self.produced(head)
+            self.dry_turn = turn + head + max(0, math.ceil(left / rate))
+
+    def produced(self, turns):
+        """
+        :param int turns: Turns after computation
+        :return: Total production of the planet over those turns
+        :rtype: int
+        """
+        total = 0
+        head = self.ready_turns[-1] if self.ready_turns else 0
+        for step in range(1, min(turns, head) + 1):
+            producers = self.producers + bisect.bisect_right(self.ready_turns, step)
+            total += producers * constants.BASE_PRODUCTIVITY
+        if turns > head:
+            total += (self.producers + len(self.ready_turns)) * constants.BASE_PRODUCTIVITY * (turns - head)
+        return min(total, self.remaining)
+
+    def spawn_turn(self, turn):
+        """
+        :param int turn: The current absolute turn
+        :return: Absolute turn of the next spawn, None if none is coming
+        :rtype: int
+        """
+        elapsed = turn - self.turn
+        head = self.ready_turns[-1] if self.ready_turns else 0
+        production, remaining = self.expected(turn)
+        needed = constants.PRODUCTION_PER_SHIP - production
+        if needed > remaining:
+            return None
+        for step in range(elapsed + 1, head + 1):
+            needed -= (self.producers + bisect.bisect_right(self.ready_turns, step)) * constants.BASE_PRODUCTIVITY
+            if needed <= 0:
+                return self.turn + step
+        rate = (self.producers + len(self.ready_turns)) * constants.BASE_PRODUCTIVITY
+        if not rate:
+            return None
+        return max(turn, self.turn + head) + math.ceil(needed / rate)
+
+    def expected(self, turn):
+        """
+        :param int turn: An absolute turn
+        :return: The production towards the next ship and the resources left forecast for that turn
+        :rtype: (int, int)
+        """
+        produced = self.produced(turn - self.turn)
+        return (self.production + produced) % constants.PRODUCTION_PER_SHIP, self.remaining - produced
+
+
+class ProductionForecast:
+    """
+    Production forecasts of every planet, updated incrementally every turn.
+
+    :ivar turn: Number of updates so far
+    :ivar recomputed: Number of planet forecasts recomputed on the last update
+    """
+
+    def __init__(self):
+        self.turn = 0
+        self.recomputed = 0
+        self._planets = {}
+        self._forecasts = {}
+        self._open = {}
+        self._ship_planet = {}
+        self._en_route = {}
+
+    def update(self, game_map, map_events):
+        """
+        Bring the forecasts up to date with a new turn.
+
+        :param game_map.Map game_map: The new map
+        :param list[events.MapEvent] map_events: The events since the previous map
+        :return: nothing
+        """
+        self.turn += 1
+        self._planets = {planet.id: planet for planet in game_map.all_planets()}
+        dirty = set(self._planets) - set(self._forecasts)
+
+        for event in map_events:
+            if event.type is events.EventType.DOCKING_STATUS_CHANGED:
+                ship = game_map.get_ship(event.entity_id)
+                if ship.planet is not None:
+                    dirty.add(ship.planet.id)
+                if event.entity_id in self._ship_planet:
+                    dirty.add(self._ship_planet[event.entity_id])
+            elif event.type is events.EventType.SHIP_DESTROYED:
+                if event.entity_id in self._ship_planet:
+                    dirty.add(self._ship_planet.pop(event.entity_id))
+            elif event.type is not events.EventType.SHIP_SPAWNED:
+                dirty.add(event.entity_id)
+
+        for planet_id, forecast in list(self._forecasts.items()):
+            planet = self._planets.get(planet_id)
+            if planet is None:
+                self._forget(planet_id)
+            elif planet_id not in dirty \
+                    and forecast.expected(self.turn) != (planet.current_production, planet.remaining_resources):
+                dirty.add(planet_id)
+
+        self.recomputed = 0
+        for planet_id in dirty:
+            planet = self._planets.get(planet_id)
+            if planet is None:
+                continue
+            self._forget(planet_id)
+            forecast = PlanetForecast(planet, self.turn)
+            self._forecasts[planet_id] = forecast
+            for ship in planet.all_docked_ships():
+                self._ship_planet[ship.id] = planet_id
+            if forecast.committed < forecast.spots:
+                self._open.setdefault(forecast.owner_id, set()).add(planet_id)
+            self.recomputed += 1
+
+    def _forget(self, planet_id):
+        """
+        Drop the forecast of a planet.
+
+        :return: nothing
+        """
+        forecast = self._forecasts.pop(planet_id, None)
+        if forecast is not None:
+            self._open.get(forecast.owner_id, set()).discard(planet_id)
+
+    def clear_en_route(self):
+        """
+        Forget which ships are heading for which planet, before this turn's orders are given.
+
+        :return: nothing
+        """
+        self._en_route.clear()
+
+    def add_en_route(self, ship, planet):
+        """
+        Record that a ship was sent to dock at a planet.
+
+        :param entity.Ship ship: The ship
+        :param entity.Planet planet: Its destination
+        :return: nothing
+        """
+        bisect.insort(self._en_route.setdefault(planet.id, []), _eta(ship, planet))
+
+    def en_route(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: Number of ships sent to dock there this turn
+        :rtype: int
+        """
+        return len(self._en_route.get(planet_id, ()))
+
+    def open_spots(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: Docking spots neither taken nor claimed by a ship on its way
+        :rtype: int
+        """
+        forecast = self._forecasts.get(planet_id)
+        if forecast is None:
+            return 0
+        return forecast.spots - forecast.committed - self.en_route(planet_id)
+
+    def is_expansion_full(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: True if docked ships and ships on their way already take every docking spot
+        :rtype: bool
+        """
+        return self.open_spots(planet_id) <= 0
+
+    def open_planets(self, owner_id):
+        """
+        :param int owner_id: A player id, or None for unowned planets
+        :return: The owner's planets that still have free docking spots (ignoring ships on their way), by id
+        :rtype: dict[int, entity.Planet]
+        """
+        return {planet_id: self._planets[planet_id] for planet_id in sorted(self._open.get(owner_id, ()))}
+
+    def next_spawn(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: Turns until the planet spawns its next ship, None if none is coming
+        :rtype: int
+        """
+        forecast = self._forecasts.get(planet_id)
+        spawn_turn = forecast.spawn_turn(self.turn) if forecast is not None else None
+        return spawn_turn - self.turn if spawn_turn is not None else None
+
+    def dry_in(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: Turns until the planet runs out of resources at its current docking, None if it is not producing
+        :rtype: int
+        """
+        forecast = self._forecasts.get(planet_id)
+        if forecast is None or forecast.dry_turn is None:
+            return None
+        return max(forecast.dry_turn - self.turn, 0)
+
+    def fill_in(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: Turns until every docking spot is taken by a docked ship, counting ships on their way; None if
+                 there are not enough ships for that
+        :rtype: int
+        """
+        forecast = self._forecasts.get(planet_id)
+        if forecast is None:
+            return None
+        free = forecast.spots - forecast.committed
+        arrivals = self._en_route.get(planet_id, [])
+        if free > len(arrivals):
+            return None
+        waits = [forecast.turn + ready - self.turn for ready in forecast.ready_turns] + arrivals[:max(free, 0)]
+        return max([0] + waits)
+
+    def __str__(self):
+        producing = sum(forecast.dry_turn is not None for forecast in self._forecasts.values())
+        return "ProductionForecast turn {} ({} planets, {} producing, {} recomputed)"\
+            .format(self.turn, len(self._forecasts), producing, self.recomputed)
+
+    def __repr__(self):
+        return self.__str__()
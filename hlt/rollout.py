@@ -0,0 +1,337 @@
+"""
+Time-budgeted Monte Carlo search for ships in contact with the enemy.
+
+For a contested ship a handful of candidate actions (attack, retreat, hold, dock) are scored by playing the
+next few turns of its neighbourhood forward in hlt.simulator with randomized default policies for every other
+ship. Rollouts of one candidate run as a batch of games, batches are farmed out to a process pool, and the
+search stops at a hard deadline, returning the best candidate found so far:
+
+    search = RolloutSearch()
+    for ship in contested_ships(game_map, game_map.my_id):
+        result = search.search(game_map, ship, deadline=end_time)
+        command = result.command(ship, game_map)
+
+The module pulls in hlt.batch and the local engine, so it is not imported by hlt itself; import hlt.rollout where
+it is used.
+"""
+import concurrent.futures
+import math
+import os
+import time
+
+import numpy as np
+
+from . import batch, constants, entity, simulator, telemetry
+
+#: Distance within which an enemy ship makes a ship contested: both can close in and fire next turn
+CONTACT_RADIUS = 2 * constants.MAX_SPEED + constants.WEAPON_RADIUS
+#: Candidate actions
+ATTACK, RETREAT, HOLD, DOCK = 'attack', 'retreat', 'hold', 'dock'
+#: Score of a ship that is docking or docked, on top of its health, as it will produce
+DOCKED_VALUE = constants.BASE_SHIP_HEALTH / 2
+
+
+def contested_ships(game_map, player_id, radius=CONTACT_RADIUS):
+    """
+    :param game_map.Map game_map: The current map
+    :param int player_id: The player whose ships to look at
+    :param float radius: Contact distance
+    :return: The player's undocked ships with an undocked enemy ship within radius
+    :rtype: list[entity.Ship]
+    """
+    enemies = [ship for player in game_map.all_players() if player.id != player_id
+               for ship in game_map.undocked_ships(player.id).values()]
+    if not enemies:
+        return []
+    enemy_pos = np.array([(ship.x, ship.y) for ship in enemies])
+    contested = []
+    for ship in game_map.undocked_ships(player_id).values():
+        if (np.hypot(enemy_pos[:, 0] - ship.x, enemy_pos[:, 1] - ship.y) <= radius).any():
+            contested.append(ship)
+    return contested
+
+
+def local_state(game_map, ship, radius=2 * CONTACT_RADIUS):
+    """
+    Build a single-game state holding only the ships around a ship, and every planet with the ships docked to it.
+
+    :param game_map.Map game_map: The current map
+    :param entity.Ship ship: The ship at the centre
+    :param float radius: Undocked ships farther than this from the centre are left out
+    :return: The state and the slot of the centre ship in it
+    :rtype: (simulator.State, int)
+    """
+    state = simulator.State.from_map(game_map)
+    # Docked ships are what owns a planet, so they stay wherever they are
+    near = state.ship_alive[0] & ((np.linalg.norm(state.ship_pos[0] - (ship.x, ship.y), axis=-1) <= radius)
+                                  | (state.ship_status[0] != simulator.UNDOCKED))
+    for name in simulator.State._SHIP_FIELDS:
+        setattr(state, name, getattr(state, name)[:, near])
+    slot = int(np.flatnonzero(state.ship_id[0] == ship.id)[0])
+    return state, slot
+
+
+def _replicate(state, games):
+    """
+    :return: A state holding games copies of the single game of state
+    :rtype: simulator.State
+    """
+    copies = simulator.State.__new__(simulator.State)
+    copies.__dict__ = {name: np.repeat(value, games, axis=0) for name, value in state.__dict__.items()}
+    return copies
+
+
+def _jitter(state, commands, rng, spread):
+    """
+    Randomize the default policies: rotate every thrust by up to spread degrees and let one ship in five hold.
+
+    :return: nothing
+    """
+    thrusting = commands.kind == simulator.THRUST
+    radians = np.radians(rng.integers(-spread, spread + 1, size=thrusting.shape))
+    vx, vy = commands.velocity[..., 0], commands.velocity[..., 1]
+    commands.velocity = np.stack((vx * np.cos(radians) - vy * np.sin(radians),
+                                  vx * np.sin(radians) + vy * np.cos(radians)), axis=-1)
+    holding = thrusting & (rng.random(thrusting.shape) < 0.2)
+    commands.kind[holding] = simulator.NO_COMMAND
+    commands.velocity[holding] = 0
+
+
+def _apply_candidate(state, commands, player, slot, candidate, turn):
+    """
+    Overwrite the command of the searched ship with the one its candidate prescribes for this turn.
+
+    :return: nothing
+    """
+    action, planet_id = candidate
+    mask = np.zeros(state.ship_alive.shape, dtype=bool)
+    mask[:, slot] = state.ship_alive[:, slot] & (state.ship_owner[:, slot] == player) \
+        & (state.ship_status[:, slot] == simulator.UNDOCKED)
+    commands.kind[:, slot] = simulator.NO_COMMAND
+    commands.velocity[:, slot] = 0
+    if action == ATTACK:
+        batch.attack_policy(state, player, commands, mask)
+    elif action == RETREAT:
+        enemies = state.ship_alive & (state.ship_owner != player)
+        target, distance = batch._nearest(state.ship_pos, state.ship_pos,
+                                          np.broadcast_to(enemies[:, np.newaxis], mask.shape + enemies.shape[1:]))
+        fleeing = mask & np.isfinite(distance)
+        target_pos = np.take_along_axis(state.ship_pos, target[..., np.newaxis], axis=1)
+        away = state.ship_pos - target_pos
+        commands.thrust_many(fleeing, np.full(mask.shape, constants.MAX_SPEED),
+                             np.degrees(np.arctan2(away[..., 1], away[..., 0])))
+    elif action == DOCK and turn == 0:
+        commands.kind[mask] = simulator.DOCK
+        commands.planet[mask] = planet_id
+
+
+def _score(state, player):
+    """
+    :return: (games,) the player's local material minus its opponents'
+    :rtype: numpy.ndarray
+    """
+    value = np.where(state.ship_alive, state.ship_health, 0) \
+        + DOCKED_VALUE * (state.ship_alive & (state.ship_status != simulator.UNDOCKED))
+    mine = state.ship_owner == player
+    return (value * mine).sum(axis=1) - (value * ~mine).sum(axis=1)
+
+
+def run_rollouts(state, player, slot, candidate, rollouts, depth, seed, spread=30, deadline=None, chunk=None):
+    """
+    Play rollouts of one candidate in batches of chunk games, starting no batch after the deadline. Runs in the
+    worker processes, or in the calling one when there is no pool.
+
+    :param simulator.State state: Single-game local state
+    :param int player: The searching player
+    :param int slot: The slot of the searched ship
+    :param tuple candidate: (action, planet id)
+    :param int rollouts: Number of rollouts to play
+    :param int depth: Turns per rollout
+    :param int seed: Random seed
+    :param int spread: Maximum random rotation of default-policy thrusts, in degrees
+    :param float deadline: time.time() after which no further batch is started (default: play them all)
+    :param int chunk: Rollouts per batch (default: all of them in one batch)
+    :return: Sum of the rollout scores, number of rollouts played and seconds spent
+    :rtype: (float, int, float)
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    chunk = chunk or rollouts
+    total = 0.0
+    played = 0
+    while played < rollouts and (deadline is None or time.time() < deadline):
+        games = _replicate(state, min(chunk, rollouts - played))
+        baseline = _score(games, player)
+        for turn in range(depth):
+            commands = simulator.Commands(games)
+            for other in range(games.players):
+                batch.attack_policy(games, other, commands)
+            _jitter(games, commands, rng, spread)
+            _apply_candidate(games, commands, player, slot, candidate, turn)
+            simulator.step(games, commands)
+        total += float((_score(games, player) - baseline).sum())
+        played += games.games
+    return total, played, time.perf_counter() - started
+
+
+class SearchResult:
+    """
+    The outcome of one search.
+
+    :ivar best: The best candidate, as (action, planet id)
+    :ivar scores: Mean score of every candidate that got rollouts
+    :ivar rollouts: Number of rollouts completed before the deadline
+    :ivar rollouts_per_core_second: Rollout throughput of a single worker
+    """
+
+    def __init__(self, best, scores, rollouts, rollouts_per_core_second):
+        self.best = best
+        self.scores = scores
+        self.rollouts = rollouts
+        self.rollouts_per_core_second = rollouts_per_core_second
+
+    def command(self, ship, game_map):
+        """
+        Turn the best candidate into a command for the ship.
+
+        :param entity.Ship ship: The searched ship
+        :param game_map.Map game_map: The current map
+        :return: The command string, or None if the navigation found no path
+        :rtype: str
+        """
+        action, planet_id = self.best
+        if action == DOCK:
+            return ship.dock(game_map.get_planet(planet_id))
+        if action == HOLD:
+            return ship.thrust(0, 0)
+        enemy = min((other for player in game_map.all_players() if player.id != ship.owner.id
+                     for other in game_map.player_ships(player.id).values()),
+                    key=ship.calculate_distance_between)
+        if action == ATTACK:
+            return ship.navigate(ship.closest_point_to(enemy), game_map, constants.MAX_SPEED)
+        angle = math.radians(enemy.calculate_angle_between(ship))
+        away = entity.Position(ship.x + constants.MAX_SPEED * math.cos(angle),
+                               ship.y + constants.MAX_SPEED * math.sin(angle))
+        return ship.navigate(away, game_map, constants.MAX_SPEED, max_corrections=45, angular_step=4)
+
+    def __str__(self):
+        return "SearchResult {} ({} rollouts, {:.0f} rollouts/core-s, scores: {})"\
+            .format(self.best, self.rollouts, self.rollouts_per_core_second, self.scores)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class RolloutSearch:
+    """
+    Deadline-bounded rollout search over a process pool.
+
+    :ivar workers: Number of worker processes, 0 to roll out in the calling process
+    :ivar rollouts_per_task: Rollouts batched into one task
+    :ivar chunk: Rollouts a task plays between two deadline checks
+    :ivar depth: Turns per rollout
+    """
+
+    def __init__(self, workers=None, rollouts_per_task=16, chunk=4, depth=4, stats=telemetry.default):
+        """
+        :param int workers: Worker processes (default: one per CPU, none on a single-CPU machine)
+        :param int rollouts_per_task: Rollouts per task; small enough that a task finishes well within a turn
+        :param int chunk: Rollouts played between two deadline checks; bounds how far a task overruns the deadline
+        :param int depth: Turns simulated per rollout
+        :param telemetry.Telemetry stats: Where rollout counts and timings are recorded
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+            workers = workers if workers > 1 else 0
+        self.workers = workers
+        self.rollouts_per_task = rollouts_per_task
+        self.chunk = chunk
+        self.depth = depth
+        self._stats = stats
+        self._pool = None
+        self._seed = 0
+
+    def candidates(self, game_map, ship):
+        """
+        :param game_map.Map game_map: The current map
+        :param entity.Ship ship: An undocked ship
+        :return: The actions worth searching, as (action, planet id)
+        :rtype: list[tuple]
+        """
+        candidates = [(HOLD, None), (ATTACK, None), (RETREAT, None)]
+        for planet in game_map.all_planets():
+            if ship.can_dock(planet) and not planet.is_full() \
+                    and (planet.owner is None or planet.owner.id == ship.owner.id):
+                candidates.append((DOCK, planet.id))
+        return candidates
+
+    def _run(self, state, player, slot, candidate, deadline):
+        """
+        Start one task, which stops starting rollouts at the deadline.
+
+        :return: The future of its result
+        :rtype: concurrent.futures.Future
+        """
+        self._seed += 1
+        arguments = (state, player, slot, candidate, self.rollouts_per_task, self.depth, self._seed, 30, deadline,
+                     self.chunk)
+        if self._pool is None:
+            future = concurrent.futures.Future()
+            future.set_result(run_rollouts(*arguments))
+            return future
+        return self._pool.submit(run_rollouts, *arguments)
+
+    def search(self, game_map, ship, deadline):
+        """
+        Roll out the candidates of a ship round robin until the deadline.
+
+        :param game_map.Map game_map: The current map
+        :param entity.Ship ship: The contested ship
+        :param float deadline: time.time() by which the search must return
+        :return: The best candidate found so far
+        :rtype: SearchResult
+        """
+        started = time.time()
+        if self.workers and self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        state, slot = local_state(game_map, ship)
+        candidates = self.candidates(game_map, ship)
+        totals = {candidate: [0.0, 0] for candidate in candidates}
+        busy = 0.0
+        pending = {}
+        next_candidate = 0
+
+        while time.time() < deadline:
+            while len(pending) < (2 * self.workers or 1):
+                candidate = candidates[next_candidate % len(candidates)]
+                next_candidate += 1
+                pending[self._run(state, game_map.my_id, slot, candidate, deadline)] = candidate
+            done, _ = concurrent.futures.wait(pending, timeout=max(deadline - time.time(), 0),
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                total, rollouts, seconds = future.result()
+                candidate = pending.pop(future)
+                totals[candidate][0] += total
+                totals[candidate][1] += rollouts
+                busy += seconds
+
+        # Queued tasks are dropped; running ones see the deadline after their current chunk and return unread
+        for future in pending:
+            future.cancel()
+
+        scores = {candidate: total / count for candidate, (total, count) in totals.items() if count}
+        best = max(scores, key=scores.get) if scores else (HOLD, None)
+        rollouts = sum(count for _, count in totals.values())
+        self._stats.count('rollouts', rollouts)
+        self._stats.record('rollout search', time.time() - started)
+        return SearchResult(best, scores, rollouts, rollouts / busy if busy else 0.0)
+
+    def close(self):
+        """
+        Shut the worker processes down.
+
+        :return: nothing
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
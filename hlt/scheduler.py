@@ -0,0 +1,150 @@
+"""
+Deadline-aware ordering of per-ship decisions.
+
+Ships are handed out highest priority first. Before each ship the scheduler compares the time left with the
+measured cost of a decision at each fidelity level and picks the best level that still lets every remaining
+ship get a command, so a slow turn degrades gracefully instead of leaving the last ships without orders:
+
+    scheduler = TurnScheduler()
+    scheduler.begin_turn(end_time)
+    for ship in scheduler.ships(my_ships, priority):
+        if scheduler.mode == STRAIGHT:
+            ...
+        ship.navigate(target, game_map, speed, max_corrections=scheduler.corrections,
+                      angular_step=scheduler.angular_step)
+"""
+import time
+
+from . import telemetry, transposition
+
+#: Fidelity levels, best first: full navigation, cheaper navigation, last turn's order, straight-line move
+FULL, REDUCED, CACHED, STRAIGHT = 0, 1, 2, 3
+_NAMES = ('full', 'reduced', 'cached', 'straight')
+#: (max_corrections, angular_step) used for navigation at each level; STRAIGHT tries the direct line only
+NAVIGATION = {FULL: (18, 5), REDUCED: (6, 15), CACHED: (6, 15), STRAIGHT: (1, 0)}
+
+
+class TurnScheduler:
+    """
+    Hands out ships in priority order and chooses how much time each decision may take.
+
+    :ivar mode: The fidelity level of the current decision
+    :ivar costs: Smoothed seconds per decision at each level
+    :ivar counts: Decisions taken at each level this turn
+    """
+
+    def __init__(self, costs=(0.005, 0.002, 0.0003, 0.0001), smoothing=0.2, stats=telemetry.default):
+        """
+        :param tuple costs: Initial estimates of the seconds per decision at each level
+        :param float smoothing: Weight of a new measurement in the smoothed costs
+        :param telemetry.Telemetry stats: Where decision timings are recorded
+        """
+        self.mode = FULL
+        self.costs = list(costs)
+        self.counts = [0] * len(costs)
+        self.smoothing = smoothing
+        self._stats = stats
+        self._end_time = None
+        self._last_orders = {}
+        self._last_planets = {}
+
+    @property
+    def corrections(self):
+        """
+        :return: max_corrections for navigation at the current level
+        :rtype: int
+        """
+        return NAVIGATION[self.mode][0]
+
+    @property
+    def angular_step(self):
+        """
+        :return: angular_step for navigation at the current level
+        :rtype: int
+        """
+        return NAVIGATION[self.mode][1]
+
+    def begin_turn(self, end_time):
+        """
+        :param float end_time: time.time() by which every ship must have its command
+        :return: nothing
+        """
+        self._end_time = end_time
+        self.counts = [0] * len(self.costs)
+        self.mode = FULL
+
+    def _choose(self, ships_left):
+        """
+        :param int ships_left: Ships still to decide, including the next one
+        :return: The best level at which all of them fit in the time left
+        :rtype: int
+        """
+        for mode in (FULL, REDUCED, CACHED):
+            if self.affordable(ships_left, mode):
+                return mode
+        return STRAIGHT
+
+    def affordable(self, ships_left, mode=FULL):
+        """
+        :param int ships_left: Decisions still to take
+        :param int mode: A fidelity level
+        :return: Whether that many decisions at that level fit in the time left
+        :rtype: bool
+        """
+        return self.costs[mode] * ships_left <= self._end_time - time.time()
+
+    def ships(self, ships, priority):
+        """
+        Iterate over ships, most urgent first, setting mode before each one and timing the decision taken
+        between two steps of the iteration.
+
+        :param list[entity.Ship] ships: The ships to decide for
+        :param priority: Called as priority(ship); lower values go first
+        :return: The ships, in order
+        :rtype: collections.Iterator[entity.Ship]
+        """
+        ordered = sorted(ships, key=priority)
+        for index, ship in enumerate(ordered):
+            self.mode = self._choose(len(ordered) - index)
+            started = time.perf_counter()
+            yield ship
+            elapsed = time.perf_counter() - started
+            self.costs[self.mode] += self.smoothing * (elapsed - self.costs[self.mode])
+            self.counts[self.mode] += 1
+            self._stats.record('decision ' + _NAMES[self.mode], elapsed)
+
+    def remember(self, command_queue, planet_ids=None):
+        """
+        Keep this turn's thrust and dock orders, for ships that fall back to CACHED next turn.
+
+        :param list[str] command_queue: The commands sent this turn
+        :param dict[int, int] planet_ids: The planet each ship was sent to, keyed by ship id
+        :return: nothing
+        """
+        self._last_orders = {}
+        for command in command_queue:
+            kind, ship_id, *_ = command.split()
+            self._last_orders[int(ship_id)] = command
+        self._last_planets = dict(planet_ids or {})
+
+    def last_order(self, ship_id, planet_id=None):
+        """
+        :param int ship_id: A ship
+        :param int planet_id: The planet a thrust was heading for (default: the one given to remember)
+        :return: The ship's order of the previous turn, or None
+        :rtype: transposition.Decision
+        """
+        command = self._last_orders.get(ship_id)
+        if command is None:
+            return None
+        if planet_id is None:
+            planet_id = self._last_planets.get(ship_id)
+        return transposition.Decision.from_command(command, planet_id)
+
+    def __str__(self):
+        return "TurnScheduler ({})".format(", ".join(
+            "{} {} @ {:.2f}ms".format(name, count, 1000 * cost)
+            for name, count, cost in zip(_NAMES, self.counts, self.costs)))
+
+    def __repr__(self):
+        return self.__str__()
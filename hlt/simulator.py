@@ -0,0 +1,730 @@
+"""
+Array implementation of the Halite II rules.
+
+All state lives in NumPy arrays with a leading game axis, so one call to step() advances any number of
+independent games. A single game is simply a batch of one. Ships occupy slots along the second axis; a slot is
+reused once its ship has died. Planets are indexed by their id.
+
+Within a turn the rules are applied in the engine's order: commands, cooldowns, collisions and weapon fire
+resolved in continuous time over the turn, movement, docking progress and finally production.
+"""
+import math
+import re
+
+import numpy as np
+
+from . import constants
+
+#: Centre-to-centre distance at which two ships engage each other
+ATTACK_RANGE = constants.WEAPON_RADIUS + 2 * constants.SHIP_RADIUS
+#: Command kinds, as stored in Commands.kind
+NO_COMMAND, THRUST, DOCK, UNDOCK = 0, 1, 2, 3
+
+UNDOCKED, DOCKING, DOCKED, UNDOCKING = 0, 1, 2, 3
+
+_COMMAND_TOKEN = re.compile(r'[tdu]|-?\d+')
+
+
+def max_turns(width, height):
+    """
+    :param int width: Map width
+    :param int height: Map height
+    :return: The turn limit the engine uses for a map of that size
+    :rtype: int
+    """
+    return 100 + int(math.sqrt(width * height))
+
+
+class State:
+    """
+    The state of a batch of games.
+
+    :ivar width: (games,) map widths
+    :ivar height: (games,) map heights
+    :ivar turn: (games,) number of turns played
+    :ivar max_turns: (games,) turn limits
+    :ivar next_ship_id: (games,) id the next spawned ship gets
+    :ivar player_alive: (games, players) whether the player is still in the game
+    :ivar eliminated_turn: (games, players) turn the player was eliminated on, -1 while alive
+    :ivar ship_alive: (games, ships) whether the slot holds a live ship
+    :ivar ship_id: (games, ships) ship ids, -1 for empty slots
+    :ivar ship_owner: (games, ships) owning player ids
+    :ivar ship_pos: (games, ships, 2) positions
+    :ivar ship_vel: (games, ships, 2) velocities
+    :ivar ship_health: (games, ships) health
+    :ivar ship_status: (games, ships) docking status (UNDOCKED, DOCKING, DOCKED, UNDOCKING)
+    :ivar ship_planet: (games, ships) id of the planet the ship is docked to, -1 if none
+    :ivar ship_progress: (games, ships) remaining docking/undocking turns
+    :ivar ship_cooldown: (games, ships) remaining weapon cooldown
+    :ivar planet_alive: (games, planets) whether the planet exists
+    :ivar planet_pos: (games, planets, 2) positions
+    :ivar planet_radius: (games, planets) radii
+    :ivar planet_health: (games, planets) health
+    :ivar planet_spots: (games, planets) docking spots
+    :ivar planet_production: (games, planets) production accumulated towards the next ship
+    :ivar planet_remaining: (games, planets) production left in the planet
+    :ivar planet_owner: (games, planets) owning player ids, -1 if unowned
+    """
+
+    _SHIP_FIELDS = ('ship_alive', 'ship_id', 'ship_owner', 'ship_pos', 'ship_vel', 'ship_health',
+                    'ship_status', 'ship_planet', 'ship_progress', 'ship_cooldown')
+
+    def __init__(self, games, players, ship_capacity, planet_capacity, width, height):
+        """
+        Create a batch of empty games.
+
+        :param int games: Number of games
+        :param int players: Number of players per game
+        :param int ship_capacity: Initial number of ship slots per game (grows on demand)
+        :param int planet_capacity: Number of planet slots per game
+        :param int width: Map width
+        :param int height: Map height
+        """
+        self.width = np.full(games, width, dtype=np.int64)
+        self.height = np.full(games, height, dtype=np.int64)
+        self.turn = np.zeros(games, dtype=np.int64)
+        self.max_turns = np.full(games, max_turns(width, height), dtype=np.int64)
+        self.next_ship_id = np.zeros(games, dtype=np.int64)
+        self.player_alive = np.ones((games, players), dtype=bool)
+        self.eliminated_turn = np.full((games, players), -1, dtype=np.int64)
+
+        self.ship_alive = np.zeros((games, ship_capacity), dtype=bool)
+        self.ship_id = np.full((games, ship_capacity), -1, dtype=np.int64)
+        self.ship_owner = np.full((games, ship_capacity), -1, dtype=np.int64)
+        self.ship_pos = np.zeros((games, ship_capacity, 2))
+        self.ship_vel = np.zeros((games, ship_capacity, 2))
+        self.ship_health = np.zeros((games, ship_capacity), dtype=np.int64)
+        self.ship_status = np.zeros((games, ship_capacity), dtype=np.int64)
+        self.ship_planet = np.full((games, ship_capacity), -1, dtype=np.int64)
+        self.ship_progress = np.zeros((games, ship_capacity), dtype=np.int64)
+        self.ship_cooldown = np.zeros((games, ship_capacity), dtype=np.int64)
+
+        self.planet_alive = np.zeros((games, planet_capacity), dtype=bool)
+        self.planet_pos = np.zeros((games, planet_capacity, 2))
+        self.planet_radius = np.zeros((games, planet_capacity))
+        self.planet_health = np.zeros((games, planet_capacity), dtype=np.int64)
+        self.planet_spots = np.zeros((games, planet_capacity), dtype=np.int64)
+        self.planet_production = np.zeros((games, planet_capacity), dtype=np.int64)
+        self.planet_remaining = np.zeros((games, planet_capacity), dtype=np.int64)
+        self.planet_owner = np.full((games, planet_capacity), -1, dtype=np.int64)
+
+    @property
+    def games(self):
+        """
+        :return: Number of games in the batch
+        :rtype: int
+        """
+        return len(self.turn)
+
+    @property
+    def players(self):
+        """
+        :return: Number of players per game
+        :rtype: int
+        """
+        return self.player_alive.shape[1]
+
+    def copy(self):
+        """
+        :return: An independent copy of the state
+        :rtype: State
+        """
+        clone = State.__new__(State)
+        clone.__dict__ = {name: value.copy() for name, value in self.__dict__.items()}
+        return clone
+
+    def _grow_ships(self, needed):
+        """
+        Make sure every game has at least the given number of ship slots.
+
+        :param int needed: Minimum number of slots
+        :return: nothing
+        """
+        capacity = self.ship_alive.shape[1]
+        if needed <= capacity:
+            return
+        extra = max(needed, 2 * capacity) - capacity
+        for name in self._SHIP_FIELDS:
+            array = getattr(self, name)
+            padding = np.zeros((array.shape[0], extra) + array.shape[2:], dtype=array.dtype)
+            if name in ('ship_id', 'ship_owner', 'ship_planet'):
+                padding -= 1
+            setattr(self, name, np.concatenate((array, padding), axis=1))
+
+    def add_ship(self, game, owner, x, y, health=constants.BASE_SHIP_HEALTH, ship_id=None):
+        """
+        Place a new undocked ship in a free slot.
+
+        :param int game: The game to add the ship to
+        :param int owner: The owning player id
+        :param float x: x-coordinate
+        :param float y: y-coordinate
+        :param int health: Starting health
+        :param int ship_id: The ship id, or None to take the game's next id
+        :return: The slot the ship was placed in
+        :rtype: int
+        """
+        free = np.flatnonzero(~self.ship_alive[game])
+        if not len(free):
+            self._grow_ships(self.ship_alive.shape[1] + 1)
+            free = np.flatnonzero(~self.ship_alive[game])
+        slot = free[0]
+        if ship_id is None:
+            ship_id = self.next_ship_id[game]
+        self.next_ship_id[game] = max(self.next_ship_id[game], ship_id + 1)
+        self.ship_alive[game, slot] = True
+        self.ship_id[game, slot] = ship_id
+        self.ship_owner[game, slot] = owner
+        self.ship_pos[game, slot] = (x, y)
+        self.ship_vel[game, slot] = 0
+        self.ship_health[game, slot] = health
+        self.ship_status[game, slot] = UNDOCKED
+        self.ship_planet[game, slot] = -1
+        self.ship_progress[game, slot] = 0
+        self.ship_cooldown[game, slot] = 0
+        return slot
+
+    def ship_slots(self, game):
+        """
+        :param int game: The game to look at
+        :return: Mapping of ship id to slot for the live ships of the game
+        :rtype: dict[int, int]
+        """
+        slots = np.flatnonzero(self.ship_alive[game])
+        return dict(zip(self.ship_id[game, slots].tolist(), slots.tolist()))
+
+    def docked_counts(self):
+        """
+        :return: (games, planets) number of ships docking, docked or undocking at each planet
+        :rtype: numpy.ndarray
+        """
+        counts = np.zeros(self.planet_alive.shape, dtype=np.int64)
+        games, slots = np.nonzero(self.ship_alive & (self.ship_status != UNDOCKED))
+        np.add.at(counts, (games, self.ship_planet[games, slots]), 1)
+        return counts
+
+    def to_frame(self, game):
+        """
+        Serialize one game in the format the engine sends to the bots every turn.
+
+        :param int game: The game to serialize
+        :return: The frame, as parsed by game_map.Map._parse
+        :rtype: str
+        """
+        parts = [str(self.players)]
+        for player in range(self.players):
+            slots = np.flatnonzero(self.ship_alive[game] & (self.ship_owner[game] == player))
+            slots = slots[np.argsort(self.ship_id[game, slots])]
+            parts.append("{} {}".format(player, len(slots)))
+            for slot in slots:
+                status = self.ship_status[game, slot]
+                parts.append("{} {:.4f} {:.4f} {} {:.4f} {:.4f} {} {} {} {}".format(
+                    self.ship_id[game, slot], self.ship_pos[game, slot, 0], self.ship_pos[game, slot, 1],
+                    self.ship_health[game, slot], self.ship_vel[game, slot, 0], self.ship_vel[game, slot, 1],
+                    status, self.ship_planet[game, slot] if status != UNDOCKED else 0,
+                    self.ship_progress[game, slot], self.ship_cooldown[game, slot]))
+
+        planets = np.flatnonzero(self.planet_alive[game])
+        parts.append(str(len(planets)))
+        docked = self.ship_alive[game] & (self.ship_status[game] != UNDOCKED)
+        for planet in planets:
+            owner = self.planet_owner[game, planet]
+            docked_ids = np.sort(self.ship_id[game, docked & (self.ship_planet[game] == planet)])
+            parts.append("{} {:.4f} {:.4f} {} {:.4f} {} {} {} {} {} {}".format(
+                planet, self.planet_pos[game, planet, 0], self.planet_pos[game, planet, 1],
+                self.planet_health[game, planet], self.planet_radius[game, planet], self.planet_spots[game, planet],
+                self.planet_production[game, planet], self.planet_remaining[game, planet],
+                int(owner >= 0), max(owner, 0), len(docked_ids)))
+            parts.extend(str(ship_id) for ship_id in docked_ids)
+        return " ".join(parts)
+
+    @staticmethod
+    def from_map(game_map):
+        """
+        Build a single-game state from a parsed map.
+
+        :param game_map.Map game_map: The map to convert
+        :return: The equivalent state
+        :rtype: State
+        """
+        players = game_map.all_players()
+        planets = game_map.all_planets()
+        ships = game_map.ships_by_id()
+        num_players = max([player.id for player in players] + [game_map.my_id]) + 1
+        num_planets = max([planet.id for planet in planets] + [-1]) + 1
+        state = State(1, num_players, max(len(ships), 1), num_planets, game_map.width, game_map.height)
+        state.player_alive[0] = False
+        for player in players:
+            state.player_alive[0, player.id] = True
+
+        for slot, ship in enumerate(ships.values()):
+            state.ship_alive[0, slot] = True
+            state.ship_id[0, slot] = ship.id
+            state.ship_owner[0, slot] = ship.owner.id
+            state.ship_pos[0, slot] = (ship.x, ship.y)
+            state.ship_vel[0, slot] = (ship.vel_x, ship.vel_y)
+            state.ship_health[0, slot] = ship.health
+            state.ship_status[0, slot] = ship.docking_status.value
+            state.ship_planet[0, slot] = ship.planet.id if ship.planet is not None else -1
+            state.ship_progress[0, slot] = ship._docking_progress
+            state.ship_cooldown[0, slot] = ship._weapon_cooldown
+        state.next_ship_id[0] = max(ships, default=-1) + 1
+
+        for planet in planets:
+            state.planet_alive[0, planet.id] = True
+            state.planet_pos[0, planet.id] = (planet.x, planet.y)
+            state.planet_radius[0, planet.id] = planet.radius
+            state.planet_health[0, planet.id] = planet.health
+            state.planet_spots[0, planet.id] = planet.num_docking_spots
+            state.planet_production[0, planet.id] = planet.current_production
+            state.planet_remaining[0, planet.id] = planet.remaining_resources
+            state.planet_owner[0, planet.id] = planet.owner.id if planet.owner is not None else -1
+        return state
+
+
+class Commands:
+    """
+    One turn of commands for every ship slot of a State.
+
+    :ivar kind: (games, ships) NO_COMMAND, THRUST, DOCK or UNDOCK
+    :ivar velocity: (games, ships, 2) thrust vectors
+    :ivar planet: (games, ships) planet ids for dock commands
+    """
+
+    def __init__(self, state):
+        """
+        :param State state: The state the commands will be applied to
+        """
+        shape = state.ship_alive.shape
+        self.kind = np.zeros(shape, dtype=np.int64)
+        self.velocity = np.zeros(shape + (2,))
+        self.planet = np.full(shape, -1, dtype=np.int64)
+
+    def thrust(self, game, slot, magnitude, angle):
+        """
+        Record a thrust command the way the engine interprets "t" commands.
+
+        :param int game: The game
+        :param int slot: The ship slot
+        :param int magnitude: Thrust magnitude, clipped to MAX_SPEED
+        :param int angle: Angle in degrees
+        :return: nothing
+        """
+        magnitude = min(max(int(magnitude), 0), constants.MAX_SPEED)
+        radians = math.radians(int(angle))
+        self.kind[game, slot] = THRUST
+        self.velocity[game, slot] = (magnitude * math.cos(radians), magnitude * math.sin(radians))
+
+    def thrust_many(self, mask, magnitudes, angles):
+        """
+        Vectorized thrust: record thrusts for all masked ships, rounding like the engine does for "t" commands.
+
+        :param numpy.ndarray mask: (games, ships) ships to give a thrust
+        :param numpy.ndarray magnitudes: (games, ships) magnitudes, floored and clipped to MAX_SPEED
+        :param numpy.ndarray angles: (games, ships) angles in degrees, rounded to integers
+        :return: nothing
+        """
+        magnitudes = np.clip(np.floor(magnitudes), 0, constants.MAX_SPEED)
+        radians = np.radians(np.round(angles))
+        velocity = np.stack((magnitudes * np.cos(radians), magnitudes * np.sin(radians)), axis=-1)
+        self.kind[mask] = THRUST
+        self.velocity[mask] = velocity[mask]
+
+    def dock(self, game, slot, planet_id):
+        """
+        :param int game: The game
+        :param int slot: The ship slot
+        :param int planet_id: The planet to dock to
+        :return: nothing
+        """
+        self.kind[game, slot] = DOCK
+        self.planet[game, slot] = planet_id
+
+    def undock(self, game, slot):
+        """
+        :param int game: The game
+        :param int slot: The ship slot
+        :return: nothing
+        """
+        self.kind[game, slot] = UNDOCK
+
+
+def parse_commands(state, commands, game, player, line):
+    """
+    Parse a command line as sent by networking.Game.send_command_queue and record the commands of the player.
+    Commands for ships the player does not control are ignored.
+
+    :param State state: The state the commands apply to
+    :param Commands commands: Where to record the commands
+    :param int game: The game the line belongs to
+    :param int player: The player who sent the line
+    :param str line: The raw command line
+    :return: Number of commands that were ignored
+    :rtype: int
+    """
+    tokens = _COMMAND_TOKEN.findall(line)
+    arity = {'t': 3, 'd': 2, 'u': 1}
+    slots = state.ship_slots(game)
+    ignored = 0
+    position = 0
+    while position < len(tokens):
+        kind = tokens[position]
+        arguments = tokens[position + 1:position + 1 + arity.get(kind, 0)]
+        position += 1 + len(arguments)
+        if kind not in arity or len(arguments) != arity[kind] or any(not arg.lstrip('-').isdigit() for arg in arguments):
+            ignored += 1
+            continue
+        slot = slots.get(int(arguments[0]))
+        if slot is None or state.ship_owner[game, slot] != player:
+            ignored += 1
+        elif kind == 't':
+            commands.thrust(game, slot, int(arguments[1]), int(arguments[2]))
+        elif kind == 'd':
+            commands.dock(game, slot, int(arguments[1]))
+        else:
+            commands.undock(game, slot)
+    return ignored
+
+
+def coast(state, commands, player, velocities=None):
+    """
+    Give every undocked ship of the other players that has no command yet a thrust along its current velocity.
+
+    :param State state: The state the commands apply to
+    :param Commands commands: Where to record the thrusts
+    :param int player: The player whose ships are left alone
+    :param dict[int, (float, float)] velocities: Velocity estimates by ship id, overriding the state's velocities
+    :return: nothing
+    """
+    moving = state.ship_alive & (state.ship_status == UNDOCKED) & (state.ship_owner != player) \
+        & (commands.kind == NO_COMMAND)
+    velocity = state.ship_vel.copy()
+    if velocities:
+        for game, slot in zip(*np.nonzero(moving)):
+            estimate = velocities.get(state.ship_id[game, slot])
+            if estimate is not None:
+                velocity[game, slot] = estimate
+    speed = np.linalg.norm(velocity, axis=-1, keepdims=True)
+    velocity *= np.minimum(1, constants.MAX_SPEED / np.maximum(speed, 1e-9))
+    commands.kind[moving] = THRUST
+    commands.velocity[moving] = velocity[moving]
+
+
+def _contact_times(offset, relative_velocity, radius):
+    """
+    Earliest time in [0, 1] at which two linearly moving points come within radius of each other.
+
+    :param numpy.ndarray offset: (..., 2) position of the second point relative to the first
+    :param numpy.ndarray relative_velocity: (..., 2) velocity of the second point relative to the first
+    :param radius: Contact distance, broadcastable against the leading dimensions
+    :return: Contact times, inf where there is no contact during the turn
+    :rtype: numpy.ndarray
+    """
+    a = np.einsum('...i,...i->...', relative_velocity, relative_velocity)
+    b = 2 * np.einsum('...i,...i->...', offset, relative_velocity)
+    c = np.einsum('...i,...i->...', offset, offset) - radius ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (-b - np.sqrt(b ** 2 - 4 * a * c)) / (2 * a)
+    t = np.where((a > 0) & (t >= 0) & (t <= 1), t, np.inf)
+    return np.where(c <= 0, 0.0, t)
+
+
+def _apply_commands(state, commands):
+    """
+    Apply dock, undock and thrust commands. Docking fails when the ship is out of range, the planet is owned by
+    someone else or full, or several players try to claim the same unowned planet in the same turn.
+
+    :return: nothing
+    """
+    undocked = state.ship_alive & (state.ship_status == UNDOCKED)
+    thrusting = undocked & (commands.kind == THRUST)
+    state.ship_vel[:] = np.where(thrusting[..., np.newaxis], commands.velocity, 0)
+
+    undocking = state.ship_alive & (state.ship_status == DOCKED) & (commands.kind == UNDOCK)
+    state.ship_status[undocking] = UNDOCKING
+    state.ship_progress[undocking] = constants.DOCK_TURNS
+
+    games, slots = np.nonzero(undocked & (commands.kind == DOCK))
+    if not len(games):
+        return
+    counts = state.docked_counts()
+    claims = {}
+    for game, slot in zip(games.tolist(), slots.tolist()):
+        planet = commands.planet[game, slot]
+        if not 0 <= planet < state.planet_alive.shape[1] or not state.planet_alive[game, planet]:
+            continue
+        distance = np.hypot(*(state.ship_pos[game, slot] - state.planet_pos[game, planet]))
+        if distance > state.planet_radius[game, planet] + constants.DOCK_RADIUS + constants.SHIP_RADIUS:
+            continue
+        owner = state.planet_owner[game, planet]
+        if owner not in (-1, state.ship_owner[game, slot]):
+            continue
+        claims.setdefault((game, planet), []).append(slot)
+
+    for (game, planet), claimants in claims.items():
+        owners = set(state.ship_owner[game, claimants].tolist())
+        if state.planet_owner[game, planet] < 0 and len(owners) > 1:
+            continue
+        free = state.planet_spots[game, planet] - counts[game, planet]
+        for slot in claimants[:max(free, 0)]:
+            state.ship_status[game, slot] = DOCKING
+            state.ship_planet[game, slot] = planet
+            state.ship_progress[game, slot] = constants.DOCK_TURNS
+        if free > 0:
+            state.planet_owner[game, planet] = owners.pop()
+
+
+def _resolve_collisions(state, active):
+    """
+    Find the ship-ship and ship-planet collisions of the turn in time order. Colliding ships are destroyed and
+    planets take damage equal to the health of the ships that hit them.
+
+    :param State state: The state, before movement
+    :param numpy.ndarray active: (games, ships) ships taking part in the turn
+    :return: (games, ships) time each ship was destroyed (inf for survivors) and (games, planets) planet damage
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    pos, vel, alive = state.ship_pos, state.ship_vel, active
+    capacity = alive.shape[1]
+    ship_times = _contact_times(pos[:, np.newaxis] - pos[:, :, np.newaxis],
+                                vel[:, np.newaxis] - vel[:, :, np.newaxis], 2 * constants.SHIP_RADIUS)
+    ship_times[:, np.arange(capacity), np.arange(capacity)] = np.inf
+    planet_times = _contact_times(state.planet_pos[:, np.newaxis] - pos[:, :, np.newaxis],
+                                  -vel[:, :, np.newaxis],
+                                  state.planet_radius[:, np.newaxis] + constants.SHIP_RADIUS)
+    own_planet = state.ship_planet[..., np.newaxis] == np.arange(state.planet_alive.shape[1])
+    planet_times = np.where(state.planet_alive[:, np.newaxis] & ~own_planet, planet_times, np.inf)
+
+    death = np.full(alive.shape, np.inf)
+    planet_damage = np.zeros(state.planet_alive.shape, dtype=np.int64)
+    while True:
+        live = alive & np.isinf(death)
+        pairs = np.where(live[:, :, np.newaxis] & live[:, np.newaxis], ship_times, np.inf)
+        hits = np.where(live[..., np.newaxis], planet_times, np.inf)
+        earliest = np.minimum(pairs.min(axis=2, initial=np.inf), hits.min(axis=2, initial=np.inf))
+        if not np.isfinite(earliest).any():
+            break
+        confirmed_pairs = (pairs == earliest[:, :, np.newaxis]) & (pairs == earliest[:, np.newaxis]) \
+            & np.isfinite(pairs)
+        confirmed_hits = (hits == earliest[..., np.newaxis]) & np.isfinite(hits)
+        destroyed = confirmed_pairs.any(axis=2) | confirmed_hits.any(axis=2)
+        death[destroyed] = earliest[destroyed]
+        planet_damage += (confirmed_hits * state.ship_health[..., np.newaxis]).sum(axis=1)
+    return death, planet_damage
+
+
+def _resolve_attacks(state, active, death):
+    """
+    Every undocked ship with its weapon ready fires once, at the first moment of the turn an enemy ship is in
+    range, and splits WEAPON_DAMAGE evenly between all enemy ships in range at that moment.
+
+    :param State state: The state, before movement
+    :param numpy.ndarray active: (games, ships) ships taking part in the turn
+    :param numpy.ndarray death: (games, ships) collision times from _resolve_collisions
+    :return: (games, ships) damage taken and (games, ships) mask of ships that fired
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    pos, vel, alive, owner = state.ship_pos, state.ship_vel, active, state.ship_owner
+    offset = pos[:, np.newaxis] - pos[:, :, np.newaxis]
+    relative = vel[:, np.newaxis] - vel[:, :, np.newaxis]
+    enemies = alive[:, :, np.newaxis] & alive[:, np.newaxis] & (owner[:, :, np.newaxis] != owner[:, np.newaxis])
+
+    times = np.where(enemies, _contact_times(offset, relative, ATTACK_RANGE), np.inf)
+    times = np.where((times < death[:, :, np.newaxis]) & (times < death[:, np.newaxis]), times, np.inf)
+    ready = alive & (state.ship_status == UNDOCKED) & (state.ship_cooldown == 0)
+    fire = np.where(ready, times.min(axis=2, initial=np.inf), np.inf)
+    fired = np.isfinite(fire)
+
+    when = np.where(fired, fire, 0)[:, :, np.newaxis, np.newaxis]
+    separation = np.linalg.norm(offset + relative * when, axis=3)
+    targets = fired[:, :, np.newaxis] & enemies & (separation <= ATTACK_RANGE + 1e-9) \
+        & (death[:, np.newaxis] > fire[:, :, np.newaxis])
+    count = targets.sum(axis=2)
+    per_target = np.where(count > 0, constants.WEAPON_DAMAGE // np.maximum(count, 1), 0)
+    damage = (targets * per_target[:, :, np.newaxis]).sum(axis=1)
+    return damage, fired
+
+
+def _explode_planets(state, destroyed):
+    """
+    Remove destroyed planets, killing their docked ships and damaging every ship within EXPLOSION_RADIUS of the
+    surface, linearly less the further away it is.
+
+    :param numpy.ndarray destroyed: (games, planets) planets destroyed this turn
+    :return: (games, ships) explosion damage
+    :rtype: numpy.ndarray
+    """
+    damage = np.zeros(state.ship_alive.shape, dtype=np.int64)
+    if not destroyed.any():
+        return damage
+    state.planet_alive &= ~destroyed
+    distance = np.linalg.norm(state.ship_pos[:, :, np.newaxis] - state.planet_pos[:, np.newaxis], axis=3) \
+        - state.planet_radius[:, np.newaxis]
+    falloff = np.clip(1 - distance / constants.EXPLOSION_RADIUS, 0, 1)
+    damage += (falloff * destroyed[:, np.newaxis] * constants.MAX_SHIP_HEALTH).max(axis=2).astype(np.int64)
+    games, slots = np.nonzero(state.ship_alive & (state.ship_status != UNDOCKED))
+    on_destroyed = destroyed[games, state.ship_planet[games, slots]]
+    damage[games[on_destroyed], slots[on_destroyed]] = constants.MAX_SHIP_HEALTH
+    return damage
+
+
+def _kill(state, mask):
+    """
+    Remove the masked ships and release planets that no longer have any ship docked.
+
+    :return: nothing
+    """
+    state.ship_alive &= ~mask
+    state.ship_id[mask] = -1
+    state.ship_status[mask] = UNDOCKED
+    state.ship_planet[mask] = -1
+    state.planet_owner[state.docked_counts() == 0] = -1
+
+
+def _advance_docking(state, active):
+    """
+    Count down docking and undocking ships, completing the transitions that are due.
+
+    :param numpy.ndarray active: (games, ships) ships taking part in the turn
+    :return: nothing
+    """
+    transitioning = active & ((state.ship_status == DOCKING) | (state.ship_status == UNDOCKING))
+    state.ship_progress[transitioning] -= 1
+    done = transitioning & (state.ship_progress <= 0)
+    docked = done & (state.ship_status == DOCKING)
+    undocked = done & (state.ship_status == UNDOCKING)
+    state.ship_status[docked] = DOCKED
+    state.ship_status[undocked] = UNDOCKED
+    state.ship_planet[undocked] = -1
+    state.ship_progress[done] = 0
+    state.planet_owner[state.docked_counts() == 0] = -1
+
+
+def _spawn_position(state, game, planet):
+    """
+    :return: Where a planet spawns its next ship: SPAWN_RADIUS off its surface on the side facing the map
+             centre, rotated away from ships already there
+    :rtype: (float, float)
+    """
+    centre = np.array([state.width[game], state.height[game]]) / 2
+    origin = state.planet_pos[game, planet]
+    base = math.atan2(centre[1] - origin[1], centre[0] - origin[0])
+    distance = state.planet_radius[game, planet] + constants.SPAWN_RADIUS
+    others = state.ship_pos[game, state.ship_alive[game]]
+    for step in range(12):
+        angle = base + math.radians(15) * ((step + 1) // 2) * (-1) ** step
+        candidate = origin + distance * np.array([math.cos(angle), math.sin(angle)])
+        if not len(others) or np.linalg.norm(others - candidate, axis=1).min() > 2 * constants.SHIP_RADIUS:
+            return tuple(candidate)
+    return tuple(origin + distance * np.array([math.cos(base), math.sin(base)]))
+
+
+def _produce(state, active):
+    """
+    Let every planet produce BASE_PRODUCTIVITY per docked ship, out of its remaining resources, and spawn a ship
+    for its owner whenever PRODUCTION_PER_SHIP has been accumulated.
+
+    :param numpy.ndarray active: (games, ships) ships taking part in the turn
+    :return: nothing
+    """
+    producers = np.zeros(state.planet_alive.shape, dtype=np.int64)
+    games, slots = np.nonzero(active & (state.ship_status == DOCKED))
+    np.add.at(producers, (games, state.ship_planet[games, slots]), 1)
+    produced = np.minimum(producers * constants.BASE_PRODUCTIVITY, state.planet_remaining)
+    produced[~state.planet_alive] = 0
+    state.planet_production += produced
+    state.planet_remaining -= produced
+
+    for game, planet in zip(*np.nonzero(state.planet_production >= constants.PRODUCTION_PER_SHIP)):
+        while state.planet_production[game, planet] >= constants.PRODUCTION_PER_SHIP:
+            state.planet_production[game, planet] -= constants.PRODUCTION_PER_SHIP
+            x, y = _spawn_position(state, game, planet)
+            state.add_ship(game, state.planet_owner[game, planet], x, y)
+
+
+def _update_players(state, running):
+    """
+    Eliminate players left without ships.
+
+    :return: nothing
+    """
+    has_ships = np.zeros(state.player_alive.shape, dtype=bool)
+    games, slots = np.nonzero(state.ship_alive)
+    has_ships[games, state.ship_owner[games, slots]] = True
+    eliminated = state.player_alive & ~has_ships & running[:, np.newaxis]
+    state.eliminated_turn[eliminated] = np.broadcast_to(state.turn[:, np.newaxis], eliminated.shape)[eliminated]
+    state.player_alive &= ~eliminated
+
+
+def eliminate(state, game, player):
+    """
+    Remove a player from a game, e.g. because its bot crashed or timed out.
+
+    :param State state: The state
+    :param int game: The game
+    :param int player: The player to remove
+    :return: nothing
+    """
+    _kill(state, (np.arange(state.games) == game)[:, np.newaxis] & (state.ship_owner == player) & state.ship_alive)
+    state.player_alive[game, player] = False
+    state.eliminated_turn[game, player] = state.turn[game]
+
+
+def finished(state):
+    """
+    :param State state: The state
+    :return: (games,) whether each game is over: at most one player left, or the turn limit reached
+    :rtype: numpy.ndarray
+    """
+    return (state.player_alive.sum(axis=1) <= 1) | (state.turn >= state.max_turns)
+
+
+def step(state, commands):
+    """
+    Advance every unfinished game of the batch by one turn, in place.
+
+    :param State state: The state to advance
+    :param Commands commands: The commands of all players for this turn
+    :return: nothing
+    """
+    running = ~finished(state)
+    if not running.all():
+        commands.kind = np.where(running[:, np.newaxis], commands.kind, NO_COMMAND)
+    active = state.ship_alive & running[:, np.newaxis]
+
+    _apply_commands(state, commands)
+    state.ship_cooldown = np.where(active, np.maximum(state.ship_cooldown - 1, 0), state.ship_cooldown)
+
+    death, planet_damage = _resolve_collisions(state, active)
+    damage, fired = _resolve_attacks(state, active, death)
+    state.ship_cooldown[fired] = constants.WEAPON_COOLDOWN
+
+    state.ship_pos += state.ship_vel
+    state.ship_vel[:] = 0
+    x, y = state.ship_pos[..., 0], state.ship_pos[..., 1]
+    outside = (x < 0) | (y < 0) | (x > state.width[:, np.newaxis]) | (y > state.height[:, np.newaxis])
+
+    state.planet_health -= planet_damage
+    damage += _explode_planets(state, state.planet_alive & (state.planet_health <= 0))
+    state.ship_health -= damage
+    _kill(state, state.ship_alive & (np.isfinite(death) | outside | (state.ship_health <= 0)))
+
+    _advance_docking(state, active & state.ship_alive)
+    _produce(state, active & state.ship_alive)
+    state.turn += running
+    _update_players(state, running)
+
+
+def rankings(state, game):
+    """
+    :param State state: The state
+    :param int game: The game
+    :return: Player ids from best to worst: survivors by ship count and total health, then the eliminated
+             players by how long they lasted
+    :rtype: list[int]
+    """
+    def score(player):
+        ships = state.ship_alive[game] & (state.ship_owner[game] == player)
+        return (bool(state.player_alive[game, player]), int(state.eliminated_turn[game, player]),
+                int(ships.sum()), int(state.ship_health[game, ships].sum()))
+    return sorted(range(state.players), key=score, reverse=True)
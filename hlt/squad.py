@@ -0,0 +1,159 @@
+"""
+Squads: nearby undocked ships heading for the same target, moved as one rigid formation.
+
+Every member of a squad gets the same thrust, so the offsets between members never change and they cannot run
+into each other. The path is found once for the whole squad, by checking the segment swept by the formation's
+footprint (a disk around its centre covering every member) against the obstacles, instead of one navigate call
+per ship:
+
+    for squad in form_squads(ships, target_of):
+        commands = squad.approach(game_map)
+        if commands is not None:
+            command_queue.extend(commands)
+"""
+import math
+
+import numpy as np
+
+from . import collision, constants, engagement, entity
+
+#: Centre-to-centre distance within which ships of the same target join one squad
+LINK_DISTANCE = 4.0
+#: Largest footprint radius a squad may have; looser groups move individually
+MAX_RADIUS = 8.0
+
+
+class Squad:
+    """
+    A group of ships moving in formation.
+
+    :ivar id: Index of the squad within the turn
+    :ivar ships: The members
+    :ivar target: The planet, ship or position the squad heads for
+    :ivar centre: The centre of the formation
+    :ivar offsets: (members, 2) position of each member relative to the centre
+    :ivar radius: Radius of the footprint around the centre, covering every member
+    """
+
+    def __init__(self, squad_id, ships, target):
+        self.id = squad_id
+        self.ships = ships
+        self.target = target
+        positions = np.array([(ship.x, ship.y) for ship in ships])
+        centre = positions.mean(axis=0)
+        self.centre = entity.Position(float(centre[0]), float(centre[1]))
+        self.offsets = positions - centre
+        self.radius = float(np.linalg.norm(self.offsets, axis=1).max()) + constants.SHIP_RADIUS
+
+    def _obstacles(self, game_map, reach):
+        """
+        :return: The planets and non-member ships whose edge is within reach of the centre
+        :rtype: list[entity.Entity]
+        """
+        members = {ship.id for ship in self.ships}
+        candidates = game_map.all_planets() + [ship for ship in game_map.ships_by_id().values()
+                                               if ship.id not in members]
+        return [other for other in candidates
+                if self.centre.calculate_distance_between(other) <= reach + other.radius]
+
+    def _inside(self, game_map, end):
+        """
+        :return: Whether every member ends inside the map when the centre moves to end
+        :rtype: bool
+        """
+        ends = self.offsets + (end.x, end.y)
+        return bool((ends >= 0).all() and (ends[:, 0] <= game_map.width).all()
+                    and (ends[:, 1] <= game_map.height).all())
+
+    def thrust(self, destination, game_map, speed=constants.MAX_SPEED, max_corrections=18, angular_step=5):
+        """
+        Find one thrust for the whole formation, correcting the angle like entity.Ship.navigate does.
+
+        :param entity.Entity destination: Where the centre should go
+        :param game_map.Map game_map: The current map
+        :param int speed: The (max) speed
+        :param int max_corrections: Number of angles tried
+        :param int angular_step: Degrees between two tried angles
+        :return: (magnitude, angle) of a thrust whose footprint path is clear, or None
+        :rtype: (int, int)
+        """
+        magnitude = int(min(speed, self.centre.calculate_distance_between(destination)))
+        angle = round(self.centre.calculate_angle_between(destination))
+        obstacles = self._obstacles(game_map, magnitude + self.radius + 0.1)
+        for _ in range(max_corrections):
+            end = entity.Position(self.centre.x + magnitude * math.cos(math.radians(angle)),
+                                  self.centre.y + magnitude * math.sin(math.radians(angle)))
+            if self._inside(game_map, end) and not any(
+                    collision.intersect_segment_circle(self.centre, end, other, fudge=self.radius + 0.1)
+                    for other in obstacles):
+                return magnitude, angle % 360
+            angle += angular_step
+        return None
+
+    def approach(self, game_map, target=None, min_distance=3, **navigation):
+        """
+        Move the formation towards its target, stopping min_distance short of the footprint touching it.
+
+        :param game_map.Map game_map: The current map
+        :param entity.Entity target: Where to head instead of the squad's target, e.g. an interception point
+        :param float min_distance: Distance to keep between the footprint and the target's edge
+        :param navigation: Passed on to thrust (speed, max_corrections, angular_step)
+        :return: One thrust command per member, or None if the squad would arrive this turn or has no clear path
+        :rtype: list[str]
+        """
+        target = target if target is not None else self.target
+        destination = self.centre.closest_point_to(target, min_distance=min_distance + self.radius)
+        if self.centre.calculate_distance_between(destination) <= navigation.get('speed', constants.MAX_SPEED):
+            return None
+        thrust = self.thrust(destination, game_map, **navigation)
+        if thrust is None:
+            return None
+        return [ship.thrust(*thrust) for ship in self.ships]
+
+    def __len__(self):
+        return len(self.ships)
+
+    def __str__(self):
+        return "Squad {} ({} ships, target: {}, radius: {:.1f})".format(
+            self.id, len(self.ships), self.target.id, self.radius)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def form_squads(ships, target_of, link_distance=LINK_DISTANCE, max_radius=MAX_RADIUS):
+    """
+    Group ships that head for the same target and are chained together by link_distance.
+
+    :param list[entity.Ship] ships: Candidate ships, normally undocked ships of one player
+    :param target_of: Called as target_of(ship); the ship's target, or None to leave it out
+    :param float link_distance: Maximum centre-to-centre distance of linked ships
+    :param float max_radius: Groups with a larger footprint are left out
+    :return: Squads of at least two ships, largest first
+    :rtype: list[Squad]
+    """
+    by_target = {}
+    for ship in ships:
+        target = target_of(ship)
+        if target is not None:
+            by_target.setdefault((type(target), target.id), (target, []))[1].append(ship)
+
+    groups = []
+    for target, members in by_target.values():
+        if len(members) < 2:
+            continue
+        pos = np.array([(ship.x, ship.y) for ship in members])
+        linked = np.linalg.norm(pos[np.newaxis] - pos[:, np.newaxis], axis=-1) <= link_distance
+        first, second = np.nonzero(np.triu(linked, 1))
+        roots = engagement._components(len(members), first, second)
+        for root in np.unique(roots).tolist():
+            group = [ship for ship, ship_root in zip(members, roots.tolist()) if ship_root == root]
+            if len(group) >= 2:
+                groups.append((target, group))
+
+    squads = []
+    for target, group in sorted(groups, key=lambda item: len(item[1]), reverse=True):
+        squad = Squad(len(squads), group, target)
+        if squad.radius <= max_radius:
+            squads.append(squad)
+    return squads
@@ -0,0 +1,90 @@
+"""
+Lightweight in-process counters and timers, so the cost of caches, searches and deadlines can be measured and
+written to the bot's log.
+"""
+import contextlib
+import logging
+import time
+
+
+class Telemetry:
+    """
+    Named counters and timers.
+
+    :ivar counters: Event counts by name
+    :ivar timings: [calls, total seconds, worst seconds] by name
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, name, amount=1):
+        """
+        :param str name: The counter to increase
+        :param int amount: How much to add
+        :return: nothing
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name, seconds):
+        """
+        :param str name: The timer to add a measurement to
+        :param float seconds: The measured duration
+        :return: nothing
+        """
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """
+        Time the enclosed block.
+
+        :param str name: The timer to add the measurement to
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def mean(self, name):
+        """
+        :param str name: A timer
+        :return: Mean duration of the timer's measurements, 0 if there are none
+        :rtype: float
+        """
+        timing = self.timings.get(name)
+        return timing[1] / timing[0] if timing else 0.0
+
+    def log(self, logger=logging):
+        """
+        Write every counter and timer to the log.
+
+        :param logger: The logger to use
+        :return: nothing
+        """
+        for name, value in sorted(self.counters.items()):
+            logger.info("TELEMETRY %s: %s", name, value)
+        for name, (calls, total, worst) in sorted(self.timings.items()):
+            logger.info("TELEMETRY %s: %s calls, %.2fms mean, %.2fms worst",
+                        name, calls, 1000 * total / calls, 1000 * worst)
+
+    def reset(self):
+        """
+        Clear every counter and timer.
+
+        :return: nothing
+        """
+        self.counters.clear()
+        self.timings.clear()
+
+
+#: Process-wide telemetry used by the hlt modules
+default = Telemetry()
@@ -0,0 +1,180 @@
+"""
+Territory: which player can reach each part of the map first.
+
+Every player's ships are sources of a distance transform over a coarse grid in which planets are walls; the
+transform is a vectorized min-plus relaxation over the 8 neighbours of every cell, repeated until nothing
+changes. Distances become turns at MAX_SPEED, and each cell (and each planet, through the cells around it) goes to
+the player with the fewest turns:
+
+    territory = Territory(game_map)
+    if territory.planet_owner(planet.id) == game_map.my_id:
+        ...
+"""
+import math
+
+import numpy as np
+
+from . import constants, influence
+
+#: Value of cells and planets no player reaches first
+CONTESTED = -1
+
+_STEPS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+
+
+def _window(dy, dx):
+    """
+    :return: The slices of a raster's last two axes that cells are moved to, and from, by a (dy, dx) step
+    :rtype: tuple
+    """
+    return ((Ellipsis, slice(max(dy, 0), None if dy >= 0 else dy), slice(max(dx, 0), None if dx >= 0 else dx)),
+            (Ellipsis, slice(max(-dy, 0), None if dy <= 0 else -dy), slice(max(-dx, 0), None if dx <= 0 else -dx)))
+
+
+def distance_transform(sources, blocked, cell, max_iterations=None):
+    """
+    Multi-source distances over a grid with walls, moving between 8-connected cells.
+
+    Every sweep relaxes the distances in place, so a sweep carries improvements further than one cell along the
+    directions it visits first.
+
+    :param numpy.ndarray sources: (layers, rows, columns) starting distance of each cell, inf where not a source
+    :param numpy.ndarray blocked: (rows, columns) walls, never entered
+    :param float cell: Size of a cell
+    :param int max_iterations: Relaxation sweeps to stop after (default: until nothing changes)
+    :return: (layers, rows, columns) distances, inf where unreachable
+    :rtype: numpy.ndarray
+    """
+    distance = np.where(blocked, np.inf, sources)
+    steps = []
+    for dy, dx in _STEPS:
+        target, source = _window(dy, dx)
+        # Steps into or out of a wall are infinitely long
+        length = np.where(blocked[target] | blocked[source], np.inf, cell * math.hypot(dy, dx))
+        steps.append((target, source, length))
+    max_iterations = max_iterations or sum(blocked.shape) * 2
+    for _ in range(max_iterations):
+        previous = distance.copy()
+        for target, source, length in steps:
+            np.minimum(distance[target], distance[source] + length, out=distance[target])
+        if np.array_equal(previous, distance):
+            break
+    return distance
+
+
+class Territory:
+    """
+    The territory partition of one turn. It drifts slowly, so it may be rebuilt every few turns rather than every
+    turn.
+
+    :ivar grid: The raster geometry
+    :ivar turns: (players, rows, columns) turns each player needs to reach each cell
+    :ivar owner: (rows, columns) id of the player reaching each cell first, CONTESTED on ties and walls
+    """
+
+    def __init__(self, game_map, cell=4.0, undock_turns=constants.DOCK_TURNS):
+        """
+        :param game_map.Map game_map: The current map
+        :param float cell: Size of a raster cell
+        :param int undock_turns: Head start lost by docked ships, which have to undock first
+        """
+        self.grid = influence.Grid(game_map.width, game_map.height, cell)
+        players = max(player.id for player in game_map.all_players()) + 1
+        rows, columns = self.grid.shape
+        centres_x = (np.arange(columns) + 0.5) * cell
+        centres_y = (np.arange(rows) + 0.5) * cell
+
+        planets = game_map.all_planets()
+        gaps = {planet.id: np.hypot(centres_x[np.newaxis] - planet.x, centres_y[:, np.newaxis] - planet.y)
+                for planet in planets}
+        blocked = np.zeros(self.grid.shape, dtype=bool)
+        for planet in planets:
+            blocked |= gaps[planet.id] <= planet.radius + constants.SHIP_RADIUS
+
+        ships = list(game_map.ships_by_id().values())
+        ship_rows, ship_columns = self.grid.index([(ship.x, ship.y) for ship in ships])
+        owners = np.array([ship.owner.id for ship in ships], dtype=np.int64)
+        delays = np.array([0.0 if ship.docking_status == ship.DockingStatus.UNDOCKED
+                           else undock_turns * constants.MAX_SPEED for ship in ships], dtype=float)
+        walled = blocked[ship_rows, ship_columns]
+        if walled.any():
+            # Ships touching a planet, docked ones always, start from the nearest free cell next to a wall
+            edge = np.zeros_like(blocked)
+            for dy, dx in _STEPS:
+                target, source = _window(dy, dx)
+                edge[target] |= blocked[source]
+            edge_rows, edge_columns = np.nonzero(edge & ~blocked)
+            xs = np.array([ship.x for ship in ships])[walled]
+            ys = np.array([ship.y for ship in ships])[walled]
+            offsets = np.hypot(centres_x[edge_columns] - xs[:, np.newaxis], centres_y[edge_rows] - ys[:, np.newaxis])
+            nearest = offsets.argmin(axis=1)
+            ship_rows[walled] = edge_rows[nearest]
+            ship_columns[walled] = edge_columns[nearest]
+            delays[walled] += offsets[np.arange(len(nearest)), nearest]
+        sources = np.full((players,) + self.grid.shape, np.inf)
+        np.minimum.at(sources, (owners, ship_rows, ship_columns), delays)
+
+        self.turns = distance_transform(sources, blocked, cell) / constants.MAX_SPEED
+        self.owner = self._first(self.turns)
+
+        # A planet is reached through the free cells just outside it
+        self._planet_owner = {}
+        self._planet_turns = {}
+        for planet in planets:
+            ring = (gaps[planet.id] <= planet.radius + constants.SHIP_RADIUS + 1.5 * cell) & ~blocked
+            turns = self.turns[:, ring].min(axis=1) if ring.any() else np.full(players, np.inf)
+            self._planet_turns[planet.id] = turns
+            self._planet_owner[planet.id] = int(self._first(turns[:, np.newaxis])[0])
+
+    @staticmethod
+    def _first(turns):
+        """
+        :param numpy.ndarray turns: (players, ...) turns to reach
+        :return: (...) the player reaching first, CONTESTED on ties or when nobody does
+        :rtype: numpy.ndarray
+        """
+        if turns.shape[0] < 2:
+            turns = np.concatenate((turns, np.full_like(turns, np.inf)))
+        ordered = np.sort(turns, axis=0)
+        return np.where(np.isfinite(ordered[0]) & (ordered[0] < ordered[1]), turns.argmin(axis=0), CONTESTED)
+
+    def owner_at(self, position):
+        """
+        :param entity.Entity position: A position or entity
+        :return: The player reaching it first, or CONTESTED
+        :rtype: int
+        """
+        row, column = self.grid.index(((position.x, position.y),))
+        return int(self.owner[row[0], column[0]])
+
+    def planet_owner(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: The player reaching it first, or CONTESTED
+        :rtype: int
+        """
+        return self._planet_owner.get(planet_id, CONTESTED)
+
+    def planet_turns(self, planet_id):
+        """
+        :param int planet_id: A planet
+        :return: (players,) turns each player needs to reach it
+        :rtype: numpy.ndarray
+        """
+        return self._planet_turns[planet_id]
+
+    def planets_of(self, player_id):
+        """
+        :param int player_id: A player
+        :return: Ids of the planets the player reaches first
+        :rtype: list[int]
+        """
+        return [planet_id for planet_id, owner in sorted(self._planet_owner.items()) if owner == player_id]
+
+    def __str__(self):
+        shares = np.bincount(self.owner[self.owner >= 0].ravel(), minlength=self.turns.shape[0])
+        return "Territory ({} cells per player, {} contested)".format(
+            shares.tolist(), int((self.owner == CONTESTED).sum()))
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,235 @@
+"""
+Reuse of per-ship decisions across turns. A ship's situation is reduced to a key over its quantized local
+neighbourhood (nearby entity kinds, owners and relative cells) plus its target, and a bounded LRU transposition
+table maps keys to the decision last taken in that situation.
+"""
+import collections
+import math
+
+from . import collision, entity
+
+
+class NeighbourhoodHasher:
+    """
+    Buckets the entities of one turn's map so neighbourhood keys and clear-path checks only look at nearby
+    entities. Build a new hasher every turn.
+
+    :ivar game_map: The map the hasher was built for
+    :ivar radius: Distance (from the ship, to the edge of an entity) within which entities are part of the key
+    :ivar cell: Size of the cells relative positions are quantized to
+    """
+
+    def __init__(self, game_map, radius=14.0, cell=3.0):
+        """
+        :param game_map.Map game_map: The current map
+        :param float radius: Neighbourhood radius; at least MAX_SPEED plus a margin, so clear-path checks are exact
+        :param float cell: Quantization step for relative positions
+        """
+        self.game_map = game_map
+        self.radius = radius
+        self.cell = cell
+        self._buckets = collections.defaultdict(list)
+        for ship in game_map.ships_by_id().values():
+            self._buckets[self._bucket(ship.x, ship.y)].append(ship)
+        self._planets = game_map.all_planets()
+
+    def _bucket(self, x, y):
+        """
+        :return: The bucket of a position
+        :rtype: (int, int)
+        """
+        return int(x // self.radius), int(y // self.radius)
+
+    def neighbours(self, ship):
+        """
+        :param entity.Ship ship: The ship at the centre of the neighbourhood
+        :return: The ships and planets whose edge is within radius of ship, ship excluded
+        :rtype: list[entity.Entity]
+        """
+        bucket_x, bucket_y = self._bucket(ship.x, ship.y)
+        nearby = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other in self._buckets.get((bucket_x + dx, bucket_y + dy), ()):
+                    if other is not ship and ship.calculate_distance_between(other) <= self.radius + other.radius:
+                        nearby.append(other)
+        nearby.extend(planet for planet in self._planets
+                      if ship.calculate_distance_between(planet) <= self.radius + planet.radius)
+        return nearby
+
+    def _relation(self, ship, other):
+        """
+        :return: 0 for entities of ship's owner, 1 for other players' entities, 2 for unowned ones
+        :rtype: int
+        """
+        if other.owner is None:
+            return 2
+        return 0 if other.owner.id == ship.owner.id else 1
+
+    def _quantize(self, ship, other):
+        """
+        :return: The cell of other relative to ship
+        :rtype: (int, int)
+        """
+        return int((other.x - ship.x) // self.cell), int((other.y - ship.y) // self.cell)
+
+    def key(self, ship, target=None, context=None):
+        """
+        Describe the situation of a ship. Ships get equal keys when the same kinds of entity, with the same
+        owners, sit in the same cells around them and they head for the same target in the same direction.
+
+        :param entity.Ship ship: The ship to describe
+        :param entity.Entity target: The ship's target, if any; targets beyond the neighbourhood are only
+            described by their id and direction
+        :param context: Any hashable turn-wide state that decisions depend on
+        :return: A hashable key; only decisions aimed at target may be stored under it
+        :rtype: tuple
+        """
+        entries = []
+        for other in self.neighbours(ship):
+            if isinstance(other, entity.Planet):
+                entries.append(('p', self._relation(ship, other), other.is_full(), self._quantize(ship, other)))
+            else:
+                entries.append(('s', self._relation(ship, other), other.docking_status.value,
+                                self._quantize(ship, other)))
+        entries.sort()
+
+        aim = None
+        if target is not None:
+            distance = ship.calculate_distance_between(target) - target.radius
+            where = 'far' if distance > self.radius else self._quantize(ship, target)
+            aim = (target.id, int(round(ship.calculate_angle_between(target) / 5)) % 72, where)
+        return tuple(entries), aim, context
+
+    def is_clear(self, ship, magnitude, angle):
+        """
+        Check that a thrust does not run the ship into a neighbouring entity or off the map.
+
+        :param entity.Ship ship: The ship
+        :param int magnitude: Thrust magnitude
+        :param int angle: Thrust angle in degrees
+        :return: True if the straight path is free
+        :rtype: bool
+        """
+        end = entity.Position(ship.x + magnitude * math.cos(math.radians(angle)),
+                              ship.y + magnitude * math.sin(math.radians(angle)))
+        if not (0 <= end.x <= self.game_map.width and 0 <= end.y <= self.game_map.height):
+            return False
+        return not any(collision.intersect_segment_circle(ship, end, other, fudge=ship.radius + 0.1)
+                       for other in self.neighbours(ship))
+
+
+class Decision:
+    """
+    A reusable decision: a thrust, expressed independently of the ship it was made for, or a dock.
+
+    :ivar kind: 't' for a thrust, 'd' for a dock
+    :ivar magnitude: Thrust magnitude
+    :ivar angle: Thrust angle in degrees
+    :ivar planet_id: The planet docked to or travelled to, if any
+    """
+
+    def __init__(self, kind, magnitude=0, angle=0, planet_id=None):
+        self.kind = kind
+        self.magnitude = magnitude
+        self.angle = angle
+        self.planet_id = planet_id
+
+    @staticmethod
+    def from_command(command, planet_id=None):
+        """
+        :param str command: A command as produced by entity.Ship.thrust or entity.Ship.dock
+        :param int planet_id: The planet a thrust heads for, if any
+        :return: The decision, or None for commands that cannot be reused
+        :rtype: Decision
+        """
+        kind, *arguments = command.split()
+        if kind == 't':
+            return Decision('t', int(arguments[1]), int(arguments[2]), planet_id)
+        if kind == 'd':
+            return Decision('d', planet_id=int(arguments[1]))
+        return None
+
+    def command(self, ship, hasher):
+        """
+        Re-issue the decision for a ship, if it is still safe to do so.
+
+        :param entity.Ship ship: The ship to command
+        :param NeighbourhoodHasher hasher: The current turn's hasher
+        :return: The command string, or None if the decision no longer applies
+        :rtype: str
+        """
+        if self.kind == 't':
+            return ship.thrust(self.magnitude, self.angle) if hasher.is_clear(ship, self.magnitude, self.angle) \
+                else None
+        planet = hasher.game_map.get_planet(self.planet_id)
+        if planet is None or planet.is_full() or not ship.can_dock(planet):
+            return None
+        return ship.dock(planet)
+
+    def __str__(self):
+        return "Decision {} (magnitude: {}, angle: {}, planet: {})"\
+            .format(self.kind, self.magnitude, self.angle, self.planet_id)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class TranspositionTable:
+    """
+    Bounded LRU map from neighbourhood keys to decisions.
+
+    :ivar capacity: Maximum number of entries
+    :ivar hits: Number of lookups that found a decision
+    :ivar misses: Number of lookups that did not
+    """
+
+    def __init__(self, capacity=4096):
+        """
+        :param int capacity: Maximum number of entries kept
+        """
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """
+        :param key: A key from NeighbourhoodHasher.key
+        :return: The decision stored for the key, or None
+        :rtype: Decision
+        """
+        decision = self._entries.get(key)
+        if decision is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return decision
+
+    def put(self, key, decision):
+        """
+        Store a decision, evicting the least recently used entry when full.
+
+        :param key: A key from NeighbourhoodHasher.key
+        :param Decision decision: The decision taken
+        :return: nothing
+        """
+        if decision is None:
+            return
+        self._entries[key] = decision
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """
+        Forget the decision stored for a key, e.g. once it turned out to be invalid.
+
+        :param key: A key from NeighbourhoodHasher.key
+        :return: nothing
+        """
+        self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
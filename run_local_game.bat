@@ -0,0 +1 @@
+python -m hlt.engine -d "240 160" "python MyBot_v8.py" "python MyBot.py"
\ No newline at end of file
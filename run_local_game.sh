@@ -0,0 +1,3 @@
+#!/bin/sh
+
+python3 -m hlt.engine -d "240 160" "python3 MyBot.py" "python3 MyBot.py"